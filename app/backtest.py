@@ -2,69 +2,528 @@
 Back-testing utilities.
 
 Workflow:
-1. Load odds_snapshots joined with results.
+1. Load odds_snapshots joined with results (aggregated in SQL, or streamed
+   in fixed-size chunks through `stream_backtest_rows` into accumulators).
 2. Compute Brier score per provider.
 3. Compute simple ROI using Kelly stake fractions (optional).
-4. Update provider_metrics table.
+4. Fold newly settled results into provider_metrics (running sums plus a
+   settlement high-water mark in metrics_watermark, so each run is
+   O(new results)).
 """
 
 from __future__ import annotations
+import math
+from abc import ABC, abstractmethod
 from collections import defaultdict
-from typing import Dict, Tuple
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Union,
+)
 
+import numpy as np
+import pandas as pd
 from sqlalchemy import text, select, func
 from sqlalchemy.exc import OperationalError
 from app.db.base import async_session_factory
-from app.db.models import ProviderMetrics
+from app.db.models import MetricsWatermark, ProviderMetrics
+from app.logging_config import logger
+from app.polymarket.aggregation import SnapshotBatch, naive_utc_us
 
 
-async def compute_brier_scores() -> Dict[str, float]:
+# --------------------------------------------------------------------------- #
+#  Streaming data source                                                      #
+# --------------------------------------------------------------------------- #
+STREAM_CHUNK = 10_000
+# Leading columns of every streamed row (extra columns follow, in order)
+BACKTEST_COLUMNS = (
+    "fixture_id",
+    "provider_id",
+    "ts",
+    "outcome",
+    "implied_norm",
+    "correct",
+)
+
+
+def as_datetime(ts: Any) -> datetime:
+    """Raw-SQL timestamp as a datetime (SQLite hands them back as strings)."""
+    return datetime.fromisoformat(ts) if isinstance(ts, str) else ts
+
+
+def _settled_where(
+    settled_after: Optional[datetime], settled_upto: Optional[datetime]
+) -> Tuple[str, Dict[str, Any]]:
+    """WHERE clause for `settled_after < results.settled_at <= settled_upto`."""
+    where, params = [], {}
+    if settled_after is not None:
+        where.append("results.settled_at > :settled_after")
+        params["settled_after"] = settled_after
+    if settled_upto is not None:
+        where.append("results.settled_at <= :settled_upto")
+        params["settled_upto"] = settled_upto
+    return (f"WHERE {' AND '.join(where)}" if where else ""), params
+
+
+async def stream_backtest_rows(
+    sess: Any,
+    *,
+    extra_columns: Sequence[str] = (),
+    chunk_size: int = STREAM_CHUNK,
+    settled_after: Optional[datetime] = None,
+    settled_upto: Optional[datetime] = None,
+) -> AsyncIterator[Sequence[Any]]:
     """
-    Returns {provider: brier_score}.
-    Lower is better, perfect = 0.
+    Yield joined odds_snapshots × results rows in chunks of `chunk_size`.
+
+    Rows come through a server-side cursor (`AsyncSession.stream` with
+    `yield_per`), so only one chunk is held in memory at a time.  Columns
+    are `BACKTEST_COLUMNS` followed by `extra_columns`.
     """
-    try:
-        sql = text(
-            """
-            SELECT provider_id,
-                   outcome = winner AS correct,
-                   implied_norm
+    extras = "".join(f", {c}" for c in extra_columns)
+    where_sql, params = _settled_where(settled_after, settled_upto)
+    sql = text(
+        f"""
+        SELECT fixture_id, provider_id, ts, outcome, implied_norm,
+               outcome = winner AS correct{extras}
+        FROM odds_snapshots
+        JOIN results USING (fixture_id, outcome)
+        {where_sql}
+        """
+    ).execution_options(yield_per=chunk_size)
+    result = await sess.stream(sql, params)
+    async for partition in result.partitions(chunk_size):
+        yield partition
+
+
+class Accumulator(Protocol):
+    def add(self, rows: Sequence[Any]) -> None: ...
+
+
+class _KeyedMeanAccumulator(ABC):
+    """
+    Running sum/count of a per-row loss, keyed by `key(row)`.  Rows without
+    an `implied_norm` are skipped, as SQL's SUM/COUNT of a NULL would.
+    """
+
+    def __init__(self, key: Optional[Callable[[Any], Any]] = None) -> None:
+        self.key = key or (lambda row: row.provider_id)
+        self._sums: Dict[Any, float] = defaultdict(float)
+        self._counts: Dict[Any, int] = defaultdict(int)
+
+    @abstractmethod
+    def loss(self, correct: bool, prob: float) -> float: ...
+
+    def add(self, rows: Sequence[Any]) -> None:
+        for row in rows:
+            if row.implied_norm is None:
+                continue
+            k = self.key(row)
+            self._sums[k] += self.loss(bool(row.correct), row.implied_norm)
+            self._counts[k] += 1
+
+    def sums(self) -> Dict[Any, Tuple[float, int]]:
+        return {k: (self._sums[k], self._counts[k]) for k in self._sums}
+
+    def scores(self) -> Dict[Any, float]:
+        return {k: self._sums[k] / n for k, n in self._counts.items() if n}
+
+
+class BrierAccumulator(_KeyedMeanAccumulator):
+    def loss(self, correct: bool, prob: float) -> float:
+        return (1.0 - prob) ** 2 if correct else (0.0 - prob) ** 2
+
+
+class LogLossAccumulator(_KeyedMeanAccumulator):
+    eps = 1e-15
+
+    def loss(self, correct: bool, prob: float) -> float:
+        p = min(max(prob, self.eps), 1.0 - self.eps)
+        return -math.log(p if correct else 1.0 - p)
+
+
+async def run_accumulators(
+    accumulators: Iterable[Accumulator],
+    *,
+    extra_columns: Sequence[str] = (),
+    chunk_size: int = STREAM_CHUNK,
+) -> None:
+    """Stream the backtest rows once, feeding every chunk to each accumulator."""
+    accs = list(accumulators)
+    async with async_session_factory() as sess:
+        async for chunk in stream_backtest_rows(
+            sess, extra_columns=extra_columns, chunk_size=chunk_size
+        ):
+            for acc in accs:
+                acc.add(chunk)
+
+
+# Extra GROUP BY dimensions: name → odds_snapshots column
+BRIER_GROUPS = {"sport": "sport", "market": "market"}
+# Time buckets as sortable strings, per SQL dialect (and for the Python path)
+_BUCKET_SQL = {
+    "sqlite": {
+        "day": "strftime('%Y-%m-%d', ts)",
+        "month": "strftime('%Y-%m', ts)",
+    },
+    "postgresql": {
+        "day": "to_char(ts, 'YYYY-MM-DD')",
+        "month": "to_char(ts, 'YYYY-MM')",
+    },
+}
+_BUCKET_FMT = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+
+BrierKey = Union[str, Tuple[str, ...]]
+
+
+def _group_columns(group_by: Sequence[str], bucket: Optional[str]) -> List[str]:
+    unknown = set(group_by) - set(BRIER_GROUPS)
+    if unknown:
+        raise ValueError(f"Unknown Brier grouping(s): {sorted(unknown)}")
+    if bucket is not None and bucket not in _BUCKET_FMT:
+        raise ValueError(f"Unknown time bucket {bucket!r}")
+    return [BRIER_GROUPS[g] for g in group_by]
+
+
+def _brier_key(provider: str, groups: Sequence[Any]) -> BrierKey:
+    return (provider, *map(str, groups)) if groups else provider
+
+
+async def _brier_sums_sql(
+    sess: Any,
+    group_by: Sequence[str],
+    bucket: Optional[str],
+    *,
+    settled_after: Optional[datetime] = None,
+    settled_upto: Optional[datetime] = None,
+) -> Dict[BrierKey, Tuple[float, int]]:
+    """
+    SUM/COUNT of squared errors computed by the database, optionally only
+    for results with `settled_after < settled_at <= settled_upto`.
+    """
+    dims = _group_columns(group_by, bucket)
+    where_sql, params = _settled_where(settled_after, settled_upto)
+    if bucket is not None:
+        dialect = sess.get_bind().dialect.name
+        try:
+            dims.append(_BUCKET_SQL[dialect][bucket])
+        except KeyError:
+            raise NotImplementedError(
+                f"time bucket {bucket!r} not supported on {dialect}"
+            ) from None
+    select_dims = "".join(f", {d} AS g{i}" for i, d in enumerate(dims))
+    group_dims = "".join(f", g{i}" for i in range(len(dims)))
+    sql = text(
+        f"""
+        SELECT provider_id{group_dims}, SUM(diff * diff), COUNT(diff)
+        FROM (
+            SELECT provider_id{select_dims},
+                   CASE WHEN outcome = winner THEN 1.0 ELSE 0.0 END
+                       - implied_norm AS diff
             FROM odds_snapshots
             JOIN results USING (fixture_id, outcome)
-            """
-        )
+            {where_sql}
+        ) AS scored
+        GROUP BY provider_id{group_dims}
+        """
+    )
+    result = await sess.execute(sql, params)
+    return {
+        _brier_key(row[0], row[1:-2]): (float(row[-2]), int(row[-1]))
+        for row in result
+        if row[-1]
+    }
 
-        sums: Dict[str, float] = defaultdict(float)
-        counts: Dict[str, int] = defaultdict(int)
 
+async def _brier_sums_python(
+    sess: Any,
+    group_by: Sequence[str],
+    bucket: Optional[str],
+    *,
+    settled_after: Optional[datetime] = None,
+    settled_upto: Optional[datetime] = None,
+) -> Dict[BrierKey, Tuple[float, int]]:
+    """Fallback: stream joined rows and accumulate in Python."""
+    dims = _group_columns(group_by, bucket)
+
+    def key(row: Any) -> BrierKey:
+        groups = list(row[len(BACKTEST_COLUMNS) :])
+        if bucket is not None:
+            groups.append(as_datetime(row.ts).strftime(_BUCKET_FMT[bucket]))
+        return _brier_key(row.provider_id, groups)
+
+    acc = BrierAccumulator(key=key)
+    async for chunk in stream_backtest_rows(
+        sess,
+        extra_columns=dims,
+        settled_after=settled_after,
+        settled_upto=settled_upto,
+    ):
+        acc.add(chunk)
+    return acc.sums()
+
+
+async def brier_sums(
+    sess: Any,
+    group_by: Sequence[str] = (),
+    bucket: Optional[str] = None,
+    *,
+    in_db: bool = True,
+    settled_after: Optional[datetime] = None,
+    settled_upto: Optional[datetime] = None,
+) -> Dict[BrierKey, Tuple[float, int]]:
+    """
+    `{key: (sum of squared errors, count)}`, keyed as in
+    `compute_brier_scores`.  The database aggregates when it can; if that
+    fails (e.g. a dialect without time buckets), or with `in_db=False`,
+    joined rows are streamed and summed in Python instead.
+    """
+    window = dict(settled_after=settled_after, settled_upto=settled_upto)
+    if in_db:
+        try:
+            return await _brier_sums_sql(sess, group_by, bucket, **window)
+        except Exception as exc:
+            logger.warning(
+                f"[backtest] SQL Brier aggregation failed ({exc}); "
+                "falling back to Python"
+            )
+            await sess.rollback()
+    return await _brier_sums_python(sess, group_by, bucket, **window)
+
+
+async def compute_brier_scores(
+    *,
+    in_db: bool = True,
+    group_by: Sequence[str] = (),
+    bucket: Optional[str] = None,
+) -> Dict[BrierKey, float]:
+    """
+    Returns {provider: brier_score}.
+    Lower is better, perfect = 0.
+
+    With `group_by` (see `BRIER_GROUPS`) and/or a time `bucket` ("day",
+    "month") keys become `(provider, *groups)` tuples.
+
+    By default the database aggregates (one row per group comes back);
+    if that fails, or with `in_db=False`, joined rows are fetched and
+    summed in Python.
+    """
+    _group_columns(group_by, bucket)  # validate before touching the DB
+    try:
         async with async_session_factory() as sess:
-            result = await sess.execute(sql)
-            rows = result.fetchall()
+            sums = await brier_sums(sess, group_by, bucket, in_db=in_db)
     except Exception:
         # Table missing or other DB error -> empty scores
         return {}
 
-    for provider, correct, prob in rows:
-        error = (1.0 - prob) ** 2 if correct else (0.0 - prob) ** 2
-        sums[provider] += error
-        counts[provider] += 1
+    return {k: sse / n for k, (sse, n) in sums.items() if n}
 
-    return {p: sums[p] / counts[p] for p in sums}
 
+class _CodeTable:
+    """Label → code table grown chunk by chunk (global `pd.factorize`)."""
 
-async def update_provider_metrics():
-    scores = await compute_brier_scores()
+    def __init__(self) -> None:
+        self.codes: Dict[str, int] = {}
+
+    def intern(self, values: Sequence[Any]) -> np.ndarray:
+        local, uniques = pd.factorize(np.asarray(values, dtype=object))
+        table = np.array(
+            [self.codes.setdefault(str(u), len(self.codes)) for u in uniques],
+            dtype=np.int64,
+        )
+        return table[local] if len(table) else local.astype(np.int64)
+
+    @property
+    def labels(self) -> List[str]:
+        return list(self.codes)
+
+
+async def load_snapshot_batch(
+    sess: Any, chunk_size: int = STREAM_CHUNK
+) -> SnapshotBatch:
+    """
+    All odds_snapshots rows as one columnar `SnapshotBatch`.
+
+    Rows are streamed like `stream_backtest_rows`; each chunk is interned
+    straight into compact column buffers, so no Python object per row
+    outlives its chunk.
+    """
+    sql = text(
+        """
+        SELECT provider_id, fixture_id, ts, outcome, decimal_odds
+        FROM odds_snapshots
+        ORDER BY fixture_id, provider_id, ts
+        """
+    ).execution_options(yield_per=chunk_size)
+    tables = {name: _CodeTable() for name in ("provider", "fixture", "outcome")}
+    buffers: Dict[str, List[np.ndarray]] = defaultdict(list)
+    result = await sess.stream(sql)
+    async for chunk in result.partitions(chunk_size):
+        provider, fixture, ts, outcome, odds = zip(*chunk)
+        buffers["provider"].append(tables["provider"].intern(provider))
+        buffers["fixture"].append(tables["fixture"].intern(fixture))
+        buffers["outcome"].append(tables["outcome"].intern(outcome))
+        buffers["ts"].append(naive_utc_us(ts))
+        buffers["decimal_odds"].append(np.asarray(odds, dtype=np.float64))
+    if not buffers:
+        return SnapshotBatch.from_snapshots([])
+    return SnapshotBatch.from_codes(
+        tables["provider"].labels,
+        tables["fixture"].labels,
+        tables["outcome"].labels,
+        np.concatenate(buffers.pop("provider")),
+        np.concatenate(buffers.pop("fixture")),
+        np.concatenate(buffers.pop("ts")),
+        np.concatenate(buffers.pop("outcome")),
+        np.concatenate(buffers.pop("decimal_odds")),
+    )
+
+
+async def load_winners(sess: Any) -> Dict[str, str]:
+    result = await sess.execute(text("SELECT DISTINCT fixture_id, winner FROM results"))
+    return {str(f): w for f, w in result.fetchall()}
+
+
+async def load_settle_times(sess: Any) -> Dict[str, datetime]:
+    """`{fixture_id: settled_at}` for every settled fixture."""
+    result = await sess.execute(
+        text("SELECT fixture_id, MAX(settled_at) FROM results GROUP BY fixture_id")
+    )
+    return {str(f): as_datetime(t) for f, t in result.fetchall() if t is not None}
+
+
+def quote_errors(
+    batch: SnapshotBatch, winners: Mapping[str, str]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `(settled, errors)`: mask of the batch rows whose fixture has settled and
+    the squared error of each such row's per-snapshot normalised probability.
+    """
+    probs = batch.normalised()
+    codes = {o: i for i, o in enumerate(batch.outcomes)}
+    # -1 = unsettled, -2 = settled on an outcome nobody quoted
+    winner_code = np.array(
+        [codes.get(winners[f], -2) if f in winners else -1 for f in batch.fixtures],
+        dtype=np.int64,
+    )
+    quote_winner = winner_code[batch.fixture]
+    settled = quote_winner != -1
+    correct = batch.outcome == quote_winner
+    return settled, (correct[settled] - probs[settled]) ** 2
+
+
+def brier_scores_from_batch(
+    batch: SnapshotBatch, winners: Mapping[str, str]
+) -> Dict[str, float]:
+    """
+    Vectorised Brier score per provider over a `SnapshotBatch`, using
+    per-snapshot normalised probabilities.  Unsettled fixtures are skipped.
+    """
+    settled, errors = quote_errors(batch, winners)
+    provider = batch.provider[settled]
+    n_p = len(batch.providers)
+    sums = np.bincount(provider, weights=errors, minlength=n_p)
+    counts = np.bincount(provider, minlength=n_p)
+    return {
+        p: float(sums[i] / counts[i])
+        for i, p in enumerate(batch.providers)
+        if counts[i]
+    }
+
+
+async def _settled_watermark(
+    sess: Any, after: Optional[datetime]
+) -> Optional[datetime]:
+    """Latest `results.settled_at` newer than `after` (None if nothing new)."""
+    sql = "SELECT MAX(settled_at) FROM results"
+    params = {}
+    if after is not None:
+        sql += " WHERE settled_at > :after"
+        params["after"] = after
+    latest = (await sess.execute(text(sql), params)).scalar()
+    return None if latest is None else as_datetime(latest)
+
+
+_METRICS_WATERMARK = "provider_metrics"
+
+
+async def update_provider_metrics() -> Dict[str, float]:
+    """
+    Fold newly settled results into provider_metrics.
+
+    Each row keeps the running squared-error sum and count; the settlement
+    high-water mark lives in `metrics_watermark` and advances on every run
+    that finds new results, even if none of them has a scored quote.  A run
+    only scores results settled after the mark, so its cost is proportional
+    to the new results and the lifetime scores survive
+    `purge_old_snapshots`.  Returns the updated lifetime Brier score of
+    every provider touched by this run.
+    """
     async with async_session_factory() as sess:
-        for provider, brier in scores.items():
-            await sess.merge(
-                ProviderMetrics(provider_id=provider, brier_score=brier)
+        metrics: Dict[str, ProviderMetrics] = {
+            m.provider_id: m
+            for m in (await sess.scalars(select(ProviderMetrics))).all()
+        }
+        mark = await sess.get(MetricsWatermark, _METRICS_WATERMARK)
+        since: Optional[datetime]
+        if mark is not None:
+            since = mark.settled_at
+        else:  # databases from before the watermark table
+            since = max(
+                (m.last_settled_at for m in metrics.values() if m.last_settled_at),
+                default=None,
             )
+        # Bound the window up front so results settling mid-run wait for
+        # the next run instead of being skipped by the new mark
+        upto = await _settled_watermark(sess, since)
+        if upto is None:
+            return {}
+        sums = await brier_sums(sess, settled_after=since, settled_upto=upto)
+
+        now = datetime.utcnow()
+        touched: Dict[str, ProviderMetrics] = {}
+        for key, (sse, n) in sums.items():
+            provider = str(key)
+            row = metrics.get(provider)
+            if row is None:
+                row = metrics[provider] = ProviderMetrics(
+                    provider_id=provider, brier_sum=0.0, n_obs=0
+                )
+                sess.add(row)
+            row.brier_sum += sse
+            row.n_obs += n
+            row.brier_score = row.brier_sum / row.n_obs if row.n_obs else None
+            row.last_settled_at = upto
+            row.updated_at = now
+            touched[provider] = row
+        if mark is None:
+            sess.add(MetricsWatermark(name=_METRICS_WATERMARK, settled_at=upto))
+        else:
+            mark.settled_at = upto
         await sess.commit()
+    logger.info(
+        f"[backtest] folded {sum(n for _, n in sums.values())} scored quotes "
+        f"settled up to {upto:%Y-%m-%d %H:%M:%S} into provider_metrics"
+    )
+    return {
+        p: row.brier_score for p, row in touched.items() if row.brier_score is not None
+    }
 
 
-async def summary() -> Tuple[Dict[str, float], str]:
+async def summary() -> Tuple[Dict[BrierKey, float], str]:
     scores = await compute_brier_scores()
     pretty = "\n".join(
-        f"{p:15}  Brier={b:.4f}" for p, b in sorted(scores.items(), key=lambda x: x[1])
+        f"{p!s:15}  Brier={b:.4f}"
+        for p, b in sorted(scores.items(), key=lambda x: x[1])
     )
     return scores, pretty
\ No newline at end of file
@@ -2,17 +2,23 @@ from __future__ import annotations   # ← first line, nothing before it
 
 import json
 import sys
-from typing import Any, Dict, List
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
 
 import asyncio
 import typer
 from rich import print
 
 from app.logging_config import configure_logging, logger
-from app.polymarket.aggregation import snapshots_to_true_probs, ProviderSnapshot, OutcomeOdds
+from app.matching import resolve_market_slug
+from app.pipeline import FixtureQuotes, collect_fixture
+from app.polymarket.aggregation import snapshots_to_true_probs
 from app.polymarket.staking import recommend, compute_edge
-from app.providers import get_active_providers
+from app.providers import close_providers, get_active_providers
 from app.polymarket.client import fetch_market_probs
+from app.weights import PROVIDER_WEIGHTS
 
 configure_logging()
 
@@ -22,22 +28,18 @@ app = typer.Typer(add_completion=False, no_args_is_help=True)
 # --------------------------------------------------------------------------- #
 #  Helpers                                                                    #
 # --------------------------------------------------------------------------- #
-async def _collect_provider_snaps(fixture_id: str) -> List[ProviderSnapshot]:
-    snaps: List[ProviderSnapshot] = []
-    for name, provider in get_active_providers().items():
-        odds_rows = await provider.fetch_fixture_odds(fixture_id)
-        if not odds_rows:
-            continue
-        odds = [OutcomeOdds(o["outcome"], o["decimal_odds"]) for o in odds_rows]
-        snaps.append(
-            ProviderSnapshot(
-                provider=name,
-                fixture_id=fixture_id,
-                ts=datetime.utcnow(),
-                odds=odds,
-            )
+async def _collect(fixture_id: str) -> FixtureQuotes:
+    """Providers + Polymarket for one fixture, fetched concurrently."""
+    try:
+        return await collect_fixture(
+            fixture_id,
+            get_active_providers(),
+            market_fetcher=fetch_market_probs,
+            market_slug=resolve_market_slug(fixture_id),
         )
-    return snaps
+    finally:
+        # asyncio.run() discards the loop right after; release pooled sockets
+        await close_providers()
 
 
 # --------------------------------------------------------------------------- #
@@ -51,11 +53,11 @@ def fetch(
     import asyncio
 
     async def _run() -> Dict[str, Any]:
-        provider_snaps = await _collect_provider_snaps(fixture)
-        market_probs_rows = await fetch_market_probs(fixture)
+        quotes = await _collect(fixture)
         return {
-            "provider_snaps": [snap.__dict__ for snap in provider_snaps],
-            "market_probs": market_probs_rows,
+            "provider_snaps": [asdict(snap) for snap in quotes.snapshots],
+            "market_probs": quotes.market_probs,
+            "missing_providers": quotes.missing,
         }
 
     try:
@@ -64,7 +66,11 @@ def fetch(
         logger.exception(f"CLI command failed: {exc}")
         typer.Exit(code=1)
 
-    dump = json.dumps(data, indent=2) if pretty else json.dumps(data)
+    dump = (
+        json.dumps(data, indent=2, default=str)
+        if pretty
+        else json.dumps(data, default=str)
+    )
     print(dump)
 
 
@@ -77,10 +83,10 @@ def recommend_cmd(
     import asyncio
 
     async def _run() -> Dict[str, Any]:
-        provider_snaps = await _collect_provider_snaps(fixture)
-        true_probs = snapshots_to_true_probs(provider_snaps)
-        market_probs_rows = await fetch_market_probs(fixture)
-        market_probs = {row["outcome"]: row["prob"] for row in market_probs_rows}
+        quotes = await _collect(fixture)
+        weights = await PROVIDER_WEIGHTS.for_snapshots(quotes.snapshots)
+        true_probs = snapshots_to_true_probs(quotes.snapshots, weights=weights)
+        market_probs = {row["outcome"]: row["prob"] for row in quotes.market_probs}
         edges = compute_edge(true_probs, market_probs)
         recs = recommend(
             true_probs,
@@ -89,6 +95,7 @@ def recommend_cmd(
             bankroll=bankroll,
         )
         return {
+            "fixture": fixture,
             "true_probs": true_probs,
             "market_probs": market_probs,
             "edges": edges,
@@ -100,16 +107,27 @@ def recommend_cmd(
     except Exception as exc:  # broad, but CLI shouldn’t crash
         logger.exception(f"CLI command failed: {exc}")
         typer.Exit(code=1)
-    print(json.dumps(result, indent=2))
+    # Plain stdout: rich would colour/wrap the JSON that `simulate` reads back
+    typer.echo(json.dumps(result, indent=2))
+
 
+backtest_app = typer.Typer(
+    help="Run back-test, update metrics, and print summary.",
+    invoke_without_command=True,
+)
+app.add_typer(backtest_app, name="backtest")
 
-@app.command(help="Run back-test, update metrics, and print summary.")
+
+@backtest_app.callback()
 def backtest(
+    ctx: typer.Context,
     write: bool = typer.Option(False, help="Write results into provider_metrics"),
 ):
     import asyncio
     from app.backtest import summary, update_provider_metrics
 
+    if ctx.invoked_subcommand is not None:
+        return
     scores, table = asyncio.run(summary())
     print(table)
     if write:
@@ -117,6 +135,120 @@ def backtest(
         print("[green]Metrics table updated.[/green]")
 
 
+def _csv(value: str, cast: Any) -> list:
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+@backtest_app.command("sweep", help="Grid-search alpha / window / weighting.")
+def backtest_sweep(
+    alphas: str = typer.Option("0.2,0.4,0.6,0.8,1.0", help="Comma-separated alphas"),
+    windows: str = typer.Option("1,3,5,10", help="Comma-separated history windows"),
+    weightings: str = typer.Option(
+        "equal,inverse_brier", help="Comma-separated provider weightings"
+    ),
+    rank_by: str = typer.Option("brier", help="brier | log_loss | roi"),
+    top: int = typer.Option(10, help="Rows to print (0 = all)"),
+    kelly_fraction: float = typer.Option(0.5, help="Kelly multiplier for ROI"),
+    max_cap: float = typer.Option(0.10, help="Per-outcome stake cap for ROI"),
+    edge_threshold: float = typer.Option(0.02, help="Minimum edge to bet"),
+    workers: int = typer.Option(0, help="Worker processes (0 = one per CPU)"),
+    as_json: bool = typer.Option(False, "--json", help="Emit JSON rows"),
+):
+    from app.sweep import load_history, results_to_rows, sweep
+
+    batch, winners, settled_at = asyncio.run(load_history())
+    if not len(batch) or not winners:
+        print("[yellow]No snapshots or results to sweep over.[/yellow]")
+        raise typer.Exit(code=1)
+    results = sweep(
+        batch,
+        winners,
+        settled_at=settled_at,
+        alphas=_csv(alphas, float),
+        windows=_csv(windows, int),
+        weightings=_csv(weightings, str.strip),
+        rank_by=rank_by,
+        workers=workers or None,
+        kelly_fraction=kelly_fraction,
+        max_cap=max_cap,
+        edge_threshold=edge_threshold,
+    )
+    shown = results[:top] if top else results
+    if as_json:
+        print(json.dumps(results_to_rows(shown), indent=2))
+    else:
+        for row in shown:
+            print(str(row))
+
+
+@app.command(help="Monte Carlo bankroll simulation of `recommend` output.")
+def simulate(
+    source: str = typer.Argument(
+        "-", help="JSON from `recommend` (one object or a list); '-' = stdin"
+    ),
+    kelly_fraction: float = typer.Option(0.5, help="Kelly multiplier to test"),
+    max_cap: float = typer.Option(0.10, help="Per-outcome stake cap to test"),
+    edge_threshold: float = typer.Option(0.02, help="Minimum edge to bet"),
+    paths: int = typer.Option(100_000, help="Number of bankroll paths"),
+    rounds: int = typer.Option(100, help="Slate settlements per path"),
+    ruin_level: float = typer.Option(0.1, help="Bankroll fraction counted as ruin"),
+    workers: int = typer.Option(0, help="Worker processes (0 = one per CPU)"),
+    seed: Optional[int] = typer.Option(None, help="RNG seed for reproducible runs"),
+):
+    from app.simulation import simulate as run_simulation
+    from app.simulation import slate_from_recommendations
+
+    raw = sys.stdin.read() if source == "-" else Path(source).read_text()
+    slate = slate_from_recommendations(
+        json.loads(raw),
+        kelly_fraction=kelly_fraction,
+        max_cap=max_cap,
+        edge_threshold=edge_threshold,
+    )
+    result = run_simulation(
+        slate,
+        n_paths=paths,
+        n_rounds=rounds,
+        ruin_level=ruin_level,
+        workers=workers or None,
+        seed=seed,
+    )
+    print(result.summary())
+
+
+@app.command(help="Replay stored odds/prices/results and report PnL.")
+def replay(
+    since: datetime = typer.Option(None, help="Start of the replay window"),
+    until: datetime = typer.Option(None, help="End of the replay window"),
+    bankroll: float = typer.Option(1_000.0, help="Starting bankroll"),
+    alpha: float = typer.Option(0.6, help="EWMA smoothing factor"),
+    kelly_fraction: float = typer.Option(0.5, help="Kelly multiplier"),
+    max_cap: float = typer.Option(0.10, help="Per-outcome stake cap"),
+    edge_threshold: float = typer.Option(0.02, help="Minimum edge to bet"),
+    curve: bool = typer.Option(False, help="Also print the PnL/exposure curve"),
+):
+    from app.replay import replay as run_replay
+
+    result = asyncio.run(
+        run_replay(
+            since=since,
+            until=until,
+            bankroll=bankroll,
+            alpha=alpha,
+            kelly_fraction=kelly_fraction,
+            max_cap=max_cap,
+            edge_threshold=edge_threshold,
+        )
+    )
+    print(result.summary())
+    if curve:
+        for point in result.curve:
+            print(
+                f"{point.ts:%Y-%m-%d %H:%M}  equity={point.equity:,.2f}  "
+                f"pnl={point.realised_pnl:+,.2f}  exposure={point.exposure:,.2f}"
+            )
+
+
 @app.command(help="Run background scheduler (Ctrl+C to stop).")
 def scheduler():
     from app.scheduler import run as run_scheduler
@@ -1,5 +1,8 @@
-from sqlalchemy import Integer
-from sqlalchemy.orm import mapped_column
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
 
@@ -43,6 +46,22 @@ class PolyPrices(Base):
     id = mapped_column(Integer, primary_key=True)
 
 
+class Results(Base):
+    """
+    Settled outcomes, one row per (fixture, outcome) with the fixture's winner.
+
+    `settled_at` drives the incremental provider-metrics fold.  Existing
+    databases need it added (see README, "Database migrations").
+    """
+
+    __tablename__ = "results"
+
+    fixture_id: Mapped[str] = mapped_column(String, primary_key=True)
+    outcome: Mapped[str] = mapped_column(String, primary_key=True)
+    winner: Mapped[str] = mapped_column(String, nullable=False)
+    settled_at: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True)
+
+
 class Recommendations(Base):
     """Betting recommendations table"""
 
@@ -52,8 +71,38 @@ class Recommendations(Base):
 
 
 class ProviderMetrics(Base):
-    """Metrics about providers performance"""
+    """Metrics about providers performance (lifetime, folded incrementally)"""
 
     __tablename__ = "provider_metrics"
 
-    id = mapped_column(Integer, primary_key=True)
+    provider_id: Mapped[str] = mapped_column(String, primary_key=True)
+    brier_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    n_obs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    brier_score: Mapped[Optional[float]] = mapped_column(Float)
+    # Settlement window of the run that last touched this provider
+    last_settled_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+
+class MetricsWatermark(Base):
+    """
+    High-water marks of incremental jobs: results settled at or before
+    `settled_at` are already folded in (one row per job `name`).
+    """
+
+    __tablename__ = "metrics_watermark"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    settled_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class EwmaState(Base):
+    """Checkpointed incremental EWMA state (see app.polymarket.smoothing)"""
+
+    __tablename__ = "ewma_state"
+
+    fixture_id: Mapped[str] = mapped_column(String, primary_key=True)
+    provider_id: Mapped[str] = mapped_column(String, primary_key=True)
+    outcome: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[float] = mapped_column(Float, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -0,0 +1,73 @@
+"""
+Shared aiohttp connection pool for providers and the Polymarket client.
+
+One `ClientSession` (and its keep-alive `TCPConnector` with DNS caching and
+connection limits) is kept per event loop, so repeated requests reuse warm
+TCP/TLS connections instead of handshaking each time.  aiohttp sessions are
+bound to the loop that created them, hence the per-loop bookkeeping.
+
+Call `await close_pool()` on shutdown of the loop that used it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+
+import aiohttp
+
+
+class HttpPool:
+    """Lazily creates one pooled `ClientSession` per running event loop."""
+
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        ttl_dns_cache: int = 300,
+        keepalive_timeout: float = 30.0,
+        timeout: float = 10.0,
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._sessions: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, aiohttp.ClientSession
+        ] = weakref.WeakKeyDictionary()
+
+    async def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def close(self) -> None:
+        """Close the session belonging to the running loop (if any)."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+
+_POOL = HttpPool()
+
+
+def get_pool() -> HttpPool:
+    return _POOL
+
+
+async def close_pool() -> None:
+    await _POOL.close()
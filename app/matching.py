@@ -0,0 +1,338 @@
+"""
+Fixture ↔ Polymarket market matching.
+
+Provider fixture ids and Polymarket slugs never coincide, so we resolve them
+offline and keep the result as a plain dict:
+
+1. Index Polymarket sports markets into blocks keyed by (sport, kickoff date).
+2. For each provider event, score only the markets in its block (±1 day for
+   time-zone slop) with `rapidfuzz` on normalised team names.
+3. Assign pairs greedily by score (each event / market used once).
+4. Persist `{fixture_id: [slug, kickoff]}` as JSON; pipeline lookups are
+   then O(1) dict hits via `resolve_market_slug`.  Fixtures that kicked off
+   more than `MARKET_MAP_RETENTION_DAYS` ago are pruned on every refresh,
+   and readers reload the file when another process rewrites it.
+
+Blocking keeps the work close to linear in the number of events instead of
+scoring every event against every market.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from rapidfuzz import fuzz
+
+from app.logging_config import logger
+from app.polymarket.client import fetch_sports_markets
+from app.providers import get_active_providers
+
+_STOPWORDS = {"fc", "cf", "afc", "sc", "ac", "cd", "the"}
+_VERSUS = re.compile(r"\s+(?:vs\.?|v\.?|@|at)\s+", re.IGNORECASE)
+_MAP_PATH = ".cache/market_map.json"
+_RETENTION_DAYS = 7.0
+
+
+# --------------------------------------------------------------------------- #
+#  Data containers                                                            #
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True, frozen=True)
+class EventInfo:
+    event_id: str
+    sport: Optional[str]
+    kickoff: datetime
+    home: str
+    away: str
+
+
+@dataclass(slots=True, frozen=True)
+class MarketInfo:
+    slug: str
+    sport: Optional[str]
+    kickoff: datetime
+    title: str
+
+
+# --------------------------------------------------------------------------- #
+#  Normalisation                                                              #
+# --------------------------------------------------------------------------- #
+def normalise_team(name: str) -> str:
+    """ASCII-fold, lowercase, drop punctuation and club suffixes ("FC"…)."""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore")
+    tokens = re.findall(r"[a-z0-9]+", ascii_name.decode().lower())
+    return " ".join(t for t in tokens if t not in _STOPWORDS)
+
+
+def _sport_group(sport: Optional[str]) -> Optional[str]:
+    """`soccer_epl` → `soccer`; `None`/empty stays `None`."""
+    if not sport:
+        return None
+    return sport.lower().split("_")[0]
+
+
+def _parse_ts(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if ts.tzinfo is not None:  # compare everything as naive UTC
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def event_from_feed(event: Mapping[str, Any]) -> Optional[EventInfo]:
+    """Odds-API-style event (`home_team`, `away_team`, `commence_time`)."""
+    kickoff = _parse_ts(event.get("commence_time"))
+    if kickoff is None or not event.get("home_team") or not event.get("away_team"):
+        return None
+    return EventInfo(
+        event_id=str(event.get("id")),
+        sport=_sport_group(event.get("sport_key")),
+        kickoff=kickoff,
+        home=normalise_team(event["home_team"]),
+        away=normalise_team(event["away_team"]),
+    )
+
+
+def market_from_gql(market: Mapping[str, Any]) -> Optional[MarketInfo]:
+    """Polymarket market (`slug`, `title`, `startDate`, `category`)."""
+    kickoff = _parse_ts(market.get("startDate"))
+    if kickoff is None or not market.get("slug") or not market.get("title"):
+        return None
+    return MarketInfo(
+        slug=market["slug"],
+        sport=_sport_group(market.get("category")),
+        kickoff=kickoff,
+        title=market["title"],
+    )
+
+
+# --------------------------------------------------------------------------- #
+#  Matcher                                                                    #
+# --------------------------------------------------------------------------- #
+def _score(event: EventInfo, market: MarketInfo) -> float:
+    sides = _VERSUS.split(market.title.rstrip("?"), maxsplit=1)
+    if len(sides) == 2:
+        home, away = normalise_team(sides[0]), normalise_team(sides[1])
+        straight = fuzz.token_sort_ratio(event.home, home) + fuzz.token_sort_ratio(
+            event.away, away
+        )
+        swapped = fuzz.token_sort_ratio(event.home, away) + fuzz.token_sort_ratio(
+            event.away, home
+        )
+        return max(straight, swapped) / 2
+    # Free-form title ("Will Arsenal beat Chelsea?") – bag-of-words match
+    return fuzz.token_set_ratio(
+        f"{event.home} {event.away}", normalise_team(market.title)
+    )
+
+
+def match_events(
+    events: Iterable[EventInfo],
+    markets: Iterable[MarketInfo],
+    *,
+    min_score: float = 85.0,
+    max_kickoff_drift: timedelta = timedelta(hours=12),
+) -> Dict[str, str]:
+    """
+    Return `{event_id: slug}` for confident matches.
+
+    Markets are blocked by (sport, kickoff date); markets without a known
+    sport share a sport-agnostic block for that date.
+    """
+    blocks: Dict[Tuple[Optional[str], date], List[MarketInfo]] = defaultdict(list)
+    for market in markets:
+        blocks[(market.sport, market.kickoff.date())].append(market)
+
+    candidates: List[Tuple[float, str, str]] = []
+    for event in events:
+        day = event.kickoff.date()
+        for offset in (-1, 0, 1):
+            d = day + timedelta(days=offset)
+            for sport in {event.sport, None}:
+                for market in blocks.get((sport, d), ()):
+                    if abs(market.kickoff - event.kickoff) > max_kickoff_drift:
+                        continue
+                    score = _score(event, market)
+                    if score >= min_score:
+                        candidates.append((score, event.event_id, market.slug))
+
+    # Best pairs first; each event and each market is used at most once
+    candidates.sort(reverse=True)
+    mapping: Dict[str, str] = {}
+    taken: set[str] = set()
+    for _, event_id, slug in candidates:
+        if event_id in mapping or slug in taken:
+            continue
+        mapping[event_id] = slug
+        taken.add(slug)
+    return mapping
+
+
+# --------------------------------------------------------------------------- #
+#  Persistent mapping                                                         #
+# --------------------------------------------------------------------------- #
+class MarketMap:
+    """
+    `{fixture_id: slug}` held in memory and saved as JSON, together with each
+    fixture's kickoff so finished fixtures can be pruned.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._map: Dict[str, str] = {}
+        self._kickoffs: Dict[str, datetime] = {}
+        self._mtime: Optional[float] = None
+        self.reload()
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return None
+
+    def reload(self) -> None:
+        """Read the file (entries are `[slug, kickoff]`, or a bare slug)."""
+        self._mtime = self._file_mtime()
+        if self._mtime is None:
+            return
+        try:
+            raw = json.loads(self.path.read_text())
+        except (OSError, ValueError) as exc:
+            logger.error(f"[matching] could not read {self.path}: {exc}")
+            return
+        self._map, self._kickoffs = {}, {}
+        for fixture_id, entry in raw.items():
+            if isinstance(entry, str):
+                self._map[fixture_id] = entry
+                continue
+            slug, kickoff = entry
+            self._map[fixture_id] = slug
+            ts = _parse_ts(kickoff)
+            if ts is not None:
+                self._kickoffs[fixture_id] = ts
+
+    def reload_if_changed(self) -> None:
+        """Pick up a file rewritten by another process (scheduler vs web)."""
+        if self._file_mtime() != self._mtime:
+            self.reload()
+
+    def get(self, fixture_id: str) -> Optional[str]:
+        return self._map.get(str(fixture_id))
+
+    def update(
+        self,
+        mapping: Mapping[str, str],
+        kickoffs: Optional[Mapping[str, datetime]] = None,
+    ) -> None:
+        self._map.update(mapping)
+        for fixture_id in mapping:
+            if kickoffs and fixture_id in kickoffs:
+                self._kickoffs[fixture_id] = kickoffs[fixture_id]
+
+    def prune(self, before: datetime) -> int:
+        """Drop fixtures that kicked off before `before` (naive UTC)."""
+        old = [f for f, kickoff in self._kickoffs.items() if kickoff < before]
+        for fixture_id in old:
+            self._map.pop(fixture_id, None)
+            del self._kickoffs[fixture_id]
+        return len(old)
+
+    def save(self) -> None:
+        """Atomic write (temp file + rename) so readers never see half a file."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            fixture_id: [slug, self._kickoffs[fixture_id].isoformat()]
+            if fixture_id in self._kickoffs
+            else slug
+            for fixture_id, slug in self._map.items()
+        }
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(payload, indent=0, sort_keys=True))
+        os.replace(tmp, self.path)
+        self._mtime = self._file_mtime()
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+
+_MARKET_MAP: Optional[MarketMap] = None
+
+
+def get_market_map() -> MarketMap:
+    global _MARKET_MAP
+    if _MARKET_MAP is None:
+        _MARKET_MAP = MarketMap(os.getenv("MARKET_MAP_PATH", _MAP_PATH))
+    else:
+        _MARKET_MAP.reload_if_changed()
+    return _MARKET_MAP
+
+
+def resolve_market_slug(fixture_id: str) -> str:
+    """Polymarket slug for a provider fixture (falls back to the id itself)."""
+    return get_market_map().get(fixture_id) or fixture_id
+
+
+async def refresh_market_map(
+    sports: Sequence[str] = ("soccer",),
+    providers: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, str]:
+    """
+    Re-index provider events and Polymarket markets, persist new matches and
+    prune fixtures that kicked off more than the retention period ago.
+    """
+    if providers is None:
+        providers = get_active_providers()
+
+    feeds = await asyncio.gather(
+        fetch_sports_markets(),
+        *(p.fetch_events(sport) for p in providers.values() for sport in sports),
+        return_exceptions=True,
+    )
+    raw_markets, raw_event_lists = feeds[0], feeds[1:]
+    if isinstance(raw_markets, BaseException):
+        logger.error(f"[matching] market listing failed: {raw_markets}")
+        return {}
+
+    markets = [m for m in map(market_from_gql, raw_markets) if m is not None]
+
+    # Match each provider on its own: slugs are one-to-one *within* a
+    # provider, but every provider's id for the same game needs the slug.
+    per_provider = max(len(sports), 1)
+    events: Dict[str, EventInfo] = {}
+    mapping: Dict[str, str] = {}
+    for i in range(0, len(raw_event_lists), per_provider):
+        provider_events = {
+            info.event_id: info
+            for raw in raw_event_lists[i : i + per_provider]
+            if not isinstance(raw, BaseException)
+            for info in map(event_from_feed, raw)
+            if info is not None
+        }
+        events.update(provider_events)
+        mapping.update(match_events(provider_events.values(), markets))
+
+    market_map = get_market_map()
+    market_map.update(mapping, {e: events[e].kickoff for e in mapping})
+    retention = float(os.getenv("MARKET_MAP_RETENTION_DAYS", _RETENTION_DAYS))
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+        days=retention
+    )
+    pruned = market_map.prune(cutoff)
+    market_map.save()
+    logger.info(
+        f"[matching] {len(mapping)} of {len(events)} events matched, "
+        f"{pruned} finished pruned ({len(market_map)} mapped in total)"
+    )
+    return mapping
@@ -0,0 +1,206 @@
+"""
+Shared async collection stage for the CLI, web UI and scheduler.
+
+All active providers and (optionally) the Polymarket market are queried
+concurrently for a fixture.  Every call runs under its own timeout, so a slow
+or failing provider degrades to a *missing snapshot* instead of stalling the
+whole fixture:
+
+    quotes = await collect_fixture("123", market_fetcher=fetch_market_probs)
+    quotes.snapshots      # [ProviderSnapshot, …] – one per responsive provider
+    quotes.market_probs   # [{"outcome": str, "prob": float}, …]
+    quotes.missing        # ["prop_odds_api"] – providers that gave us nothing
+    quotes.market_error   # set when the Polymarket lookup itself failed
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional
+
+from app.logging_config import logger
+from app.polymarket.aggregation import OutcomeOdds, ProviderSnapshot
+from app.polymarket.client import MarketBatch
+from app.providers import get_active_providers
+from app.providers.base import OddsProvider
+
+PROVIDER_TIMEOUT = 8.0  # seconds allowed per provider / Polymarket call
+
+MarketFetcher = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+MarketBatchFetcher = Callable[[List[str]], Awaitable[MarketBatch]]
+
+
+# --------------------------------------------------------------------------- #
+#  Data containers                                                            #
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True)
+class FixtureQuotes:
+    fixture_id: str
+    snapshots: List[ProviderSnapshot] = field(default_factory=list)
+    market_probs: List[Dict[str, Any]] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    market_error: Optional[BaseException] = field(default=None, repr=False)
+
+
+# --------------------------------------------------------------------------- #
+#  Helpers                                                                    #
+# --------------------------------------------------------------------------- #
+def _to_snapshot(
+    provider: str, fixture_id: str, rows: List[Dict[str, Any]]
+) -> ProviderSnapshot:
+    return ProviderSnapshot(
+        provider=provider,
+        fixture_id=fixture_id,
+        ts=datetime.now(timezone.utc),
+        odds=[OutcomeOdds(r["outcome"], r["decimal_odds"]) for r in rows],
+    )
+
+
+async def _provider_snapshots(
+    name: str,
+    provider: OddsProvider,
+    fixture_ids: List[str],
+    timeout: float,
+    sport: str,
+    market: str,
+) -> Dict[str, ProviderSnapshot]:
+    """
+    One bulk provider call for all fixtures; a timeout or error yields `{}`.
+    """
+    try:
+        found = await asyncio.wait_for(
+            provider.fetch_many_fixtures(fixture_ids, sport, market), timeout
+        )
+    except TimeoutError:
+        logger.warning(f"[pipeline] {name} timed out after {timeout:.1f}s")
+        return {}
+    except Exception as exc:
+        logger.error(f"[pipeline] {name} failed: {exc}")
+        return {}
+
+    return {
+        fid: _to_snapshot(name, fid, rows) for fid, rows in found.items() if rows
+    }
+
+
+def _from_batch(batch: Any, slug: str) -> Any:
+    """
+    Per-fixture view of a batch result: rows, or the exception to record.
+    """
+    if isinstance(batch, BaseException):
+        return batch
+    if slug in batch.errors:
+        return RuntimeError(batch.errors[slug])
+    return batch.probs.get(slug, [])
+
+
+# --------------------------------------------------------------------------- #
+#  Public                                                                     #
+# --------------------------------------------------------------------------- #
+async def collect_fixtures(
+    fixture_ids: Iterable[str],
+    providers: Optional[Mapping[str, OddsProvider]] = None,
+    *,
+    market_fetcher: Optional[MarketFetcher] = None,
+    market_batch_fetcher: Optional[MarketBatchFetcher] = None,
+    market_slugs: Optional[Mapping[str, str]] = None,
+    sport: str = "soccer",
+    market: str = "h2h",
+    timeout: float = PROVIDER_TIMEOUT,
+) -> List[FixtureQuotes]:
+    """
+    Query every provider and Polymarket for `fixture_ids` at the same time.
+
+    * `providers` defaults to `get_active_providers()`.  Each provider is
+      asked once for the whole list via `fetch_many_fixtures`, so a cycle
+      costs one feed download per provider rather than one per fixture.
+    * `market_fetcher` (e.g. `fetch_market_probs`) is skipped when `None`;
+      it is called per fixture with `market_slugs[fixture_id]` or, failing
+      that, the fixture id itself.
+    * `market_batch_fetcher` (e.g. `fetch_many_market_probs`) replaces the
+      per-fixture calls with a single request for every resolved slug; the
+      batch's per-slug `errors` become each fixture's `market_error`.
+    * Provider failures are logged and reported in `missing`.  A failed
+      Polymarket lookup (including a timeout) only affects its own fixture:
+      that fixture's `market_probs` stays empty and `market_error` holds
+      the exception, while every other fixture keeps its results.
+
+    Results are returned in input order.
+    """
+    if market_fetcher is not None and market_batch_fetcher is not None:
+        raise ValueError("pass market_fetcher or market_batch_fetcher, not both")
+    if providers is None:
+        providers = get_active_providers()
+    fixture_ids = list(fixture_ids)
+    slugs = market_slugs or {}
+    wanted = [slugs.get(fid, fid) for fid in fixture_ids]
+
+    names = list(providers)
+    tasks: List[Awaitable[Any]] = [
+        _provider_snapshots(
+            name, providers[name], fixture_ids, timeout, sport, market
+        )
+        for name in names
+    ]
+    if market_batch_fetcher is not None:
+        tasks.append(asyncio.wait_for(market_batch_fetcher(wanted), timeout))
+    elif market_fetcher is not None:
+        tasks.extend(
+            asyncio.wait_for(market_fetcher(slug), timeout) for slug in wanted
+        )
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    by_provider = results[: len(names)]
+    market_results = results[len(names):]
+    if market_batch_fetcher is not None:
+        market_results = [
+            _from_batch(market_results[0], slug) for slug in wanted
+        ]
+
+    out: List[FixtureQuotes] = []
+    for i, fid in enumerate(fixture_ids):
+        quotes = FixtureQuotes(fixture_id=fid)
+        if market_results:
+            market_result = market_results[i]
+            if isinstance(market_result, BaseException):
+                logger.warning(
+                    f"[pipeline] Polymarket failed for {fid}: {market_result}"
+                )
+                quotes.market_error = market_result
+            else:
+                quotes.market_probs = list(market_result or [])
+        for name, snaps in zip(names, by_provider):
+            snap = snaps.get(fid)  # type: ignore[union-attr]
+            if snap is None:
+                quotes.missing.append(name)
+            else:
+                quotes.snapshots.append(snap)
+        out.append(quotes)
+    return out
+
+
+async def collect_fixture(
+    fixture_id: str,
+    providers: Optional[Mapping[str, OddsProvider]] = None,
+    *,
+    market_fetcher: Optional[MarketFetcher] = None,
+    market_slug: Optional[str] = None,
+    timeout: float = PROVIDER_TIMEOUT,
+) -> FixtureQuotes:
+    """
+    Single-fixture form of `collect_fixtures`.  Polymarket errors propagate
+    here, since nothing downstream can run without market prices.
+    """
+    slugs = {fixture_id: market_slug} if market_slug else None
+    quotes = await collect_fixtures(
+        [fixture_id],
+        providers,
+        market_fetcher=market_fetcher,
+        market_slugs=slugs,
+        timeout=timeout,
+    )
+    if quotes[0].market_error is not None:
+        raise quotes[0].market_error
+    return quotes[0]
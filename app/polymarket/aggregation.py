@@ -9,12 +9,15 @@ from __future__ import annotations
 
 from collections import defaultdict
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict, Iterable, List, Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import math
+import numpy as np
 import pandas as pd
 
+from .devig import DevigMethod, devig
+
 
 # --------------------------------------------------------------------------- #
 #  Data containers                                                             #
@@ -43,30 +46,48 @@ def decimal_to_implied(decimal_odds: float) -> float:
     return 1.0 / decimal_odds
 
 
-def normalise_snapshot(snapshot: ProviderSnapshot) -> Dict[str, float]:
+def normalise_snapshot(
+    snapshot: ProviderSnapshot,
+    method: DevigMethod = "proportional",
+) -> Dict[str, float]:
     """
     Return a dict {outcome: normalised_prob} that sums to 1.0 for this provider.
-    Also returns overround separately if caller needs it.
+    `method` selects how the overround is removed (see `app.polymarket.devig`).
     """
     implied = {o.outcome: decimal_to_implied(o.decimal_odds) for o in snapshot.odds}
     total = sum(implied.values())
     if math.isclose(total, 0.0):
         raise ValueError("Snapshot total implied prob is zero.")
-    return {k: v / total for k, v in implied.items()}
+    if method == "proportional":
+        return {k: v / total for k, v in implied.items()}
+    fair = devig(np.fromiter(implied.values(), dtype=float), method=method)
+    return dict(zip(implied, fair.tolist()))
 
 
 def ewma_probs(
     history: List[Dict[str, float]],
     alpha: float = 0.6,
+    *,
+    times: Optional[Sequence[datetime]] = None,
+    half_life: Optional[timedelta] = None,
 ) -> Dict[str, float]:
     """
     Exponentially-weighted moving average of a list of probability dicts.
     Each newer dict has higher weight.  Keys (outcomes) are unioned.
+
+    With `half_life` (and one timestamp per dict in `times`) the decay is in
+    wall-clock time instead of list position: each dict is weighted by
+    ``0.5 ** (age / half_life)`` relative to the newest one, so the result
+    does not depend on how often the provider was polled.
     """
     if not 0.0 < alpha <= 1.0:
         raise ValueError("alpha must be in (0, 1]")
     if not history:
         return {}
+    if half_life is not None:
+        if times is None or len(times) != len(history):
+            raise ValueError("half_life needs one timestamp per history entry")
+        return _decay_weighted(history, times, half_life.total_seconds())
 
     # Initialise with the oldest snapshot
     smoothed: Dict[str, float] = dict(history[0])
@@ -79,6 +100,26 @@ def ewma_probs(
     return {k: v / total for k, v in smoothed.items()}
 
 
+def _decay_weighted(
+    history: Sequence[Dict[str, float]],
+    times: Sequence[datetime],
+    half_life: float,
+) -> Dict[str, float]:
+    if half_life <= 0:
+        raise ValueError("half_life must be positive")
+    latest = max(times)
+    num: Dict[str, float] = defaultdict(float)
+    den: Dict[str, float] = defaultdict(float)
+    for ts, probs in zip(times, history):
+        w = 0.5 ** ((latest - ts).total_seconds() / half_life)
+        for outcome, p in probs.items():
+            num[outcome] += w * p
+            den[outcome] += w
+    smoothed = {k: num[k] / den[k] for k in num}
+    total = sum(smoothed.values())
+    return {k: v / total for k, v in smoothed.items()}
+
+
 def aggregate_providers(
     provider_probs: Dict[str, Dict[str, float]],
     weights: Optional[Dict[str, float]] = None,
@@ -112,31 +153,300 @@ def aggregate_providers(
 #  Convenience wrapper                                                         #
 # --------------------------------------------------------------------------- #
 def snapshots_to_true_probs(
-    snapshots: Iterable[ProviderSnapshot],
+    snapshots: Union[Iterable[ProviderSnapshot], "SnapshotBatch"],
     history_window: int = 3,
     alpha: float = 0.6,
     weights: Optional[Dict[str, float]] = None,
+    method: DevigMethod = "proportional",
+    half_life: Optional[timedelta] = None,
+    max_age: Optional[timedelta] = None,
 ) -> Dict[str, float]:
     """
     Full pipeline:
 
-    1. Normalise each snapshot.
+    1. Normalise each snapshot (de-vig with `method`).
     2. EWMA-smooth per provider over the last `history_window` snapshots.
     3. Weighted average across providers → “true” probability estimate.
+
+    With `half_life`, step 2 decays by snapshot age instead (see
+    `ewma_probs`) and the window is by age: snapshots older than `max_age`
+    (default 5 half-lives) before the newest snapshot are dropped, and
+    `history_window` is ignored.
     """
-    by_provider: Dict[str, List[Dict[str, float]]] = defaultdict(list)
-    for snap in snapshots:
-        by_provider[snap.provider].append(normalise_snapshot(snap))
+    by_provider: Dict[str, List[Tuple[datetime, Dict[str, float]]]] = defaultdict(
+        list
+    )
+    if method != "proportional" and not isinstance(snapshots, SnapshotBatch):
+        # Iterative methods are solved for all snapshots at once
+        snapshots = SnapshotBatch.from_snapshots(snapshots)
+    if isinstance(snapshots, SnapshotBatch):
+        for provider, _, ts, probs in snapshots.iter_normalised(method):
+            by_provider[provider].append((ts, probs))
+    else:
+        for snap in snapshots:
+            by_provider[snap.provider].append((snap.ts, normalise_snapshot(snap)))
 
-    # Keep only last N per provider, then smooth
-    provider_smoothed: Dict[str, Dict[str, float]] = {
-        p: ewma_probs(hist[-history_window:], alpha=alpha)
-        for p, hist in by_provider.items()
-    }
+    provider_smoothed: Dict[str, Dict[str, float]]
+    if half_life is None:
+        # Keep only last N per provider, then smooth
+        provider_smoothed = {
+            p: ewma_probs([probs for _, probs in hist[-history_window:]], alpha=alpha)
+            for p, hist in by_provider.items()
+        }
+    else:
+        if not by_provider:
+            return {}
+        latest = max(ts for hist in by_provider.values() for ts, _ in hist)
+        cutoff = latest - (max_age if max_age is not None else 5 * half_life)
+        provider_smoothed = {}
+        for p, hist in by_provider.items():
+            recent = [(ts, probs) for ts, probs in hist if ts >= cutoff]
+            if recent:
+                provider_smoothed[p] = ewma_probs(
+                    [probs for _, probs in recent],
+                    times=[ts for ts, _ in recent],
+                    half_life=half_life,
+                )
 
     return aggregate_providers(provider_smoothed, weights=weights)
 
 
+# --------------------------------------------------------------------------- #
+#  Columnar batches                                                            #
+# --------------------------------------------------------------------------- #
+def _code_dtype(n: int) -> np.dtype:
+    """Smallest signed int holding `n` codes (same rule as pandas categoricals)."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def naive_utc_us(ts: Sequence[Any]) -> np.ndarray:
+    """Datetimes (or ISO strings) → naive UTC `datetime64[us]`."""
+    series = pd.to_datetime(pd.Series(ts, dtype=object), utc=True, format="ISO8601")
+    return series.dt.tz_localize(None).to_numpy(dtype="datetime64[us]")
+
+
+def _intern(values: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return codes.astype(_code_dtype(len(uniques)), copy=False), list(uniques)
+
+
+@dataclass(slots=True)
+class SnapshotBatch:
+    """
+    Struct-of-arrays form of many snapshots – one row per quoted outcome.
+
+    Strings are interned into small integer codes: `provider[i]` indexes
+    `providers`, `fixture[i]` indexes `fixtures`, `outcome[i]` indexes
+    `outcomes`.  `snapshot[i]` numbers the snapshot a quote belongs to; the
+    rows of one snapshot are adjacent and snapshots keep arrival order.
+    Timestamps are naive UTC `datetime64[us]`.
+
+    A quote costs ~30 bytes here versus several hundred as `OutcomeOdds`
+    objects or row dicts.
+    """
+
+    providers: List[str]
+    fixtures: List[str]
+    outcomes: List[str]
+    provider: np.ndarray
+    fixture: np.ndarray
+    snapshot: np.ndarray
+    ts: np.ndarray
+    outcome: np.ndarray
+    decimal_odds: np.ndarray
+
+    @classmethod
+    def from_snapshots(cls, snapshots: Iterable[ProviderSnapshot]) -> "SnapshotBatch":
+        providers: List[str] = []
+        fixtures: List[str] = []
+        ts: List[datetime] = []
+        outcomes: List[str] = []
+        odds: List[float] = []
+        snapshot: List[int] = []
+        for i, snap in enumerate(snapshots):
+            for o in snap.odds:
+                providers.append(snap.provider)
+                fixtures.append(snap.fixture_id)
+                ts.append(snap.ts)
+                outcomes.append(o.outcome)
+                odds.append(o.decimal_odds)
+                snapshot.append(i)
+        batch = cls.from_columns(providers, fixtures, ts, outcomes, odds)
+        # Snapshots can repeat (provider, fixture, ts); keep their own ids
+        if snapshot:
+            _, batch.snapshot = np.unique(snapshot, return_inverse=True)
+            batch.snapshot = batch.snapshot.astype(np.int32, copy=False)
+        return batch
+
+    @classmethod
+    def from_columns(
+        cls,
+        provider: Sequence[str],
+        fixture_id: Sequence[str],
+        ts: Sequence[datetime],
+        outcome: Sequence[str],
+        decimal_odds: Sequence[float],
+    ) -> "SnapshotBatch":
+        """
+        Build from parallel columns (e.g. DB rows).  Consecutive rows with the
+        same provider, fixture and ts form one snapshot.
+        """
+        p_codes, providers = _intern(provider)
+        f_codes, fixtures = _intern(fixture_id)
+        o_codes, outcomes = _intern(outcome)
+        return cls.from_codes(
+            providers,
+            fixtures,
+            outcomes,
+            p_codes,
+            f_codes,
+            naive_utc_us(ts),
+            o_codes,
+            np.asarray(decimal_odds, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_codes(
+        cls,
+        providers: List[str],
+        fixtures: List[str],
+        outcomes: List[str],
+        provider: np.ndarray,
+        fixture: np.ndarray,
+        ts: np.ndarray,
+        outcome: np.ndarray,
+        decimal_odds: np.ndarray,
+    ) -> "SnapshotBatch":
+        """
+        Build from already-interned code columns (e.g. filled chunk by chunk
+        from a DB cursor); snapshots are grouped as in `from_columns`.
+        """
+        n = len(provider)
+        change = np.ones(n, dtype=bool)
+        if n:
+            change[1:] = (
+                (np.diff(provider) != 0)
+                | (np.diff(fixture) != 0)
+                | (np.diff(ts) != np.timedelta64(0))
+            )
+        return cls(
+            providers=providers,
+            fixtures=fixtures,
+            outcomes=outcomes,
+            provider=provider.astype(_code_dtype(len(providers)), copy=False),
+            fixture=fixture.astype(_code_dtype(len(fixtures)), copy=False),
+            snapshot=(np.cumsum(change) - 1).astype(np.int32),
+            ts=ts,
+            outcome=outcome.astype(_code_dtype(len(outcomes)), copy=False),
+            decimal_odds=decimal_odds,
+        )
+
+    def __len__(self) -> int:
+        return len(self.decimal_odds)
+
+    @property
+    def n_snapshots(self) -> int:
+        return int(self.snapshot[-1]) + 1 if len(self) else 0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays (excludes the small code tables)."""
+        return sum(
+            a.nbytes
+            for a in (
+                self.provider,
+                self.fixture,
+                self.snapshot,
+                self.ts,
+                self.outcome,
+                self.decimal_odds,
+            )
+        )
+
+    def implied(self) -> np.ndarray:
+        """Vectorised `decimal_to_implied` over every quote."""
+        if np.any(self.decimal_odds <= 1.0):
+            raise ValueError("Decimal odds must be > 1.0")
+        return 1.0 / self.decimal_odds
+
+    def normalised(self, method: DevigMethod = "proportional") -> np.ndarray:
+        """Per-quote fair probability, de-vigged within its snapshot."""
+        implied = self.implied()
+        if method == "proportional" or not len(self):
+            totals = np.bincount(
+                self.snapshot, weights=implied, minlength=self.n_snapshots
+            )
+            return implied / totals[self.snapshot]
+
+        # Pad to (snapshot, outcome slot) and solve every book in one call
+        starts = np.r_[0, np.flatnonzero(np.diff(self.snapshot)) + 1]
+        slot = np.arange(len(self)) - starts[self.snapshot]
+        books = np.zeros((self.n_snapshots, int(slot.max()) + 1))
+        mask = np.zeros(books.shape, dtype=bool)
+        books[self.snapshot, slot] = implied
+        mask[self.snapshot, slot] = True
+        return devig(books, mask, method=method)[self.snapshot, slot]
+
+    def iter_normalised(
+        self, method: DevigMethod = "proportional"
+    ) -> Iterator[Tuple[str, str, datetime, Dict[str, float]]]:
+        """Yield `(provider, fixture_id, ts, {outcome: prob})` per snapshot."""
+        probs = self.normalised(method)
+        bounds = np.flatnonzero(np.diff(self.snapshot)) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(self)]):
+            yield (
+                self.providers[self.provider[start]],
+                self.fixtures[self.fixture[start]],
+                self.ts[start].astype(datetime),
+                {
+                    self.outcomes[o]: float(p)
+                    for o, p in zip(self.outcome[start:stop], probs[start:stop])
+                },
+            )
+
+    def to_snapshots(self) -> List[ProviderSnapshot]:
+        bounds = np.flatnonzero(np.diff(self.snapshot)) + 1
+        return [
+            ProviderSnapshot(
+                provider=self.providers[self.provider[start]],
+                fixture_id=self.fixtures[self.fixture[start]],
+                ts=self.ts[start].astype(datetime),
+                odds=[
+                    OutcomeOdds(self.outcomes[o], float(d))
+                    for o, d in zip(
+                        self.outcome[start:stop], self.decimal_odds[start:stop]
+                    )
+                ],
+            )
+            for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(self)])
+            if stop > start
+        ]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Same columns as `snapshots_to_dataframe`, but string columns are
+        categoricals over the existing codes and `ts` stays naive UTC, so no
+        column is copied.  Use `snapshots_to_dataframe` for plain dtypes.
+        """
+
+        def _cat(codes: np.ndarray, labels: List[str]) -> pd.Categorical:
+            return pd.Categorical.from_codes(codes, categories=labels, validate=False)
+
+        return pd.DataFrame(
+            {
+                "provider": _cat(self.provider, self.providers),
+                "fixture_id": _cat(self.fixture, self.fixtures),
+                "ts": self.ts,
+                "outcome": _cat(self.outcome, self.outcomes),
+                "decimal_odds": self.decimal_odds,
+            },
+            copy=False,
+        )
+
+
 # --------------------------------------------------------------------------- #
 #  Optional helper: to/from pandas                                             #
 # --------------------------------------------------------------------------- #
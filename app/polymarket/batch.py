@@ -0,0 +1,271 @@
+"""
+Vectorised (NumPy) version of the aggregation pipeline for whole cycles.
+
+A cycle of snapshots is packed into a dense cube indexed by
+(fixture, provider, time, outcome), with a boolean mask for quotes that are
+missing.  De-vigging, EWMA smoothing and the weighted cross-provider average
+then run as array operations for every fixture at once:
+
+    cube = build_cube(snapshots, history_window=3)
+    probs = cube_true_probs(cube, alpha=0.6)      # (fixture, outcome) array
+
+Results match `snapshots_to_true_probs` fixture by fixture (up to float
+rounding).  Outcome slots are per fixture, so fixtures with different
+outcome labels (team names) don't widen each other's outcome axis.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .aggregation import ProviderSnapshot, SnapshotBatch
+from .devig import DevigMethod, devig
+
+Snapshots = Union[Iterable[ProviderSnapshot], SnapshotBatch]
+
+
+# --------------------------------------------------------------------------- #
+#  Data containers                                                            #
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True)
+class SnapshotCube:
+    """
+    `odds[f, p, t, o]` – decimal odds, NaN where no quote exists.
+
+    * `t` is right-aligned: the last slot holds each provider's newest
+      snapshot, shorter histories are padded on the left.
+    * `outcomes[f][o]` labels outcome slot `o` of fixture `f`.
+    """
+
+    fixtures: List[str]
+    providers: List[str]
+    outcomes: List[List[str]]
+    odds: np.ndarray
+
+    @property
+    def mask(self) -> np.ndarray:
+        return ~np.isnan(self.odds)
+
+
+def build_cube(
+    snapshots: Snapshots,
+    history_window: int = 3,
+) -> SnapshotCube:
+    """Pack snapshots into a `SnapshotCube` keeping the last `history_window`."""
+    if isinstance(snapshots, SnapshotBatch):
+        return _cube_from_batch(snapshots, history_window)
+
+    fixture_idx: Dict[str, int] = {}
+    provider_idx: Dict[str, int] = {}
+    series: Dict[Tuple[int, int], List[ProviderSnapshot]] = defaultdict(list)
+    for snap in snapshots:
+        f = fixture_idx.setdefault(snap.fixture_id, len(fixture_idx))
+        p = provider_idx.setdefault(snap.provider, len(provider_idx))
+        series[(f, p)].append(snap)
+
+    # Same slicing as `snapshots_to_true_probs`; outcome slots only come
+    # from snapshots inside the window.
+    windows = {fp: hist[-history_window:] for fp, hist in series.items()}
+    outcome_idx: List[Dict[str, int]] = [{} for _ in fixture_idx]
+    for (f, _), hist in windows.items():
+        for snap in hist:
+            for o in snap.odds:
+                outcome_idx[f].setdefault(o.outcome, len(outcome_idx[f]))
+
+    n_t = max((len(h) for h in windows.values()), default=0)
+    n_o = max((len(o) for o in outcome_idx), default=0)
+    odds = np.full((len(fixture_idx), len(provider_idx), n_t, n_o), np.nan)
+    for (f, p), hist in windows.items():
+        offset = n_t - len(hist)
+        slots = outcome_idx[f]
+        for t, snap in enumerate(hist, start=offset):
+            for o in snap.odds:
+                odds[f, p, t, slots[o.outcome]] = o.decimal_odds
+
+    return SnapshotCube(
+        fixtures=list(fixture_idx),
+        providers=list(provider_idx),
+        outcomes=[list(o) for o in outcome_idx],
+        odds=odds,
+    )
+
+
+def _rank_within(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Position of each element among equal keys (in array order), and group size."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_keys)) + 1]
+    sizes = np.diff(np.r_[starts, len(keys)])
+    pos = np.empty(len(keys), dtype=np.int64)
+    size = np.empty(len(keys), dtype=np.int64)
+    pos[order] = np.arange(len(keys)) - np.repeat(starts, sizes)
+    size[order] = np.repeat(sizes, sizes)
+    return pos, size
+
+
+def _cube_from_batch(batch: SnapshotBatch, history_window: int) -> SnapshotCube:
+    """`build_cube` for a `SnapshotBatch`, without per-quote Python loops."""
+    n_f, n_p = len(batch.fixtures), len(batch.providers)
+    if not len(batch):
+        return SnapshotCube(
+            fixtures=list(batch.fixtures),
+            providers=list(batch.providers),
+            outcomes=[[] for _ in range(n_f)],
+            odds=np.full((n_f, n_p, 0, 0), np.nan),
+        )
+
+    # Snapshot level: rank from the newest within each (fixture, provider)
+    first = np.r_[0, np.flatnonzero(np.diff(batch.snapshot)) + 1]
+    snap_f = batch.fixture[first].astype(np.int64)
+    snap_p = batch.provider[first].astype(np.int64)
+    pos, size = _rank_within(snap_f * n_p + snap_p)
+    from_end = size - 1 - pos
+    n_t = int(min(history_window, size.max()))
+    keep = from_end < history_window
+
+    # Quote level, inside the window only
+    q = keep[batch.snapshot]
+    f = batch.fixture[q].astype(np.int64)
+    p = batch.provider[q].astype(np.int64)
+    t = (n_t - 1 - from_end)[batch.snapshot[q]]
+    o = batch.outcome[q].astype(np.int64)
+
+    # Outcome slots per fixture in order of first appearance
+    n_codes = len(batch.outcomes)
+    fo = f * n_codes + o
+    uniq, first_idx = np.unique(fo, return_index=True)
+    by_arrival = uniq[np.argsort(first_idx, kind="stable")]
+    slot_of_key = np.empty(len(uniq), dtype=np.int64)
+    slot_of_key[np.searchsorted(uniq, by_arrival)] = _rank_within(
+        by_arrival // n_codes
+    )[0]
+    slot = slot_of_key[np.searchsorted(uniq, fo)]
+
+    outcomes: List[List[str]] = [[] for _ in range(n_f)]
+    for key in by_arrival:
+        outcomes[key // n_codes].append(batch.outcomes[key % n_codes])
+
+    n_o = max(len(x) for x in outcomes)
+    odds = np.full((n_f, n_p, n_t, n_o), np.nan)
+    odds[f, p, t, slot] = batch.decimal_odds[q]
+    return SnapshotCube(
+        fixtures=list(batch.fixtures),
+        providers=list(batch.providers),
+        outcomes=outcomes,
+        odds=odds,
+    )
+
+
+# --------------------------------------------------------------------------- #
+#  Kernels                                                                    #
+# --------------------------------------------------------------------------- #
+def devig_cube(
+    odds: np.ndarray,
+    mask: np.ndarray,
+    method: DevigMethod = "proportional",
+) -> np.ndarray:
+    """De-vig along the last axis (0 where masked); see `app.polymarket.devig`."""
+    if np.any(odds[mask] <= 1.0):
+        raise ValueError("Decimal odds must be > 1.0")
+    implied = np.where(mask, 1.0 / np.where(mask, odds, 1.0), 0.0)
+    return devig(implied, mask, method=method)
+
+
+def ewma_cube(
+    probs: np.ndarray, mask: np.ndarray, alpha: float = 0.6
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    EWMA over the time axis (-2) with the same rules as `ewma_probs`: an
+    outcome's first quote seeds its state, missing quotes leave it as is.
+
+    Returns `(smoothed, seen)` with shapes `probs.shape[:-2] + (O,)`;
+    `smoothed` is renormalised over the outcomes in `seen`.
+    """
+    if not 0.0 < alpha <= 1.0:
+        raise ValueError("alpha must be in (0, 1]")
+    state = np.zeros(probs.shape[:-2] + probs.shape[-1:])
+    seen = np.zeros(state.shape, dtype=bool)
+    for t in range(probs.shape[-2]):
+        x = probs[..., t, :]
+        m = mask[..., t, :]
+        blended = np.where(seen, alpha * x + (1 - alpha) * state, x)
+        state = np.where(m, blended, state)
+        seen |= m
+
+    state = np.where(seen, state, 0.0)
+    total = state.sum(axis=-1, keepdims=True)
+    smoothed = np.divide(state, total, out=np.zeros_like(state), where=total > 0)
+    return smoothed, seen
+
+
+def aggregate_cube(
+    smoothed: np.ndarray,
+    seen: np.ndarray,
+    provider_weights: np.ndarray,
+) -> np.ndarray:
+    """
+    Weighted average over the provider axis of `(F, P, O)` arrays, with
+    `(P,)` weights shared by every fixture or `(F, P)` per-fixture weights.
+
+    Returns `(F, O)` probabilities summing to 1 per fixture, NaN for outcome
+    slots no provider quoted.
+    """
+    w = np.broadcast_to(provider_weights, smoothed.shape[:2])
+    agg = np.einsum("fpo,fp->fo", smoothed, w)
+    quoted = seen.any(axis=1)
+    total = agg.sum(axis=-1, keepdims=True)
+    out = np.divide(agg, total, out=np.full_like(agg, np.nan), where=total > 0)
+    return np.where(quoted, out, np.nan)
+
+
+# --------------------------------------------------------------------------- #
+#  Convenience wrappers                                                       #
+# --------------------------------------------------------------------------- #
+def cube_true_probs(
+    cube: SnapshotCube,
+    alpha: float = 0.6,
+    weights: Optional[Union[Dict[str, float], np.ndarray]] = None,
+    method: DevigMethod = "proportional",
+) -> np.ndarray:
+    """
+    De-vig → EWMA → weighted average for every fixture in the cube.
+    `weights` is `{provider: weight}` or a `(fixtures, providers)` array in
+    cube order.
+    """
+    mask = cube.mask
+    probs = devig_cube(cube.odds, mask, method=method)
+    smoothed, seen = ewma_cube(probs, mask, alpha=alpha)
+    if weights is None:
+        w = np.ones(len(cube.providers))
+    elif isinstance(weights, np.ndarray):
+        w = weights
+    else:
+        w = np.array([weights.get(p, 0.0) for p in cube.providers], dtype=float)
+    return aggregate_cube(smoothed, seen, w)
+
+
+def batch_true_probs(
+    snapshots: Snapshots,
+    history_window: int = 3,
+    alpha: float = 0.6,
+    weights: Optional[Dict[str, float]] = None,
+    method: DevigMethod = "proportional",
+) -> Dict[str, Dict[str, float]]:
+    """
+    `{fixture_id: {outcome: prob}}` for a whole cycle in one call;
+    per fixture this equals `snapshots_to_true_probs` on its snapshots.
+    """
+    cube = build_cube(snapshots, history_window=history_window)
+    probs = cube_true_probs(cube, alpha=alpha, weights=weights, method=method)
+    return {
+        fixture: {
+            outcome: float(probs[f, o])
+            for o, outcome in enumerate(cube.outcomes[f])
+            if not np.isnan(probs[f, o])
+        }
+        for f, fixture in enumerate(cube.fixtures)
+    }
@@ -8,19 +8,26 @@ for this project, so we expose a single high-level function:
 
 Which returns something like:
     [{"outcome": "Yes", "prob": 0.43}, {"outcome": "No", "prob": 0.57}]
+
+For many markets at once use `fetch_many_market_probs(slugs)`, which packs
+the slugs into aliased GraphQL queries (one request per chunk) and reports
+failures per slug.
 """
 
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, List
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
 
 import aiohttp
-from aiolimiter import AsyncLimiter
+
+from app.http_pool import get_pool
+from app.providers.limits import RateBudget
 
 _POLY_URL = "https://www.polymarket.com/gql"
-_RATE_LIMITER = AsyncLimiter(1, 1)  # 1 request/second
-_SESSION: aiohttp.ClientSession | None = None
+_RATE_LIMITER = RateBudget(rate=1)  # 1 request/second, one limiter per loop
+_BATCH_SIZE = 50  # markets per aliased GraphQL request
 
 _QUERY = """
 query Market($slug: String!) {
@@ -36,13 +43,9 @@ query Market($slug: String!) {
 
 
 async def _get_session() -> aiohttp.ClientSession:
-    global _SESSION
-    if _SESSION is None or _SESSION.closed:
-        _SESSION = aiohttp.ClientSession(
-            headers={"content-type": "application/json"},
-            timeout=aiohttp.ClientTimeout(total=10),
-        )
-    return _SESSION
+    # Shared keep-alive pool (same connections as the odds providers);
+    # `json=` payloads set the content-type header per request.
+    return await get_pool().session()
 
 
 async def fetch_market_probs(slug: str) -> List[Dict[str, float]]:
@@ -54,23 +57,143 @@ async def fetch_market_probs(slug: str) -> List[Dict[str, float]]:
     """
     payload: Dict[str, Any] = {"query": _QUERY, "variables": {"slug": slug}}
 
-    async with _RATE_LIMITER:
-        session = await _get_session()
-        async with session.post(_POLY_URL, json=payload) as resp:
-            if resp.status != 200:
-                raise RuntimeError(
-                    f"Polymarket API error {resp.status}: {await resp.text()}"
-                )
-            data = await resp.json()
+    data = await _post(payload)
 
     try:
         outcomes = data["data"]["market"]["outcomes"]
     except (KeyError, TypeError):
         raise ValueError(f"Market slug '{slug}' not found or malformed response")
 
-    return [
-        {"outcome": o["name"], "prob": float(o["price"])} for o in outcomes
-    ]
+    return _parse_outcomes(outcomes)
+
+
+# --------------------------------------------------------------------------- #
+#  Batched lookups                                                            #
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True)
+class MarketBatch:
+    """Result of `fetch_many_market_probs`: prices and per-slug errors."""
+
+    probs: Dict[str, List[Dict[str, float]]] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+def _batch_query(n: int) -> str:
+    """Aliased query `m0: market(slug: $s0) {…} m1: …` for `n` slugs."""
+    params = ", ".join(f"$s{i}: String!" for i in range(n))
+    fields = "\n".join(
+        f"  m{i}: market(slug: $s{i}) {{ title outcomes {{ name price }} }}"
+        for i in range(n)
+    )
+    return f"query Markets({params}) {{\n{fields}\n}}"
+
+
+async def _fetch_chunk(slugs: List[str], batch: MarketBatch) -> None:
+    payload: Dict[str, Any] = {
+        "query": _batch_query(len(slugs)),
+        "variables": {f"s{i}": slug for i, slug in enumerate(slugs)},
+    }
+    try:
+        data = await _post(payload)
+    except (
+        RuntimeError, ValueError, aiohttp.ClientError, asyncio.TimeoutError
+    ) as exc:
+        # ValueError covers a non-JSON body (json.JSONDecodeError)
+        for slug in slugs:
+            batch.errors[slug] = str(exc) or type(exc).__name__
+        return
+
+    # GraphQL reports per-field problems in `errors[].path[0]` (our alias)
+    field_errors: Dict[str, str] = {}
+    for err in data.get("errors") or []:
+        path = err.get("path") or []
+        if path:
+            field_errors[str(path[0])] = err.get("message", "unknown error")
+
+    markets = data.get("data") or {}
+    for i, slug in enumerate(slugs):
+        alias = f"m{i}"
+        try:
+            batch.probs[slug] = _parse_outcomes(markets[alias]["outcomes"])
+        except (KeyError, TypeError, ValueError):
+            batch.errors[slug] = field_errors.get(
+                alias, f"Market slug '{slug}' not found or malformed response"
+            )
+
+
+async def fetch_many_market_probs(
+    slugs: Iterable[str],
+    chunk_size: int = _BATCH_SIZE,
+) -> MarketBatch:
+    """
+    Fetch outcomes + prices for many markets with aliased GraphQL queries.
+
+    Slugs are de-duplicated and sent `chunk_size` at a time; chunks run
+    concurrently (still behind the shared rate limiter).  One bad slug or a
+    failed chunk only marks the affected slugs in `MarketBatch.errors`.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    unique = list(dict.fromkeys(slugs))
+    batch = MarketBatch()
+    await asyncio.gather(
+        *(
+            _fetch_chunk(unique[i : i + chunk_size], batch)
+            for i in range(0, len(unique), chunk_size)
+        )
+    )
+    return batch
+
+
+# --------------------------------------------------------------------------- #
+#  Market discovery                                                           #
+# --------------------------------------------------------------------------- #
+_SPORTS_QUERY = """
+query SportsMarkets($tag: String!, $limit: Int!) {
+  markets(tag: $tag, active: true, limit: $limit) {
+    slug
+    title
+    category
+    startDate
+  }
+}
+"""
+
+
+async def fetch_sports_markets(
+    tag: str = "sports", limit: int = 500
+) -> List[Dict[str, Any]]:
+    """
+    List active markets under `tag`:
+    `[{'slug', 'title', 'category', 'startDate'}, …]`.
+    """
+    payload: Dict[str, Any] = {
+        "query": _SPORTS_QUERY,
+        "variables": {"tag": tag, "limit": limit},
+    }
+    data = await _post(payload)
+    try:
+        return list(data["data"]["markets"] or [])
+    except (KeyError, TypeError):
+        raise ValueError("Malformed markets response")
+
+
+# --------------------------------------------------------------------------- #
+#  Helpers                                                                    #
+# --------------------------------------------------------------------------- #
+async def _post(payload: Dict[str, Any]) -> Dict[str, Any]:
+    await _RATE_LIMITER.acquire()
+    session = await _get_session()
+    async with session.post(_POLY_URL, json=payload) as resp:
+        if resp.status != 200:
+            raise RuntimeError(
+                f"Polymarket API error {resp.status}: {await resp.text()}"
+            )
+        return await resp.json()  # type: ignore[no-any-return]
+
+
+def _parse_outcomes(outcomes: List[Dict[str, Any]]) -> List[Dict[str, float]]:
+    return [{"outcome": o["name"], "prob": float(o["price"])} for o in outcomes]
 
 
 # --------------------------------------------------------------------------- #
@@ -0,0 +1,295 @@
+"""
+Push-based Polymarket price feed with an in-memory price store.
+
+A `PriceFeed` keeps one long-lived subscription open through a pluggable
+`Transport`, applies every price update to a `PriceStore`, and reconnects
+with exponential back-off when the connection drops.  Consumers read the
+latest prices straight from the store, with no I/O:
+
+    feed = PriceFeed(WebSocketTransport(url), slugs=["team-a-vs-team-b"])
+    feed.start()
+    fetcher = feed.market_fetcher(fallback=fetch_market_probs)
+    rows = await fetcher("team-a-vs-team-b")   # same shape as fetch_market_probs
+
+Push feeds only send *changes*, so a quiet market keeps old prices that are
+still current.  Freshness is therefore judged per subscription: while the
+feed's socket is up (aiohttp's heartbeat closes it when pongs stop) its
+slugs count as live whatever the age of their last change; once it drops,
+prices age out `max_age` seconds after the last sign of life.
+
+Messages are decoded by `parse_message`, which understands
+`{"slug", "outcome", "price"}` updates and `{"slug", "changes": [...]}`
+batches.  Pass your own `parser` for other wire formats.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import aiohttp
+
+from app.http_pool import get_pool
+from app.logging_config import logger
+
+MarketFetcher = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+
+
+# --------------------------------------------------------------------------- #
+#  Price store                                                                #
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True)
+class PriceUpdate:
+    slug: str
+    outcome: str
+    price: float
+    ts: float  # unix seconds
+
+
+class PriceStore:
+    """Latest price per (slug, outcome), plus subscription liveness."""
+
+    def __init__(self) -> None:
+        self._prices: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self._live: Set[str] = set()
+        # slug -> last time its subscription was known to be healthy
+        self._heard: Dict[str, float] = {}
+
+    def apply(self, update: PriceUpdate) -> None:
+        self._prices.setdefault(update.slug, {})[update.outcome] = (
+            update.price,
+            update.ts,
+        )
+
+    def mark_live(self, slugs: Iterable[str], ts: Optional[float] = None) -> None:
+        """Subscription for `slugs` is up (connected, or a message arrived)."""
+        now = time.time() if ts is None else ts
+        for slug in slugs:
+            self._live.add(slug)
+            self._heard[slug] = now
+
+    def mark_down(self, slugs: Iterable[str], ts: Optional[float] = None) -> None:
+        """Subscription for `slugs` dropped; prices start ageing from `ts`."""
+        now = time.time() if ts is None else ts
+        for slug in slugs:
+            self._live.discard(slug)
+            self._heard[slug] = now
+
+    def get(self, slug: str, max_age: Optional[float] = None) -> Dict[str, float]:
+        """
+        `{outcome: price}` for `slug`; empty if unknown or, with `max_age`,
+        if the slug's subscription is down and neither it nor any price
+        change has been heard of for `max_age` seconds.
+        """
+        book = self._prices.get(slug)
+        if not book:
+            return {}
+        if max_age is not None and slug not in self._live:
+            last = max(ts for _, ts in book.values())
+            last = max(last, self._heard.get(slug, last))
+            if last < time.time() - max_age:
+                return {}
+        return {outcome: price for outcome, (price, _) in book.items()}
+
+    def market_rows(
+        self, slug: str, max_age: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Same shape as `fetch_market_probs`: `[{'outcome', 'prob'}, …]`."""
+        return [
+            {"outcome": outcome, "prob": price}
+            for outcome, price in self.get(slug, max_age).items()
+        ]
+
+    def __contains__(self, slug: object) -> bool:
+        return slug in self._prices
+
+
+def parse_message(message: Any) -> List[PriceUpdate]:
+    """Decode one feed message (or a list of them) into price updates."""
+    if isinstance(message, list):
+        return [u for m in message for u in parse_message(m)]
+    if not isinstance(message, dict) or "slug" not in message:
+        return []
+
+    ts = float(message.get("ts") or time.time())
+    changes = message.get("changes")
+    if changes is None:
+        changes = [message] if "outcome" in message else []
+    try:
+        return [
+            PriceUpdate(message["slug"], c["outcome"], float(c["price"]), ts)
+            for c in changes
+        ]
+    except (KeyError, TypeError, ValueError):
+        logger.warning(f"[feed] malformed price message: {message!r}")
+        return []
+
+
+# --------------------------------------------------------------------------- #
+#  Transports                                                                 #
+# --------------------------------------------------------------------------- #
+class Transport(Protocol):
+    async def connect(self) -> None: ...
+
+    async def subscribe(self, slugs: Sequence[str]) -> None: ...
+
+    def messages(self) -> AsyncIterator[Any]: ...
+
+    async def close(self) -> None: ...
+
+
+class WebSocketTransport:
+    """JSON-over-WebSocket transport on the shared aiohttp pool."""
+
+    def __init__(self, url: str, heartbeat: float = 20.0) -> None:
+        self.url = url
+        self.heartbeat = heartbeat
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+
+    async def connect(self) -> None:
+        session = await get_pool().session()
+        self._ws = await session.ws_connect(self.url, heartbeat=self.heartbeat)
+
+    async def subscribe(self, slugs: Sequence[str]) -> None:
+        assert self._ws is not None, "connect() first"
+        await self._ws.send_json({"type": "subscribe", "markets": list(slugs)})
+
+    async def messages(self) -> AsyncIterator[Any]:
+        assert self._ws is not None, "connect() first"
+        async for msg in self._ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                yield json.loads(msg.data)
+            elif msg.type == aiohttp.WSMsgType.ERROR:
+                raise ConnectionError(f"WebSocket error: {self._ws.exception()}")
+        # Iterator ends when the server closes the socket
+
+    async def close(self) -> None:
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.close()
+        self._ws = None
+
+
+# --------------------------------------------------------------------------- #
+#  Feed                                                                       #
+# --------------------------------------------------------------------------- #
+class PriceFeed:
+    """Long-lived subscription that keeps a `PriceStore` current."""
+
+    def __init__(
+        self,
+        transport: Transport,
+        slugs: Iterable[str],
+        store: Optional[PriceStore] = None,
+        *,
+        parser: Callable[[Any], List[PriceUpdate]] = parse_message,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ) -> None:
+        self.transport = transport
+        self.slugs = list(slugs)
+        self.store = store or PriceStore()
+        self.parser = parser
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+        # Serialises the (re)subscribe in `run` with `subscribe` calls, so a
+        # slug added mid-connect is never missed by both
+        self._subscribe_lock = asyncio.Lock()
+
+    async def run(self) -> None:
+        """Consume updates forever, reconnecting with exponential back-off."""
+        delay = self.reconnect_delay
+        while True:
+            try:
+                await self.transport.connect()
+                async with self._subscribe_lock:
+                    await self.transport.subscribe(self.slugs)
+                    self.store.mark_live(self.slugs)
+                    self.connected.set()
+                delay = self.reconnect_delay
+                async for message in self.transport.messages():
+                    for update in self.parser(message):
+                        self.store.apply(update)
+                logger.warning("[feed] connection closed by server, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error(f"[feed] connection error: {exc}; retry in {delay:.0f}s")
+            finally:
+                if self.connected.is_set():
+                    self.store.mark_down(self.slugs)
+                self.connected.clear()
+                await self.transport.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def subscribe(self, slugs: Iterable[str]) -> None:
+        """
+        Add `slugs` to the subscription.  Slugs are sent on the live socket
+        straight away; otherwise the next (re)connect picks them up.
+        """
+        new = [s for s in dict.fromkeys(slugs) if s not in self.slugs]
+        if not new:
+            return
+        async with self._subscribe_lock:
+            self.slugs.extend(new)
+            if not self.connected.is_set():
+                return
+            try:
+                await self.transport.subscribe(new)
+            except Exception as exc:
+                # The read loop sees the broken socket and resubscribes all
+                logger.warning(f"[feed] subscribe {new} failed: {exc}")
+                return
+            self.store.mark_live(new)
+
+    def start(self) -> "asyncio.Task[None]":
+        """Run the feed as a background task on the running loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def market_fetcher(
+        self,
+        fallback: Optional[MarketFetcher] = None,
+        max_age: Optional[float] = None,
+    ) -> MarketFetcher:
+        """
+        Drop-in replacement for `fetch_market_probs` that reads the store.
+
+        Slugs the feed has no (fresh) prices for go to `fallback`, if given.
+        """
+
+        async def _fetch(slug: str) -> List[Dict[str, Any]]:
+            rows = self.store.market_rows(slug, max_age)
+            if rows or fallback is None:
+                return rows
+            return await fallback(slug)
+
+        return _fetch
@@ -0,0 +1,346 @@
+"""
+Stateful (incremental) smoothing of provider probabilities.
+
+`EwmaStore` keeps one EWMA state per (fixture, provider) and folds each new
+snapshot into it in O(outcomes), instead of re-normalising and re-smoothing
+the whole history on every refresh:
+
+    store = EwmaStore(alpha=0.6)
+    store.update(snapshot)            # as snapshots arrive
+    store.current("123")              # true probs, no history needed
+
+The state equals `ewma_probs` run over a provider's *entire* history (i.e.
+`snapshots_to_true_probs` with an unbounded `history_window`), since an EWMA
+already discounts old data geometrically.
+
+State can be checkpointed to the `ewma_state` table with `checkpoint()` and
+reloaded with `restore()` so it survives restarts.  A checkpoint rewrites only
+the fixtures updated or dropped since the previous one, so its cost follows
+the live fixtures rather than every fixture ever seen.
+
+`HalfLifeStore` is the wall-clock counterpart: each (fixture, provider) keeps
+a bounded, age-limited `DecayWindow` whose value equals `ewma_probs(...,
+half_life=...)` over the snapshots still in the window, updated in O(1)
+amortised time however often the provider is polled.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, insert, select
+
+from .aggregation import ProviderSnapshot, aggregate_providers, normalise_snapshot
+
+_Key = Tuple[str, str]  # (fixture_id, provider)
+
+
+class EwmaStore:
+    """Incremental EWMA state keyed by (fixture, provider)."""
+
+    def __init__(self, alpha: float = 0.6) -> None:
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self._state: Dict[_Key, Dict[str, float]] = {}
+        self._updated: Dict[_Key, datetime] = {}
+        self._providers: Dict[str, Set[str]] = defaultdict(set)
+        # Fixtures changed / forgotten since the last checkpoint
+        self._dirty: Set[str] = set()
+        self._dropped: Set[str] = set()
+
+    # ------------------------------------------------------------------ #
+    #  Updates                                                            #
+    # ------------------------------------------------------------------ #
+    def update(self, snapshot: ProviderSnapshot) -> None:
+        """Fold one snapshot into its (fixture, provider) state."""
+        probs = normalise_snapshot(snapshot)
+        key = (snapshot.fixture_id, snapshot.provider)
+        state = self._state.get(key)
+        if state is None:
+            self._state[key] = dict(probs)
+            self._providers[snapshot.fixture_id].add(snapshot.provider)
+        else:
+            a = self.alpha
+            for outcome, p in probs.items():
+                state[outcome] = a * p + (1 - a) * state.get(outcome, p)
+        self._updated[key] = snapshot.ts
+        self._dirty.add(snapshot.fixture_id)
+
+    def update_many(self, snapshots: Iterable[ProviderSnapshot]) -> None:
+        for snap in snapshots:
+            self.update(snap)
+
+    def drop(self, fixture_id: str) -> None:
+        """Forget a fixture (e.g. once it has settled)."""
+        for provider in self._providers.pop(fixture_id, set()):
+            self._state.pop((fixture_id, provider), None)
+            self._updated.pop((fixture_id, provider), None)
+        self._dirty.discard(fixture_id)
+        self._dropped.add(fixture_id)
+
+    # ------------------------------------------------------------------ #
+    #  Reads                                                              #
+    # ------------------------------------------------------------------ #
+    def provider_probs(self, fixture_id: str) -> Dict[str, Dict[str, float]]:
+        """Renormalised smoothed probabilities per provider for one fixture."""
+        out: Dict[str, Dict[str, float]] = {}
+        for provider in self._providers.get(fixture_id, ()):
+            state = self._state[(fixture_id, provider)]
+            total = sum(state.values())
+            out[provider] = {k: v / total for k, v in state.items()}
+        return out
+
+    def current(
+        self,
+        fixture_id: str,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, float]:
+        """Aggregated “true” probabilities for `fixture_id` (empty if unknown)."""
+        return aggregate_providers(self.provider_probs(fixture_id), weights=weights)
+
+    def fixtures(self) -> List[str]:
+        return list(self._providers)
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    # ------------------------------------------------------------------ #
+    #  Serialisation                                                      #
+    # ------------------------------------------------------------------ #
+    def pending(self) -> Tuple[Set[str], Set[str]]:
+        """(updated, dropped) fixtures since the last `mark_clean()`."""
+        return set(self._dirty), set(self._dropped)
+
+    def mark_clean(self) -> None:
+        self._dirty.clear()
+        self._dropped.clear()
+
+    def to_rows(self, fixtures: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """State rows, for every fixture or only those in `fixtures`."""
+        wanted = None if fixtures is None else set(fixtures)
+        return [
+            {
+                "fixture_id": fixture_id,
+                "provider_id": provider,
+                "outcome": outcome,
+                "value": value,
+                "updated_at": self._updated[(fixture_id, provider)],
+            }
+            for (fixture_id, provider), state in self._state.items()
+            if wanted is None or fixture_id in wanted
+            for outcome, value in state.items()
+        ]
+
+    def load_rows(self, rows: Iterable[Any]) -> None:
+        """Inverse of `to_rows` (accepts dicts or row objects)."""
+        for row in rows:
+            r = row if isinstance(row, dict) else row._mapping
+            key = (r["fixture_id"], r["provider_id"])
+            self._state.setdefault(key, {})[r["outcome"]] = r["value"]
+            self._updated[key] = r["updated_at"]
+            self._providers[key[0]].add(key[1])
+
+
+# --------------------------------------------------------------------------- #
+#  Wall-clock (half-life) smoothing                                           #
+# --------------------------------------------------------------------------- #
+_EPOCH = datetime(1970, 1, 1)
+_REBASE = 64.0  # half-lives between weight rebases (2**64 stays well in range)
+
+
+def _seconds(ts: datetime) -> float:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return (ts - _EPOCH).total_seconds()
+
+
+class DecayWindow:
+    """
+    Time-decayed mean of probability dicts over a rolling window.
+
+    Entries are weighted by ``0.5 ** (age / half_life)``; weights are kept
+    relative to a reference time so adding and evicting an entry are just
+    additions to running per-outcome sums.  The window holds at most
+    `maxlen` entries and drops those older than `max_age` seconds before
+    the newest one.
+    """
+
+    __slots__ = ("half_life", "max_age", "maxlen", "_items", "_ref", "_num", "_den")
+
+    def __init__(self, half_life: float, max_age: float, maxlen: int = 256) -> None:
+        if half_life <= 0:
+            raise ValueError("half_life must be positive")
+        self.half_life = half_life
+        self.max_age = max_age
+        self.maxlen = maxlen
+        self._items: Deque[Tuple[float, Dict[str, float]]] = deque()
+        self._ref: Optional[float] = None
+        self._num: Dict[str, float] = defaultdict(float)
+        self._den: Dict[str, float] = defaultdict(float)
+
+    def _weight(self, t: float) -> float:
+        assert self._ref is not None
+        return 2.0 ** ((t - self._ref) / self.half_life)
+
+    def _add(self, t: float, probs: Dict[str, float], sign: float) -> None:
+        w = sign * self._weight(t)
+        for outcome, p in probs.items():
+            self._num[outcome] += w * p
+            self._den[outcome] += w
+
+    def push(self, t: float, probs: Dict[str, float]) -> None:
+        """Add an observation at unix time `t` (expected in time order)."""
+        if self._ref is None:
+            self._ref = t
+        elif (t - self._ref) / self.half_life > _REBASE:
+            scale = 2.0 ** ((self._ref - t) / self.half_life)
+            for k in self._num:
+                self._num[k] *= scale
+                self._den[k] *= scale
+            self._ref = t
+
+        self._items.append((t, probs))
+        self._add(t, probs, 1.0)
+        while len(self._items) > self.maxlen:
+            self._pop()
+        self.evict_before(t - self.max_age)
+
+    def evict_before(self, cutoff: float) -> None:
+        """Drop entries older than unix time `cutoff`."""
+        while self._items and self._items[0][0] < cutoff:
+            self._pop()
+
+    def _pop(self) -> None:
+        old_t, old_probs = self._items.popleft()
+        if self._items:
+            self._add(old_t, old_probs, -1.0)
+        else:
+            self._num.clear()
+            self._den.clear()
+            self._ref = None
+
+    def value(self) -> Dict[str, float]:
+        if not self._items:
+            return {}
+        # Subtraction leaves ~0 weight behind for outcomes that left the window
+        floor = 1e-12 * self._weight(self._items[-1][0])
+        smoothed = {k: self._num[k] / d for k, d in self._den.items() if d > floor}
+        total = sum(smoothed.values())
+        return {k: v / total for k, v in smoothed.items()}
+
+    @property
+    def last_ts(self) -> Optional[float]:
+        return self._items[-1][0] if self._items else None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class HalfLifeStore:
+    """Streaming half-life smoother keyed by (fixture, provider)."""
+
+    def __init__(
+        self,
+        half_life: timedelta,
+        max_age: Optional[timedelta] = None,
+        maxlen: int = 256,
+    ) -> None:
+        self.half_life = half_life.total_seconds()
+        self.max_age = (max_age or 5 * half_life).total_seconds()
+        self.maxlen = maxlen
+        self._windows: Dict[_Key, DecayWindow] = {}
+        self._providers: Dict[str, Set[str]] = defaultdict(set)
+
+    def update(self, snapshot: ProviderSnapshot) -> None:
+        key = (snapshot.fixture_id, snapshot.provider)
+        window = self._windows.get(key)
+        if window is None:
+            window = DecayWindow(self.half_life, self.max_age, self.maxlen)
+            self._windows[key] = window
+            self._providers[snapshot.fixture_id].add(snapshot.provider)
+        window.push(_seconds(snapshot.ts), normalise_snapshot(snapshot))
+
+    def update_many(self, snapshots: Iterable[ProviderSnapshot]) -> None:
+        for snap in snapshots:
+            self.update(snap)
+
+    def drop(self, fixture_id: str) -> None:
+        for provider in self._providers.pop(fixture_id, set()):
+            self._windows.pop((fixture_id, provider), None)
+
+    def provider_probs(self, fixture_id: str) -> Dict[str, Dict[str, float]]:
+        """
+        Smoothed probabilities per provider, with every window trimmed to
+        `max_age` before the fixture's newest snapshot (providers left with
+        nothing are omitted).
+        """
+        windows = {
+            p: self._windows[(fixture_id, p)]
+            for p in self._providers.get(fixture_id, ())
+        }
+        if not windows:
+            return {}
+        latest = max(w.last_ts or 0.0 for w in windows.values())
+        out: Dict[str, Dict[str, float]] = {}
+        for p, w in windows.items():
+            w.evict_before(latest - self.max_age)
+            if len(w):
+                out[p] = w.value()
+        return out
+
+    def current(
+        self,
+        fixture_id: str,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, float]:
+        return aggregate_providers(self.provider_probs(fixture_id), weights=weights)
+
+    def fixtures(self) -> List[str]:
+        return list(self._providers)
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+# --------------------------------------------------------------------------- #
+#  DB checkpointing                                                           #
+# --------------------------------------------------------------------------- #
+async def checkpoint(store: EwmaStore, session: Any) -> None:
+    """
+    Upsert the fixtures updated since the last checkpoint and delete those
+    dropped from `store` (caller commits).
+    """
+    # app.db reads DB settings at import time; keep this module importable
+    # (and unit-testable) without them.
+    from app.db.models import EwmaState
+
+    updated, dropped = store.pending()
+    changed = sorted(updated | dropped)
+    # Delete + insert per fixture: portable, and a fixture's rows only grow
+    for i in range(0, len(changed), 500):
+        await session.execute(
+            delete(EwmaState).where(EwmaState.fixture_id.in_(changed[i : i + 500]))
+        )
+    rows = store.to_rows(updated)
+    if rows:
+        await session.execute(insert(EwmaState), rows)
+    store.mark_clean()
+
+
+async def restore(store: EwmaStore, session: Any) -> None:
+    """Load the last checkpoint from `ewma_state` into `store`."""
+    from app.db.models import EwmaState
+
+    result = await session.execute(
+        select(
+            EwmaState.fixture_id,
+            EwmaState.provider_id,
+            EwmaState.outcome,
+            EwmaState.value,
+            EwmaState.updated_at,
+        )
+    )
+    store.load_rows(result.all())
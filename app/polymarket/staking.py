@@ -7,7 +7,11 @@ Edge calculation and fractional-Kelly staking utilities.
 
 from __future__ import annotations
 
-from typing import Dict
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
 
 
 # --------------------------------------------------------------------------- #
@@ -94,3 +98,376 @@ def recommend(
             recs[outcome] = round(stake_frac * bankroll, 2)
 
     return recs
+
+
+# --------------------------------------------------------------------------- #
+#  Batch API                                                                  #
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True)
+class RecommendationTable:
+    """
+    Recommended rows only: `row[i]` indexes the input arrays, the other
+    columns are aligned with it.  `fixtures`/`outcomes` label those rows
+    when labels were passed in.
+    """
+
+    row: np.ndarray
+    p_true: np.ndarray
+    price: np.ndarray
+    edge: np.ndarray
+    stake_frac: np.ndarray
+    stake: np.ndarray
+    fixtures: Optional[np.ndarray] = None
+    outcomes: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.row)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        cols = {
+            "p_true": self.p_true,
+            "price": self.price,
+            "edge": self.edge,
+            "stake_frac": self.stake_frac,
+            "stake": self.stake,
+        }
+        if self.outcomes is not None:
+            cols = {"outcome": self.outcomes, **cols}
+        if self.fixtures is not None:
+            cols = {"fixture_id": self.fixtures, **cols}
+        return pd.DataFrame(cols, index=pd.Index(self.row, name="row"), copy=False)
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """`{fixture_id: {outcome: stake_units}}` (needs labels)."""
+        if self.fixtures is None or self.outcomes is None:
+            raise ValueError("table has no fixture/outcome labels")
+        out: Dict[str, Dict[str, float]] = {}
+        for fixture, outcome, stake in zip(
+            self.fixtures.tolist(), self.outcomes.tolist(), self.stake.tolist()
+        ):
+            out.setdefault(fixture, {})[outcome] = stake
+        return out
+
+
+def kelly_fractions(
+    p_true: np.ndarray,
+    price: np.ndarray,
+    *,
+    kelly_fraction: float = 0.5,
+    max_cap: float = 0.10,
+) -> np.ndarray:
+    """Vectorised `fractional_kelly` (no input validation)."""
+    p_true = np.asarray(p_true, dtype=float)
+    price = np.asarray(price, dtype=float)
+    live = price < 1.0
+    # f* = (p*(b+1) - 1) / b with b = 1/price - 1, i.e. (p - price) / (1 - price)
+    f_star = np.divide(
+        p_true - price, 1.0 - price, out=np.zeros_like(price), where=live
+    )
+    return np.clip(kelly_fraction * f_star, 0.0, max_cap)
+
+
+# Row labels: any sequence of strings, e.g. the arrays from `flatten_cycle`
+Labels = Union[Sequence[str], np.ndarray]
+
+
+def _labels(labels: Optional[Labels], row: np.ndarray) -> Optional[np.ndarray]:
+    return None if labels is None else np.asarray(labels, dtype=object)[row]
+
+
+def recommend_batch(
+    p_true: np.ndarray,
+    price: np.ndarray,
+    *,
+    fixtures: Optional[Labels] = None,
+    outcomes: Optional[Labels] = None,
+    edge_threshold: float = 0.02,
+    bankroll: float = 100.0,
+    kelly_fraction: float = 0.5,
+    max_cap: float = 0.10,
+) -> RecommendationTable:
+    """
+    `recommend` for a whole cycle: one row per (fixture, outcome) in
+    parallel arrays.  A NaN `price` means the market has no quote for that
+    outcome and the row is skipped.
+    """
+    p_true = np.asarray(p_true, dtype=float)
+    price = np.asarray(price, dtype=float)
+    if p_true.shape != price.shape:
+        raise ValueError("p_true and price must have the same shape")
+
+    edge = p_true - price
+    candidate = ~np.isnan(price) & (edge >= edge_threshold)
+    # Same validation as `fractional_kelly`, for the rows it would see
+    if np.any(candidate & ~((p_true > 0.0) & (p_true < 1.0))):
+        raise ValueError("p_true must be in (0,1)")
+    if np.any(candidate & (price <= 0.0)):
+        raise ValueError("price must be > 0")
+
+    stake_frac = np.zeros_like(p_true)
+    stake_frac[candidate] = kelly_fractions(
+        p_true[candidate],
+        price[candidate],
+        kelly_fraction=kelly_fraction,
+        max_cap=max_cap,
+    )
+    row = np.flatnonzero(stake_frac > 0.0)
+    return RecommendationTable(
+        row=row,
+        p_true=p_true[row],
+        price=price[row],
+        edge=edge[row],
+        stake_frac=stake_frac[row],
+        stake=np.round(stake_frac[row] * bankroll, 2),
+        fixtures=_labels(fixtures, row),
+        outcomes=_labels(outcomes, row),
+    )
+
+
+def flatten_cycle(
+    cycle: Mapping[str, Tuple[Mapping[str, float], Mapping[str, float]]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    `{fixture_id: (true_probs, market_probs)}` → `(fixtures, outcomes,
+    p_true, price)` arrays for `recommend_batch` (NaN price if unquoted).
+    """
+    fixtures, outcomes, p_true, price = [], [], [], []
+    for fixture_id, (true_probs, market_probs) in cycle.items():
+        for outcome, p in true_probs.items():
+            fixtures.append(fixture_id)
+            outcomes.append(outcome)
+            p_true.append(p)
+            price.append(market_probs.get(outcome, np.nan))
+    return (
+        np.asarray(fixtures, dtype=object),
+        np.asarray(outcomes, dtype=object),
+        np.asarray(p_true, dtype=float),
+        np.asarray(price, dtype=float),
+    )
+
+
+def recommend_many(
+    cycle: Mapping[str, Tuple[Mapping[str, float], Mapping[str, float]]],
+    **kwargs: float,
+) -> Dict[str, Dict[str, float]]:
+    """Per-fixture `recommend` results for a whole cycle in one vectorised pass."""
+    fixtures, outcomes, p_true, price = flatten_cycle(cycle)
+    table = recommend_batch(
+        p_true, price, fixtures=fixtures, outcomes=outcomes, **kwargs
+    )
+    return table.to_dict()
+
+
+# --------------------------------------------------------------------------- #
+#  Joint Kelly (mutually exclusive outcomes)                                  #
+# --------------------------------------------------------------------------- #
+# Exposure ceiling for the solver: keeps every wealth outcome ≥ 1 - cap > 0
+_MAX_SOLVER_EXPOSURE = 0.99
+
+
+def joint_kelly(
+    p_true: np.ndarray,
+    price: np.ndarray,
+    bettable: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Full-Kelly fractions for buying shares of mutually exclusive outcomes.
+
+    Rows (last axis) are fixtures: `p_true` is the outcome distribution,
+    `price` the cost of a $1 share (NaN = not quoted).  Closed form of
+    Smoczynski & Tomkins: take outcomes by expected return `p / price`
+    while it beats the reserve rate ``R = (1 - Σp) / (1 - Σprice)`` of the
+    outcomes already taken, then stake ``f_i = p_i - price_i * R``.
+    Works on any number of fixtures at once.
+    """
+    p = np.asarray(p_true, dtype=float)
+    c = np.asarray(price, dtype=float)
+    ok = ~np.isnan(c) & (c > 0.0) & (c < 1.0) & (p > 0.0)
+    if bettable is not None:
+        ok &= bettable
+
+    ret = np.where(ok, p / np.where(ok, c, 1.0), -np.inf)
+    order = np.argsort(-ret, axis=-1, kind="stable")
+    ret_s = np.take_along_axis(ret, order, axis=-1)
+    p_s = np.take_along_axis(np.where(ok, p, 0.0), order, axis=-1)
+    c_s = np.take_along_axis(np.where(ok, c, 0.0), order, axis=-1)
+
+    cum_p, cum_c = np.cumsum(p_s, axis=-1), np.cumsum(c_s, axis=-1)
+    prev_p, prev_c = cum_p - p_s, cum_c - c_s
+    reserve = np.divide(
+        1.0 - prev_p, 1.0 - prev_c, out=np.full_like(prev_p, np.inf), where=prev_c < 1.0
+    )
+    # Outcomes join in order while they beat the reserve rate of those before
+    member = np.cumprod((ret_s > reserve) & (cum_c < 1.0), axis=-1).astype(bool)
+
+    p_in = np.where(member, p_s, 0.0).sum(axis=-1, keepdims=True)
+    c_in = np.where(member, c_s, 0.0).sum(axis=-1, keepdims=True)
+    rate = (1.0 - p_in) / (1.0 - c_in)
+    f_s = np.where(member, np.maximum(p_s - c_s * rate, 0.0), 0.0)
+
+    f = np.empty_like(f_s)
+    np.put_along_axis(f, order, f_s, axis=-1)
+    return f
+
+
+def _log_growth(x: np.ndarray, p: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Expected log-wealth per fixture; `x` = shares bought per $ of bankroll."""
+    wealth = 1.0 - (c * x).sum(axis=-1, keepdims=True) + x
+    return (p * np.log(np.where(p > 0, wealth, 1.0))).sum(axis=-1)
+
+
+def _growth_grad(x: np.ndarray, p: np.ndarray, c: np.ndarray) -> np.ndarray:
+    wealth = 1.0 - (c * x).sum(axis=-1, keepdims=True) + x
+    ratio = np.where(p > 0, p / wealth, 0.0)
+    return ratio - c * ratio.sum(axis=-1, keepdims=True)
+
+
+def _project(y: np.ndarray, c: np.ndarray, ok: np.ndarray, cap: float) -> np.ndarray:
+    """Euclidean projection onto {x ≥ 0, x = 0 off `ok`, Σ c·x ≤ cap}."""
+    x = np.where(ok, np.maximum(y, 0.0), 0.0)
+    if (c * x).sum() <= cap:
+        return x
+    # x(λ) = max(0, y - λc) with Σ c·x(λ) = cap; bisection on λ ∈ [0, max y/c]
+    live = ok & (c > 0)
+    lo, hi = 0.0, float(np.max(np.where(live, y / np.where(live, c, 1.0), 0.0)))
+    for _ in range(100):
+        mid = 0.5 * (lo + hi)
+        if (c * np.where(ok, np.maximum(y - mid * c, 0.0), 0.0)).sum() > cap:
+            lo = mid
+        else:
+            hi = mid
+    return np.where(ok, np.maximum(y - hi * c, 0.0), 0.0)
+
+
+def _solve_capped(
+    p: np.ndarray,
+    c: np.ndarray,
+    ok: np.ndarray,
+    cap: float,
+    x0: np.ndarray,
+    *,
+    max_iter: int = 500,
+    tol: float = 1e-10,
+) -> np.ndarray:
+    """
+    Maximise Σ_fixtures E[log wealth] subject to total exposure ≤ `cap` by
+    projected gradient ascent with backtracking, in share space (`x = f/c`),
+    where the problem is far better conditioned than in stake space.
+    """
+    c = np.where(ok, c, 0.0)
+    x = _project(x0, c, ok, cap)
+    value = _log_growth(x, p, c).sum()
+    step = 1.0
+    for _ in range(max_iter):
+        grad = _growth_grad(x, p, c)
+        while True:
+            x_new = _project(x + step * grad, c, ok, cap)
+            d = x_new - x
+            new_value = _log_growth(x_new, p, c).sum()
+            if new_value >= value + (grad * d).sum() - (d * d).sum() / (2 * step):
+                break
+            step *= 0.5
+        x, value = x_new, new_value
+        if np.abs(d).max() < tol:
+            break
+        step *= 2.0
+    return x
+
+
+def optimise_slate(
+    p_true: np.ndarray,
+    price: np.ndarray,
+    bettable: Optional[np.ndarray] = None,
+    *,
+    kelly_fraction: float = 0.5,
+    max_exposure: float = 0.25,
+) -> np.ndarray:
+    """
+    Stake fractions `(fixtures, outcomes)` for a slate under a total
+    exposure cap ``Σ f ≤ max_exposure``.
+
+    This is the separable approximation: it maximises the *sum* of each
+    fixture's expected log-growth (as if the bets were placed one after
+    another), not the expected log of the joint wealth over all
+    combinations of concurrent results.  The unconstrained optimum is the
+    per-fixture closed form (`joint_kelly`); only when its (fractional)
+    total breaches the cap are the fixtures coupled through the cap and
+    solved iteratively, warm-started from it.
+    """
+    if not 0.0 < kelly_fraction <= 1.0:
+        raise ValueError("kelly_fraction must be in (0,1]")
+    p = np.atleast_2d(np.asarray(p_true, dtype=float))
+    c = np.atleast_2d(np.asarray(price, dtype=float))
+    ok = ~np.isnan(c) & (c > 0.0) & (c < 1.0) & (p > 0.0)
+    if bettable is not None:
+        ok &= np.atleast_2d(bettable)
+
+    f = joint_kelly(p, c, ok)
+    cap = min(max_exposure / kelly_fraction, _MAX_SOLVER_EXPOSURE)
+    if f.sum() > cap:
+        c0 = np.where(ok, c, 1.0)
+        x = _solve_capped(p, c, ok, cap, f / c0)
+        f = x * np.where(ok, c, 0.0)
+    return kelly_fraction * f
+
+
+def recommend_joint(
+    true_probs: Dict[str, float],
+    market_probs: Dict[str, float],
+    *,
+    edge_threshold: float = 0.02,
+    bankroll: float = 100.0,
+    kelly_fraction: float = 0.5,
+    max_exposure: float = 0.25,
+) -> Dict[str, float]:
+    """
+    Like `recommend`, but sizes all outcomes of the fixture jointly
+    (expected log-growth of the whole fixture) instead of one at a time.
+    """
+    return recommend_slate(
+        {"": (true_probs, market_probs)},
+        edge_threshold=edge_threshold,
+        bankroll=bankroll,
+        kelly_fraction=kelly_fraction,
+        max_exposure=max_exposure,
+    ).get("", {})
+
+
+def recommend_slate(
+    cycle: Mapping[str, Tuple[Mapping[str, float], Mapping[str, float]]],
+    *,
+    edge_threshold: float = 0.02,
+    bankroll: float = 100.0,
+    kelly_fraction: float = 0.5,
+    max_exposure: float = 0.25,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Stakes `{fixture_id: {outcome: stake_units}}` for concurrent fixtures:
+    outcomes sized jointly per fixture, fixtures coupled only through the
+    exposure cap (see `optimise_slate`).
+    """
+    fixtures = list(cycle)
+    labels = [list(cycle[f][0]) for f in fixtures]
+    n_o = max((len(o) for o in labels), default=0)
+    p = np.zeros((len(fixtures), n_o))
+    c = np.full((len(fixtures), n_o), np.nan)
+    for k, fixture in enumerate(fixtures):
+        true_probs, market_probs = cycle[fixture]
+        for j, outcome in enumerate(labels[k]):
+            p[k, j] = true_probs[outcome]
+            c[k, j] = market_probs.get(outcome, np.nan)
+    total = p.sum(axis=-1, keepdims=True)
+    p = np.divide(p, total, out=np.zeros_like(p), where=total > 0)
+
+    bettable = np.nan_to_num(p - c, nan=-np.inf) >= edge_threshold
+    stakes = np.round(
+        optimise_slate(
+            p, c, bettable, kelly_fraction=kelly_fraction, max_exposure=max_exposure
+        )
+        * bankroll,
+        2,
+    )
+    out: Dict[str, Dict[str, float]] = {}
+    for k, j in zip(*np.nonzero(stakes > 0.0)):
+        out.setdefault(fixtures[k], {})[labels[k][j]] = float(stakes[k, j])
+    return out
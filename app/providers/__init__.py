@@ -1,25 +1,62 @@
 from __future__ import annotations
 
-from typing import Dict
+from typing import Callable, Dict, Iterable, Optional
+
+from app.http_pool import close_pool
 
 from .odds_api import OddsAPIProvider
 from .prop_odds import PropOddsProvider
 from .base import OddsProvider
 
 
+class ProviderRegistry:
+    """
+    Long-lived provider instances.
+
+    Providers are built once, on first use, and reused by every caller; their
+    HTTP traffic goes through the shared pool in `app.http_pool`.
+    """
+
+    def __init__(
+        self,
+        factories: Iterable[Callable[[], OddsProvider]] = (
+            OddsAPIProvider,
+            PropOddsProvider,
+        ),
+    ) -> None:
+        self._factories = tuple(factories)
+        self._active: Optional[Dict[str, OddsProvider]] = None
+
+    def active(self) -> Dict[str, OddsProvider]:
+        """Mapping {provider_name: provider_instance} of keyed providers."""
+        if self._active is None:
+            active: Dict[str, OddsProvider] = {}
+            for factory in self._factories:
+                provider = factory()
+                if provider.api_key:
+                    active[provider.name] = provider
+            self._active = active
+        return dict(self._active)
+
+    def reset(self) -> None:
+        """Forget built providers (e.g. after API keys changed)."""
+        self._active = None
+
+    async def aclose(self) -> None:
+        """Release pooled connections held on the running event loop."""
+        await close_pool()
+
+
+_REGISTRY = ProviderRegistry()
+
+
 def get_active_providers() -> Dict[str, OddsProvider]:
     """
-    Instantiate providers whose API keys are present.
+    Providers whose API keys are present, shared across calls.
     Returns mapping {provider_name: provider_instance}.
     """
-    providers: Dict[str, OddsProvider] = {}
-
-    odds_api = OddsAPIProvider()
-    if odds_api.api_key:
-        providers[odds_api.name] = odds_api
+    return _REGISTRY.active()
 
-    prop_odds = PropOddsProvider()
-    if prop_odds.api_key:
-        providers[prop_odds.name] = prop_odds
 
-    return providers
+async def close_providers() -> None:
+    await _REGISTRY.aclose()
@@ -1,51 +1,110 @@
 from __future__ import annotations
 
 import abc
-import time
+import asyncio
+import os
 from functools import wraps
-from typing import Any, Awaitable, Callable, Dict, List, Tuple, TypeVar
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    List,
+    Tuple,
+    TypeVar,
+)
 from aiohttp import ClientError  # add to imports
+from app.http_pool import close_pool, get_pool
 from app.logging_config import logger  # new import
+from .cache import ResponseCache
+from .disk_cache import DiskCache, get_disk_cache
+from .limits import RateBudget, budget_for
+from .streaming import iter_json_array
 import aiohttp
-from aiolimiter import AsyncLimiter
 
 _JSON = Dict[str, Any]
+_Index = Dict[str, List[Dict[str, Any]]]
 _T = TypeVar("_T")
 
+_STREAM_CHUNK = 64 * 1024  # bytes per read when streaming feeds
+
 # --------------------------------------------------------------------------- #
-#  In-memory TTL cache (60 s)                                                 #
+#  In-memory LRU/TTL cache with single-flight fills                           #
 # --------------------------------------------------------------------------- #
-_CACHE: Dict[str, Tuple[float, Any]] = {}
-_CACHE_TTL = 60  # seconds
+_CACHE = ResponseCache(max_entries=512, default_ttl=60, stale_ttl=300)
+
+# Upstream calls currently in progress, {(event loop, cache key): task}.
+# Tasks are loop-bound, hence the loop in the key.
+_INFLIGHT: Dict[Tuple[asyncio.AbstractEventLoop, str], "asyncio.Task[Any]"] = {}
 
 
-def _cache_key(url: str, params: Dict[str, Any]) -> str:
-    return f"{url}|{tuple(sorted(params.items()))}"
+def _cache_key(url: str, params: Dict[str, Any], *extra: Any) -> str:
+    key = f"{url}|{tuple(sorted(params.items()))}"
+    return "|".join([key, *map(str, extra)])
 
 
 def _ttl_cache(
-    func: Callable[["OddsProvider", str, Dict[str, Any]], Awaitable[_T]],
-) -> Callable[["OddsProvider", str, Dict[str, Any]], Awaitable[_T]]:
-    """Async TTL cache decorator."""
+    func: Callable[..., Awaitable[_T]],
+) -> Callable[..., Awaitable[_T]]:
+    """
+    Async TTL cache decorator backed by `_CACHE`.
 
-    @wraps(func)
-    async def wrapper(self: "OddsProvider", url: str, params: Dict[str, Any]) -> _T:
-        key = _cache_key(url, params)
-        ts, data = _CACHE.get(key, (0.0, None))
-        if time.time() - ts < _CACHE_TTL:
-            return data  # type: ignore[return-value]
+    The wrapped method takes `(url, params, *extra)`; extra positional
+    arguments (e.g. the market a parsed index was built for) become part of
+    the cache key.
+
+    * Concurrent misses on the same key are coalesced: the first caller
+      starts the upstream call and everyone else awaits that same task, so
+      N callers cost one HTTP request.
+    * Stale entries are returned immediately while one background task
+      refreshes them (stale-while-revalidate).
+    * A failed refresh (`None`) never replaces the last good payload.
+    """
 
-        data = await func(self, url, params)
-        _CACHE[key] = (time.time(), data)
+    async def _fill(
+        self: "OddsProvider", key: str, url: str, params: Dict[str, Any], *extra: Any
+    ) -> _T:
+        data = await func(self, url, params, *extra)
+        if data is not None or key not in _CACHE:
+            _CACHE.set(key, data, ttl=self._cache_ttl(url))
         return data
 
+    def _flight(
+        self: "OddsProvider", key: str, url: str, params: Dict[str, Any], *extra: Any
+    ) -> "asyncio.Task[_T]":
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        task = _INFLIGHT.get(flight_key)
+        if task is None:
+            task = loop.create_task(_fill(self, key, url, params, *extra))
+            _INFLIGHT[flight_key] = task
+            task.add_done_callback(lambda _t: _INFLIGHT.pop(flight_key, None))
+        return task
+
+    @wraps(func)
+    async def wrapper(
+        self: "OddsProvider", url: str, params: Dict[str, Any], *extra: Any
+    ) -> _T:
+        key = _cache_key(url, params, *extra)
+        cached = _CACHE.get(key)
+        if cached is not None:
+            data, fresh = cached
+            if not fresh:
+                _flight(self, key, url, params, *extra)  # revalidate in background
+            return data  # type: ignore[no-any-return]
+
+        # Shielded so a caller hitting its own timeout doesn't cancel the
+        # fetch the other waiters (and the cache) depend on.
+        return await asyncio.shield(_flight(self, key, url, params, *extra))
+
     return wrapper
 
 
 # --------------------------------------------------------------------------- #
 #  Abstract base provider                                                     #
 # --------------------------------------------------------------------------- #
-_rate_limiter = AsyncLimiter(max_rate=1, time_period=1)  # 1 req / s
 
 
 class OddsProvider(abc.ABC):
@@ -54,44 +113,248 @@ class OddsProvider(abc.ABC):
     name: str
     base_url: str
     monthly_quota: int | None = None
+    rate_limit: float = 1.0  # requests / s, per provider
+    rate_burst: int = 1
+    cache_ttl: float = 60.0
+    # URL fragment -> TTL override, e.g. {"/scores": 30}
+    endpoint_cache_ttl: ClassVar[Dict[str, float]] = {}
+    # Top-level key holding the event list (`None` = the body is the list)
+    feed_key: ClassVar[str | None] = None
 
     def __init__(self, api_key: str | None) -> None:
         self.api_key = api_key
-        self._session: aiohttp.ClientSession | None = None
+        self._disk: DiskCache | None = get_disk_cache()
+        self.budget: RateBudget = budget_for(
+            self.name, self.rate_limit, self.rate_burst, self.monthly_quota
+        )
+        # cache key -> (payload the index was built from, index)
+        self._indexes: Dict[str, Tuple[Any, _Index]] = {}
+        # Parse feeds incrementally into the compact index, never holding
+        # the decoded feed
+        self.stream_feeds = os.getenv("PROVIDER_STREAM_FEEDS", "").lower() in (
+            "1",
+            "true",
+        )
 
     # ––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––– #
     #  Helpers                                                               #
     # ––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––– #
+    def _cache_ttl(self, url: str) -> float:
+        for fragment, ttl in self.endpoint_cache_ttl.items():
+            if fragment in url:
+                return ttl
+        return self.cache_ttl
+
     async def _get_session(self) -> aiohttp.ClientSession:
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=10)
-            )
-        return self._session
+        return await get_pool().session()
 
     @_ttl_cache
     async def _get_json(self, url: str, params: Dict[str, Any]) -> _JSON | None:
-        """Rate-limited GET returning JSON (or None on error)."""
-        async with _rate_limiter:
+        """
+        GET returning JSON (or None on error), charged to this provider's
+        own rate limiter and monthly quota.
+
+        With a disk cache configured, a fresh on-disk copy is returned without
+        any request; an expired one is revalidated with `If-None-Match` /
+        `If-Modified-Since` and reused on `304`, or as a last resort when the
+        upstream call fails.
+        """
+
+        async def decode(resp: aiohttp.ClientResponse) -> Any:
+            return await resp.json()
+
+        return await self._fetch(_cache_key(url, params), url, params, decode)
+
+    async def _fetch(
+        self,
+        key: str,
+        url: str,
+        params: Dict[str, Any],
+        decode: Callable[[aiohttp.ClientResponse], Awaitable[Any]],
+    ) -> Any:
+        """
+        Budgeted, disk-backed conditional GET shared by `_get_json` and the
+        streaming index; `decode` turns a `200` response into the payload
+        stored under `key`.
+        """
+        entry = self._disk.get(key) if self._disk else None
+        if entry is not None and entry.age() < self._cache_ttl(url):
+            return entry.payload
+
+        headers: Dict[str, str] = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        if not await self.budget.acquire():
+            logger.warning(f"[provider:{self.name}] monthly quota exhausted")
+        else:
             session = await self._get_session()
             try:
-                async with session.get(url, params=params) as resp:
+                async with session.get(url, params=params, headers=headers) as resp:
+                    if resp.status == 304 and entry is not None:
+                        self._disk.touch(key)  # type: ignore[union-attr]
+                        return entry.payload
                     if resp.status == 200:
-                        return await resp.json()
+                        data = await decode(resp)
+                        if self._disk is not None:
+                            self._disk.put(
+                                key,
+                                data,
+                                etag=resp.headers.get("ETag"),
+                                last_modified=resp.headers.get("Last-Modified"),
+                            )
+                        return data
                     logger.warning(
                         f"[provider:{self.name}] HTTP {resp.status} for {url}"
                     )
             except ClientError as e:
                 logger.error(f"[provider:{self.name}] Network error: {e}")
+            except ValueError as e:
+                logger.error(f"[provider:{self.name}] Malformed feed: {e}")
+
+        if entry is not None:
+            logger.warning(
+                f"[provider:{self.name}] serving {entry.age():.0f}s old disk copy"
+            )
+            return entry.payload
         return None
 
+    async def _event_index(self, sport: str, market: str) -> _Index:
+        """
+        Download the sport feed (TTL-cached) and index it by event id.
+
+        The index is memoised against the cached payload object, so repeated
+        lookups within one cache period parse the feed only once.
+        """
+        url, params = self._feed_request(sport, market)
+        raw = await self._get_json(url, params)
+        if not raw:
+            return {}
+
+        key = _cache_key(url, params)
+        memo = self._indexes.get(key)
+        if memo is not None and memo[0] is raw:
+            return memo[1]
+
+        index = self._build_index(raw, market)
+        self._indexes[key] = (raw, index)
+        return index
+
+    @_ttl_cache
+    async def _get_stream_index(
+        self, url: str, params: Dict[str, Any], market: str
+    ) -> _Index | None:
+        """
+        Streaming variant of `_get_json` + `_build_index`: events are decoded
+        one by one from the response body and folded straight into the index
+        of the *whole* feed, so the decoded feed is never materialised.
+
+        Cached (single-flight, LRU and disk tier) under the feed's key plus
+        the market, so callers asking for different fixtures share one
+        download.
+        """
+
+        async def decode(resp: aiohttp.ClientResponse) -> _Index:
+            index: _Index = {}
+            events = iter_json_array(
+                resp.content.iter_chunked(_STREAM_CHUNK), key=self.feed_key
+            )
+            async for event in events:
+                event_id = str(event.get("id"))
+                if event_id in index:
+                    continue
+                rows = self._event_outcomes(event, market)
+                if rows is not None:
+                    index[event_id] = rows
+            return index
+
+        key = _cache_key(url, params, market)
+        return await self._fetch(key, url, params, decode)
+
+    async def _stream_event_index(self, sport: str, market: str) -> _Index:
+        url, params = self._feed_request(sport, market)
+        return await self._get_stream_index(url, params, market) or {}
+
+    def _feed_events(self, raw: Any) -> Iterable[Dict[str, Any]]:
+        """Events of a fully decoded feed payload."""
+        if self.feed_key is None:
+            return raw if isinstance(raw, list) else []
+        return raw.get(self.feed_key, []) if isinstance(raw, dict) else []
+
+    def _build_index(self, raw: Any, market: str) -> _Index:
+        """Map `event_id -> [{'outcome': str, 'decimal_odds': float}, …]`."""
+        index: _Index = {}
+        for event in self._feed_events(raw):
+            event_id = str(event.get("id"))
+            if event_id in index:
+                continue
+            rows = self._event_outcomes(event, market)
+            if rows is not None:
+                index[event_id] = rows
+        return index
+
     @abc.abstractmethod
+    def _feed_request(self, sport: str, market: str) -> Tuple[str, Dict[str, Any]]:
+        """Return `(url, params)` of the endpoint listing all events of a sport."""
+        ...
+
+    @abc.abstractmethod
+    def _event_outcomes(
+        self, event: Dict[str, Any], market: str
+    ) -> List[Dict[str, Any]] | None:
+        """Outcome rows of `market` for one feed event (`None` if malformed)."""
+        ...
+
+    # ––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––– #
+    #  Public                                                                #
+    # ––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––– #
+    async def fetch_many_fixtures(
+        self,
+        fixture_ids: Iterable[str],
+        sport: str = "soccer",
+        market: str = "h2h",
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Odds for many fixtures of one sport from a single feed download.
+
+        Returns `{fixture_id: [{'outcome': str, 'decimal_odds': float}, …]}`;
+        fixtures absent from the feed are omitted.  With `stream_feeds` on,
+        the feed is parsed incrementally into its event index.
+        """
+        if not self.api_key:
+            return {}
+
+        fixture_ids = list(fixture_ids)
+        if self.stream_feeds:
+            index = await self._stream_event_index(sport, market)
+        else:
+            index = await self._event_index(sport, market)
+        return {fid: index[str(fid)] for fid in fixture_ids if str(fid) in index}
+
+    async def fetch_events(
+        self, sport: str = "soccer", market: str = "h2h"
+    ) -> List[Dict[str, Any]]:
+        """Raw feed events of a sport (teams, kickoff…) for market matching."""
+        if not self.api_key:
+            return []
+        url, params = self._feed_request(sport, market)
+        raw = await self._get_json(url, params)
+        return list(self._feed_events(raw)) if raw else []
+
     async def fetch_fixture_odds(
-        self, fixture_id: str, **kwargs: Any
+        self,
+        fixture_id: str,
+        *,
+        sport: str = "soccer",
+        market: str = "h2h",
     ) -> List[Dict[str, Any]]:
         """Return `[{'outcome': str, 'decimal_odds': float}, …]`"""
-        ...
+        found = await self.fetch_many_fixtures([fixture_id], sport, market)
+        return found.get(fixture_id, [])
 
     async def close(self) -> None:
-        if self._session and not self._session.closed:
-            await self._session.close()
+        """Close the shared HTTP pool on this loop (reopened on next use)."""
+        await close_pool()
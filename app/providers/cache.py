@@ -0,0 +1,125 @@
+"""
+Bounded in-memory response cache for provider HTTP payloads.
+
+* LRU eviction once `max_entries` is reached, so memory stays flat on a
+  long-running scheduler.
+* Per-entry TTL (providers pick it per endpoint, see `OddsProvider.cache_ttl`).
+* Stale-while-revalidate: for `stale_ttl` seconds after expiry an entry is
+  still served, flagged as stale, so the caller can refresh it in the
+  background instead of blocking on a cold fetch.
+* Hit / stale-hit / miss / eviction counters for monitoring.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass(slots=True)
+class _Entry:
+    stored_at: float
+    ttl: float
+    value: Any
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with per-entry TTL and a stale grace period."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        default_ttl: float = 60.0,
+        stale_ttl: float = 300.0,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be > 0")
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------ #
+    #  Lookup / store                                                     #
+    # ------------------------------------------------------------------ #
+    def get(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Return `(value, is_fresh)` or `None` on a miss.
+
+        Entries past their TTL but inside the stale window come back with
+        `is_fresh=False`; anything older is dropped and counted as a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            age = now - entry.stored_at
+            if age >= entry.ttl + self.stale_ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if age < entry.ttl:
+                self.hits += 1
+                return entry.value, True
+            self.stale_hits += 1
+            return entry.value, False
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = _Entry(
+                time.time(), self.default_ttl if ttl is None else ttl, value
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # ------------------------------------------------------------------ #
+    #  Maintenance                                                        #
+    # ------------------------------------------------------------------ #
+    def purge_expired(self) -> int:
+        """Drop entries that are past even the stale window; return count."""
+        now = time.time()
+        with self._lock:
+            dead = [
+                k
+                for k, e in self._entries.items()
+                if now - e.stored_at >= e.ttl + self.stale_ttl
+            ]
+            for k in dead:
+                del self._entries[k]
+            self.evictions += len(dead)
+        return len(dead)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
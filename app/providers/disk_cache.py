@@ -0,0 +1,180 @@
+"""
+Optional persistent (SQLite) tier for provider HTTP responses.
+
+Sits underneath `OddsProvider._get_json`, below the in-memory cache, so a
+restarted scheduler or web process can answer from local disk instead of
+spending quota on a feed it downloaded minutes ago.  Validators (`ETag` /
+`Last-Modified`) are stored alongside each payload so expired entries can be
+revalidated with a conditional request.
+
+The same file holds each provider's monthly request counter (see
+`app.providers.limits`), so quotas are shared by the web, scheduler and CLI
+processes and survive restarts.
+
+Enabled by pointing `PROVIDER_CACHE_PATH` at a file, e.g.
+`PROVIDER_CACHE_PATH=.cache/providers.sqlite`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key           TEXT PRIMARY KEY,
+    body          TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    stored_at     REAL NOT NULL
+)
+"""
+_QUOTA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_usage (
+    provider TEXT NOT NULL,
+    month    TEXT NOT NULL,
+    used     INTEGER NOT NULL,
+    PRIMARY KEY (provider, month)
+)
+"""
+
+
+@dataclass(slots=True)
+class DiskEntry:
+    payload: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+class DiskCache:
+    """Small SQLite key/value store for JSON payloads plus HTTP validators."""
+
+    def __init__(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(_QUOTA_SCHEMA)
+        self._conn.commit()
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        # Cache keys embed query params (API keys included) – never store raw.
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[DiskEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at "
+                "FROM responses WHERE key = ?",
+                (self._digest(key),),
+            ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, stored_at = row
+        return DiskEntry(json.loads(body), etag, last_modified, stored_at)
+
+    def put(
+        self,
+        key: str,
+        payload: Any,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        body = json.dumps(payload, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, body, etag, last_modified, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (self._digest(key), body, etag, last_modified, time.time()),
+            )
+            self._conn.commit()
+
+    def touch(self, key: str) -> None:
+        """Mark an entry fresh again (after a `304 Not Modified`)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ? WHERE key = ?",
+                (time.time(), self._digest(key)),
+            )
+            self._conn.commit()
+
+    def purge(self, max_age: float) -> int:
+        """Delete entries older than `max_age` seconds; return count."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM responses WHERE stored_at < ?", (time.time() - max_age,)
+            )
+            self._conn.commit()
+        return cur.rowcount
+
+    # ------------------------------------------------------------------ #
+    #  Monthly quota counters                                             #
+    # ------------------------------------------------------------------ #
+    def quota_used(self, provider: str, month: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT used FROM quota_usage WHERE provider = ? AND month = ?",
+                (provider, month),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def reserve_quota(self, provider: str, month: str, quota: int) -> bool:
+        """
+        Charge one request to `provider`'s `month` if it is under `quota`.
+
+        A single conditional upsert, so concurrent processes sharing the file
+        can never push the counter past the quota.
+        """
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO quota_usage (provider, month, used) "
+                "SELECT ?, ?, 1 WHERE ? > 0 "
+                "ON CONFLICT (provider, month) DO UPDATE SET used = used + 1 "
+                "WHERE used < ?",
+                (provider, month, quota, quota),
+            )
+            self._conn.commit()
+        return cur.rowcount == 1
+
+    def release_quota(self, provider: str, month: str) -> None:
+        """Give back a reserved request that was never sent."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE quota_usage SET used = used - 1 "
+                "WHERE provider = ? AND month = ? AND used > 0",
+                (provider, month),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_DISK_CACHE: DiskCache | None = None
+
+
+def get_disk_cache() -> DiskCache | None:
+    """Process-wide disk cache, or `None` when `PROVIDER_CACHE_PATH` is unset."""
+    global _DISK_CACHE
+    path = os.getenv("PROVIDER_CACHE_PATH")
+    if not path:
+        return None
+    if _DISK_CACHE is None:
+        _DISK_CACHE = DiskCache(path)
+    return _DISK_CACHE
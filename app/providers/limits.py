@@ -0,0 +1,167 @@
+"""
+Per-provider request budgets: a rate limiter plus a monthly quota.
+
+Each provider gets its own `RateBudget` (shared by every instance of that
+provider), so adding a provider adds capacity instead of splitting a single
+global limiter.  `AsyncLimiter` objects are bound to the event loop that
+first uses them, so one limiter is created per running loop.
+
+Monthly usage is kept in the disk tier (`PROVIDER_CACHE_PATH`, see
+`app.providers.disk_cache`) when it is enabled, keyed by provider and month,
+so the web, scheduler and CLI processes draw on one persistent counter.
+Without it the counter lives in process memory only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from aiolimiter import AsyncLimiter
+
+from .disk_cache import DiskCache, get_disk_cache
+
+
+class RateBudget:
+    """
+    `rate` requests per second with bursts of up to `burst`, capped at
+    `monthly_quota` requests per calendar month (UTC) when set.
+
+    With a `store` the monthly counter is persisted there under `name`
+    (shared across processes); otherwise it is kept in memory.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: int = 1,
+        monthly_quota: Optional[int] = None,
+        *,
+        name: str = "",
+        store: Optional[DiskCache] = None,
+    ) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be > 0 and burst >= 1")
+        if store is not None and not name:
+            raise ValueError("a persistent budget needs a name")
+        self.rate = rate
+        self.burst = burst
+        self.monthly_quota = monthly_quota
+        self.name = name
+        self.store = store
+        self._lock = threading.Lock()  # guards the in-memory counter
+        self._limiters: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, AsyncLimiter
+        ] = weakref.WeakKeyDictionary()
+        self._month = self._current_month()
+        self._used = 0
+        self.last_wait = 0.0  # seconds the most recent acquire() waited
+        self.total_wait = 0.0  # seconds spent waiting since start-up
+
+    @staticmethod
+    def _current_month() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m")
+
+    def limiter(self) -> AsyncLimiter:
+        """Limiter for the running event loop (created on first use)."""
+        loop = asyncio.get_running_loop()
+        limiter = self._limiters.get(loop)
+        if limiter is None:
+            # `burst` tokens refill over burst/rate seconds -> `rate` req/s
+            limiter = AsyncLimiter(self.burst, self.burst / self.rate)
+            self._limiters[loop] = limiter
+        return limiter
+
+    @property
+    def used_this_month(self) -> int:
+        month = self._current_month()
+        if self.store is not None:
+            return self.store.quota_used(self.name, month)
+        with self._lock:
+            return self._used if month == self._month else 0
+
+    @property
+    def remaining(self) -> Optional[int]:
+        """Requests left this month (`None` = unlimited)."""
+        if self.monthly_quota is None:
+            return None
+        return max(0, self.monthly_quota - self.used_this_month)
+
+    def _reserve(self, month: str) -> bool:
+        """Atomically charge one request to `month` unless the quota is spent."""
+        quota = self.monthly_quota
+        if self.store is not None and quota is not None:
+            return self.store.reserve_quota(self.name, month, quota)
+        with self._lock:
+            if month != self._month:
+                self._month, self._used = month, 0
+            if quota is not None and self._used >= quota:
+                return False
+            self._used += 1
+            return True
+
+    def _release(self, month: str) -> None:
+        if self.store is not None and self.monthly_quota is not None:
+            self.store.release_quota(self.name, month)
+            return
+        with self._lock:
+            if month == self._month and self._used:
+                self._used -= 1
+
+    async def acquire(self) -> bool:
+        """
+        Wait for a rate-limit slot and charge one request to the quota.
+
+        The request is reserved before waiting, so concurrent callers cannot
+        all pass the quota check and overshoot it; a caller cancelled while
+        waiting gives its reservation back.  Returns `False` (without
+        waiting) once the monthly quota is spent.
+        """
+        month = self._current_month()
+        if not self._reserve(month):
+            return False
+
+        start = time.monotonic()
+        try:
+            await self.limiter().acquire()
+        except BaseException:
+            self._release(month)
+            raise
+        self.last_wait = time.monotonic() - start
+        self.total_wait += self.last_wait
+        return True
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "used_this_month": self.used_this_month,
+            "remaining": self.remaining,
+            "last_wait": self.last_wait,
+            "total_wait": self.total_wait,
+        }
+
+
+_BUDGETS: Dict[str, RateBudget] = {}
+
+
+def budget_for(
+    name: str,
+    rate: float = 1.0,
+    burst: int = 1,
+    monthly_quota: Optional[int] = None,
+) -> RateBudget:
+    """
+    Process-wide budget for provider `name` (created on first call), with
+    its monthly counter persisted in the disk tier when one is configured.
+    """
+    budget = _BUDGETS.get(name)
+    if budget is None:
+        budget = _BUDGETS[name] = RateBudget(
+            rate, burst, monthly_quota, name=name, store=get_disk_cache()
+        )
+    return budget
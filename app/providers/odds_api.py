@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List, cast
+from typing import Any, Dict, List, Tuple
 
 from .base import OddsProvider
 
@@ -11,24 +11,16 @@ class OddsAPIProvider(OddsProvider):
 
     name = "the_odds_api"
     base_url = "https://api.the-odds-api.com/v4"
+    monthly_quota = 500  # free tier
 
     def __init__(self, api_key: str | None = None) -> None:
         api_key = api_key or os.getenv("ODDS_API_KEY")
         super().__init__(api_key)
 
     # --------------------------------------------------------------------- #
-    #  Public                                                                 #
+    #  Feed                                                                   #
     # --------------------------------------------------------------------- #
-    async def fetch_fixture_odds(  # type: ignore[override]
-        self,
-        fixture_id: str,
-        *,
-        sport: str = "soccer",
-        market: str = "h2h",
-    ) -> List[Dict[str, Any]]:
-        if not self.api_key:
-            return []
-
+    def _feed_request(self, sport: str, market: str) -> Tuple[str, Dict[str, Any]]:
         endpoint = f"{self.base_url}/sports/{sport}/odds"
         params: Dict[str, Any] = {
             "regions": "us",
@@ -37,21 +29,18 @@ class OddsAPIProvider(OddsProvider):
             "bookmakers": "pinnacle",
             "dateFormat": "iso",
         }
-
-        raw = await self._get_json(endpoint, params)
-        if not raw:
-            return []
-
-        events = cast(List[Dict[str, Any]], raw)
-
-        for event in events:
-            if str(event.get("id")) == str(fixture_id):
-                try:
-                    outcomes = event["bookmakers"][0]["markets"][0]["outcomes"]
-                except (KeyError, IndexError):
-                    break
-                return [
-                    {"outcome": o["name"], "decimal_odds": float(o["price"])}
-                    for o in outcomes
-                ]
-        return []
+        return endpoint, params
+
+    def _event_outcomes(
+        self, event: Dict[str, Any], market: str
+    ) -> List[Dict[str, Any]] | None:
+        try:
+            markets = event["bookmakers"][0]["markets"]
+            chosen = next((m for m in markets if m.get("key") == market), markets[0])
+            outcomes = chosen["outcomes"]
+        except (KeyError, IndexError, TypeError):
+            return None
+        return [
+            {"outcome": o["name"], "decimal_odds": float(o["price"])}
+            for o in outcomes
+        ]
@@ -0,0 +1,85 @@
+"""
+Incremental JSON array reader for large provider feeds.
+
+`iter_json_array` walks a response body chunk by chunk and yields the items
+of one JSON array (the document root, or the value of a top-level key) one at
+a time.  Only the current item and the unread tail of the buffer are held in
+memory, so callers can keep the handful of events they track and let the
+rest be garbage-collected immediately.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from typing import Any, AsyncIterable, AsyncIterator, Optional
+
+_WS = " \t\r\n"
+
+
+async def iter_json_array(
+    chunks: AsyncIterable[bytes],
+    key: Optional[str] = None,
+) -> AsyncIterator[Any]:
+    """
+    Yield the items of the JSON array at the root (`key=None`) or under the
+    top-level object key `key` (first occurrence of `"key": [`).
+
+    Raises `ValueError` if the body ends before the array is closed.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    start_re = re.compile(r"\s*\[") if key is None else re.compile(
+        r'"%s"\s*:\s*\[' % re.escape(key)
+    )
+
+    it = chunks.__aiter__()
+    buf = ""
+    pos = 0
+    eof = False
+
+    async def _more() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        try:
+            chunk = await it.__anext__()
+        except StopAsyncIteration:
+            eof = True
+            buf = buf[pos:] + utf8.decode(b"", final=True)
+            pos = 0
+            return False
+        # Drop consumed text before growing the buffer
+        buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+        return True
+
+    # 1. Locate the opening bracket
+    while True:
+        match = start_re.match(buf) if key is None else start_re.search(buf)
+        if match:
+            pos = match.end()
+            break
+        if not await _more():
+            return  # no such array: nothing to yield
+
+    # 2. Decode one item at a time
+    while True:
+        while pos < len(buf) and buf[pos] in _WS + ",":
+            pos += 1
+        if pos >= len(buf):
+            if not await _more():
+                raise ValueError("JSON body ended inside the array")
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Item is split across chunks – read more and retry
+            if not await _more():
+                raise ValueError("JSON body ended inside an array item")
+            continue
+        pos = end
+        yield item
@@ -0,0 +1,406 @@
+"""
+Event-time replay of the strategy over stored history.
+
+`odds_snapshots`, `poly_prices` and `results` are each read through a
+server-side cursor in timestamp order and merged into one event stream:
+
+* a provider snapshot updates the fixture's incremental `EwmaStore` state,
+* a Polymarket price change re-runs `recommend` against the current true
+  probabilities and tops the fixture's positions up to the recommended
+  stakes (positions are never sold before settlement),
+* a result settles every open position on the fixture and frees its state.
+
+    result = asyncio.run(replay(since=datetime(2025, 5, 1), bankroll=1_000))
+    print(result.summary())
+
+Memory is bounded by the fixtures live at any one time (settled or idle
+fixtures are dropped) plus one curve point per `resolution`, not by the
+number of ticks, so months of history replay in one pass.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from sqlalchemy import text
+
+from app.backtest import STREAM_CHUNK, as_datetime
+from app.db.base import async_session_factory
+from app.polymarket.aggregation import OutcomeOdds, ProviderSnapshot
+from app.polymarket.smoothing import EwmaStore
+from app.polymarket.staking import recommend
+
+# Event kinds, in tie-break order for equal timestamps: the model sees the
+# odds of an instant before trading on its prices, and settles last
+SNAPSHOT, PRICES, RESULT = 0, 1, 2
+
+Event = Tuple[datetime, int, Any]
+
+
+# --------------------------------------------------------------------------- #
+#  Results                                                                    #
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True)
+class CurvePoint:
+    ts: datetime
+    equity: float  # cash + open positions at cost
+    realised_pnl: float
+    exposure: float  # cost of open positions
+
+
+@dataclass(slots=True)
+class ReplayResult:
+    start_bankroll: float
+    bankroll: float
+    realised_pnl: float
+    staked: float
+    open_exposure: float
+    n_bets: int
+    n_settled: int
+    max_drawdown: float
+    curve: List[CurvePoint] = field(default_factory=list)
+
+    @property
+    def roi(self) -> float:
+        return self.realised_pnl / self.staked if self.staked else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"bankroll {self.start_bankroll:,.2f} → {self.bankroll:,.2f}  "
+            f"PnL={self.realised_pnl:+,.2f}  ROI={self.roi:+.2%}\n"
+            f"bets={self.n_bets}  settled fixtures={self.n_settled}  "
+            f"open exposure={self.open_exposure:,.2f}  "
+            f"max drawdown={self.max_drawdown:.1%}"
+        )
+
+
+# --------------------------------------------------------------------------- #
+#  Engine                                                                     #
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True)
+class _Position:
+    shares: float = 0.0
+    cost: float = 0.0
+
+
+class Replay:
+    """
+    Strategy state driven one event at a time (see module docstring).
+
+    Stakes are sized from current equity (cash plus open positions at
+    cost) and limited by available cash.
+    """
+
+    def __init__(
+        self,
+        *,
+        bankroll: float = 1_000.0,
+        alpha: float = 0.6,
+        weights: Optional[Dict[str, float]] = None,
+        edge_threshold: float = 0.02,
+        kelly_fraction: float = 0.5,
+        max_cap: float = 0.10,
+        resolution: timedelta = timedelta(hours=1),
+        max_idle: timedelta = timedelta(days=14),
+    ) -> None:
+        self.start_bankroll = bankroll
+        self.cash = bankroll
+        self.weights = weights
+        self.staking = dict(
+            edge_threshold=edge_threshold,
+            kelly_fraction=kelly_fraction,
+            max_cap=max_cap,
+        )
+        self.resolution = resolution
+        self.max_idle = max_idle
+
+        self.store = EwmaStore(alpha=alpha)
+        self._prices: Dict[str, Dict[str, float]] = {}
+        self._positions: Dict[str, Dict[str, _Position]] = {}
+        self._last_seen: Dict[str, datetime] = {}
+        self.exposure = 0.0
+        self.realised_pnl = 0.0
+        self.staked = 0.0
+        self.n_bets = 0
+        self.n_settled = 0
+
+        self._peak = bankroll
+        self.max_drawdown = 0.0
+        self.curve: List[CurvePoint] = []
+        self._bucket_end: Optional[datetime] = None
+        self._now = datetime.min
+
+    @property
+    def equity(self) -> float:
+        return self.cash + self.exposure
+
+    # ------------------------------------------------------------------ #
+    #  Events                                                             #
+    # ------------------------------------------------------------------ #
+    def on_snapshot(self, snapshot: ProviderSnapshot) -> None:
+        self.store.update(snapshot)
+        self._last_seen[snapshot.fixture_id] = snapshot.ts
+
+    def on_prices(self, fixture_id: str, prices: Dict[str, float]) -> None:
+        self._last_seen[fixture_id] = self._now
+        market = self._prices.setdefault(fixture_id, {})
+        if all(market.get(o) == p for o, p in prices.items()):
+            return  # no price change
+        market.update(prices)
+        true_probs = self.store.current(fixture_id, self.weights)
+        if not true_probs:
+            return
+        tradable = {o: p for o, p in market.items() if 0.0 < p < 1.0}
+        # A certain outcome (e.g. a one-outcome book) has no Kelly stake
+        recs = recommend(
+            {o: p for o, p in true_probs.items() if o in tradable and 0.0 < p < 1.0},
+            tradable,
+            bankroll=self.equity,
+            **self.staking,
+        )
+        positions = self._positions.setdefault(fixture_id, {})
+        for outcome, target in recs.items():
+            pos = positions.setdefault(outcome, _Position())
+            stake = min(target - pos.cost, self.cash)
+            if stake < 0.01:
+                continue
+            pos.shares += stake / tradable[outcome]
+            pos.cost += stake
+            self.cash -= stake
+            self.exposure += stake
+            self.staked += stake
+            self.n_bets += 1
+        if not positions:
+            del self._positions[fixture_id]
+
+    def on_result(self, fixture_id: str, winner: str) -> None:
+        positions = self._positions.pop(fixture_id, {})
+        for outcome, pos in positions.items():
+            payout = pos.shares if outcome == winner else 0.0
+            self.cash += payout
+            self.exposure -= pos.cost
+            self.realised_pnl += payout - pos.cost
+        if positions:
+            self.n_settled += 1
+            self._mark()
+        self._forget(fixture_id)
+
+    def _forget(self, fixture_id: str) -> None:
+        self.store.drop(fixture_id)
+        self._prices.pop(fixture_id, None)
+        self._last_seen.pop(fixture_id, None)
+
+    # ------------------------------------------------------------------ #
+    #  Driving                                                            #
+    # ------------------------------------------------------------------ #
+    def _mark(self) -> None:
+        self._peak = max(self._peak, self.equity)
+        if self._peak > 0:
+            self.max_drawdown = max(
+                self.max_drawdown, 1.0 - self.equity / self._peak
+            )
+
+    def _advance(self, ts: datetime) -> None:
+        """Close curve buckets up to `ts` and evict idle fixtures."""
+        if self._bucket_end is None:
+            self._bucket_end = ts + self.resolution
+            return
+        if ts < self._bucket_end:
+            return
+        self.curve.append(
+            CurvePoint(self._bucket_end, self.equity, self.realised_pnl, self.exposure)
+        )
+        steps = math.floor((ts - self._bucket_end) / self.resolution) + 1
+        self._bucket_end += steps * self.resolution
+        cutoff = ts - self.max_idle
+        for fixture_id, seen in list(self._last_seen.items()):
+            if seen < cutoff and fixture_id not in self._positions:
+                self._forget(fixture_id)
+
+    def feed(self, event: Event) -> None:
+        ts, kind, payload = event
+        self._advance(ts)
+        self._now = ts
+        if kind == SNAPSHOT:
+            self.on_snapshot(payload)
+        elif kind == PRICES:
+            self.on_prices(*payload)
+        else:
+            self.on_result(*payload)
+
+    def run(self, events: Iterable[Event]) -> ReplayResult:
+        for event in events:
+            self.feed(event)
+        return self.result()
+
+    def result(self) -> ReplayResult:
+        if self._bucket_end is not None:
+            self.curve.append(
+                CurvePoint(
+                    self._bucket_end, self.equity, self.realised_pnl, self.exposure
+                )
+            )
+            self._bucket_end = None
+        return ReplayResult(
+            start_bankroll=self.start_bankroll,
+            bankroll=self.equity,
+            realised_pnl=self.realised_pnl,
+            staked=self.staked,
+            open_exposure=self.exposure,
+            n_bets=self.n_bets,
+            n_settled=self.n_settled,
+            max_drawdown=self.max_drawdown,
+            curve=self.curve,
+        )
+
+
+# --------------------------------------------------------------------------- #
+#  Event streams                                                              #
+# --------------------------------------------------------------------------- #
+def _window(column: str, since: Optional[datetime], until: Optional[datetime]):
+    where, params = [], {}
+    if since is not None:
+        where.append(f"{column} >= :since")
+        params["since"] = since
+    if until is not None:
+        where.append(f"{column} < :until")
+        params["until"] = until
+    return (f"WHERE {' AND '.join(where)}" if where else ""), params
+
+
+async def _rows(
+    sess: Any, sql: str, params: Dict[str, Any], chunk_size: int
+) -> AsyncIterator[Any]:
+    result = await sess.stream(
+        text(sql).execution_options(yield_per=chunk_size), params
+    )
+    async for partition in result.partitions(chunk_size):
+        for row in partition:
+            yield row
+
+
+async def snapshot_events(
+    sess: Any,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = STREAM_CHUNK,
+) -> AsyncIterator[Event]:
+    """
+    odds_snapshots rows regrouped into one `ProviderSnapshot` per
+    (provider, fixture, ts) group.
+    """
+    where, params = _window("ts", since, until)
+    sql = f"""
+        SELECT provider_id, fixture_id, ts, outcome, decimal_odds
+        FROM odds_snapshots {where}
+        ORDER BY ts, fixture_id, provider_id
+    """
+    snap: Optional[ProviderSnapshot] = None
+    rows = _rows(sess, sql, params, chunk_size)
+    async for provider, fixture_id, ts, outcome, odds in rows:
+        row_key = (provider, str(fixture_id), as_datetime(ts))
+        if snap is None or (snap.provider, snap.fixture_id, snap.ts) != row_key:
+            if snap is not None:
+                yield snap.ts, SNAPSHOT, snap
+            snap = ProviderSnapshot(*row_key, [])
+        snap.odds.append(OutcomeOdds(outcome, odds))
+    if snap is not None:
+        yield snap.ts, SNAPSHOT, snap
+
+
+async def price_events(
+    sess: Any,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = STREAM_CHUNK,
+) -> AsyncIterator[Event]:
+    """poly_prices rows grouped into `(fixture_id, {outcome: prob})` updates."""
+    where, params = _window("ts", since, until)
+    sql = f"""
+        SELECT fixture_id, ts, outcome, prob
+        FROM poly_prices {where}
+        ORDER BY ts, fixture_id
+    """
+    key: Optional[Tuple[str, datetime]] = None
+    prices: Dict[str, float] = {}
+    async for fixture_id, ts, outcome, prob in _rows(sess, sql, params, chunk_size):
+        row_key = (str(fixture_id), as_datetime(ts))
+        if row_key != key:
+            if key is not None:
+                yield key[1], PRICES, (key[0], prices)
+            key, prices = row_key, {}
+        prices[outcome] = prob
+    if key is not None:
+        yield key[1], PRICES, (key[0], prices)
+
+
+async def result_events(
+    sess: Any,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = STREAM_CHUNK,
+) -> AsyncIterator[Event]:
+    where, params = _window("settled_at", since, until)
+    sql = f"""
+        SELECT DISTINCT fixture_id, winner, settled_at
+        FROM results {where}
+        ORDER BY settled_at
+    """
+    async for fixture_id, winner, settled_at in _rows(sess, sql, params, chunk_size):
+        yield as_datetime(settled_at), RESULT, (str(fixture_id), winner)
+
+
+async def merge_events(*streams: AsyncIterator[Event]) -> AsyncIterator[Event]:
+    """k-way merge of timestamp-ordered event streams (one head per stream)."""
+    heap: List[Tuple[datetime, int, int, Event]] = []
+
+    async def pull(i: int) -> None:
+        event = await anext(streams[i], None)
+        if event is not None:
+            heapq.heappush(heap, (event[0], event[1], i, event))
+
+    for i in range(len(streams)):
+        await pull(i)
+    while heap:
+        *_, i, event = heapq.heappop(heap)
+        yield event
+        await pull(i)
+
+
+async def replay(
+    *,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = STREAM_CHUNK,
+    **kwargs: Any,
+) -> ReplayResult:
+    """
+    Replay stored history with timestamps in `[since, until)`; `kwargs`
+    configure `Replay`.  Each stream holds its own session and cursor.
+    """
+    engine = Replay(**kwargs)
+    async with (
+        async_session_factory() as odds_sess,
+        async_session_factory() as price_sess,
+        async_session_factory() as result_sess,
+    ):
+        events = merge_events(
+            snapshot_events(odds_sess, since, until, chunk_size),
+            price_events(price_sess, since, until, chunk_size),
+            result_events(result_sess, since, until, chunk_size),
+        )
+        async for event in events:
+            engine.feed(event)
+    return engine.result()
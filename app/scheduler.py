@@ -3,8 +3,10 @@ Background scheduler using APScheduler AsyncIO.
 
 Jobs:
 1. fetch_all_fixtures – every 5 min
-2. purge_memory_cache  – every 30 min
+2. purge_memory_cache  – every 30 min (expired entries only)
 3. purge_old_snapshots – daily at 04:00
+4. refresh_market_map  – hourly (fixture → Polymarket slug matching)
+5. update_provider_metrics – daily at 03:30 (before the purge)
 """
 
 from __future__ import annotations
@@ -17,13 +19,16 @@ from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy import text
 
-from app.providers import get_active_providers
-from app.polymarket.aggregation import OutcomeOdds, ProviderSnapshot
+from app.backtest import update_provider_metrics
+from app.matching import refresh_market_map
+from app.providers import close_providers, get_active_providers
+from app.pipeline import collect_fixtures
 from app.polymarket.aggregation import snapshots_to_true_probs
 from app.polymarket.client import fetch_market_probs
 from app.polymarket.staking import compute_edge
 from app.db.base import async_session_factory, engine
 from app.providers.base import _CACHE
+from app.logging_config import logger
 
 # A demo list; in production fetch from DB
 TRACKED_FIXTURES = ["123", "456"]
@@ -34,19 +39,10 @@ scheduler = AsyncIOScheduler()
 #  Job 1 – Pull odds for all fixtures                                          #
 # --------------------------------------------------------------------------- #
 async def fetch_all_fixtures():
-    for fid in TRACKED_FIXTURES:
-        snaps = []
-        for pname, provider in get_active_providers().items():
-            rows = await provider.fetch_fixture_odds(fid)
-            odds = [OutcomeOdds(r["outcome"], r["decimal_odds"]) for r in rows]
-            snaps.append(
-                ProviderSnapshot(
-                    provider=pname,
-                    fixture_id=fid,
-                    ts=datetime.utcnow(),
-                    odds=odds,
-                )
-            )
+    # Every fixture × provider is fetched concurrently; slow providers are
+    # dropped from the cycle instead of holding it up.
+    for quotes in await collect_fixtures(TRACKED_FIXTURES, get_active_providers()):
+        snaps = quotes.snapshots
 
         # write to DB (simplified)
         async with async_session_factory() as sess:
@@ -70,10 +66,13 @@ async def fetch_all_fixtures():
 
 
 # --------------------------------------------------------------------------- #
-#  Job 2 – Purge in-memory provider cache                                      #
+#  Job 2 – Purge expired entries from the provider cache                       #
 # --------------------------------------------------------------------------- #
 def purge_memory_cache():
-    _CACHE.clear()
+    # Only entries past their stale window go; the LRU bound keeps size flat,
+    # so there is no need to wipe warm entries and trigger a cold-fetch storm.
+    purged = _CACHE.purge_expired()
+    logger.info(f"[scheduler] cache purge: {purged} expired, stats={_CACHE.stats()}")
 
 
 # --------------------------------------------------------------------------- #
@@ -108,12 +107,28 @@ scheduler.add_job(
     name="purge_old_snapshots",
 )
 
+scheduler.add_job(
+    update_provider_metrics,
+    CronTrigger(hour=3, minute=30),
+    name="update_provider_metrics",
+)
+
+scheduler.add_job(
+    refresh_market_map,
+    IntervalTrigger(hours=1),
+    name="refresh_market_map",
+)
+
 
 def run():
     """Entry-point for CLI."""
     scheduler.start()
     print("Scheduler running… Press Ctrl+C to exit.")
+    loop = asyncio.get_event_loop()
     try:
-        asyncio.get_event_loop().run_forever()
+        loop.run_forever()
     except (KeyboardInterrupt, SystemExit):
         pass
+    finally:
+        scheduler.shutdown(wait=False)
+        loop.run_until_complete(close_providers())
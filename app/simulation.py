@@ -0,0 +1,276 @@
+"""
+Monte Carlo bankroll simulation for staking settings.
+
+A *slate* is a set of fixtures, each with its true outcome distribution and
+the Polymarket prices of the outcomes we bet on.  Every simulated round
+settles the whole slate once and compounds the bankroll:
+
+    slate = slate_from_recommendations(
+        json.load(open("recs.json")), kelly_fraction=0.5, max_cap=0.10
+    )
+    result = simulate(slate, n_paths=1_000_000, n_rounds=200)
+    print(result.summary())
+
+Paths are simulated in fixed-size chunks (memory is bounded by
+`chunk_size × fixtures`, however many paths are requested) and chunks are
+spread over a process pool.  Each chunk only returns mergeable aggregates:
+a fixed-bin drawdown histogram plus running sums, so combining millions of
+paths never materialises per-path results.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.polymarket.staking import kelly_fractions
+
+_DD_BINS = 2000  # drawdown histogram resolution on [0, 1]
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+# --------------------------------------------------------------------------- #
+#  Inputs                                                                     #
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True)
+class Slate:
+    """
+    `probs[k, j]` – true probability of outcome `j` of fixture `k` (rows sum
+    to 1, padded with 0); `stakes[k, j]` – bankroll fraction bet on it;
+    `prices[k, j]` – share price paid (payout per $ staked is `1 / price`).
+    """
+
+    fixtures: List[str]
+    probs: np.ndarray
+    prices: np.ndarray
+    stakes: np.ndarray
+
+    @property
+    def exposure(self) -> float:
+        return float(self.stakes.sum())
+
+
+def build_slate(
+    fixtures: Mapping[str, Tuple[Mapping[str, float], Mapping[str, float]]],
+    *,
+    kelly_fraction: float = 0.5,
+    max_cap: float = 0.10,
+    edge_threshold: float = 0.02,
+    bet_on: Optional[Mapping[str, Iterable[str]]] = None,
+) -> Slate:
+    """
+    Slate from `{fixture_id: (true_probs, market_probs)}`, sized like
+    `recommend` with the given Kelly settings.  `bet_on` restricts betting
+    to the listed outcomes per fixture (e.g. those already recommended).
+    """
+    names = list(fixtures)
+    labels = [list(fixtures[f][0]) for f in names]
+    n_o = max((len(o) for o in labels), default=0)
+    probs = np.zeros((len(names), n_o))
+    prices = np.ones((len(names), n_o))
+    allowed = np.zeros((len(names), n_o), dtype=bool)
+    for k, name in enumerate(names):
+        true_probs, market_probs = fixtures[name]
+        wanted = None if bet_on is None else set(bet_on.get(name, ()))
+        for j, outcome in enumerate(labels[k]):
+            probs[k, j] = true_probs[outcome]
+            if outcome in market_probs:
+                prices[k, j] = market_probs[outcome]
+                allowed[k, j] = wanted is None or outcome in wanted
+    total = probs.sum(axis=-1, keepdims=True)
+    probs = np.divide(probs, total, out=np.zeros_like(probs), where=total > 0)
+
+    allowed &= (probs - prices) >= edge_threshold
+    stakes = np.where(
+        allowed,
+        kelly_fractions(probs, prices, kelly_fraction=kelly_fraction, max_cap=max_cap),
+        0.0,
+    )
+    return Slate(fixtures=names, probs=probs, prices=prices, stakes=stakes)
+
+
+def slate_from_recommendations(
+    payload: Any,
+    **kwargs: float,
+) -> Slate:
+    """
+    Slate from `recommend` CLI output: one object or a list of them, each
+    with `true_probs`, `market_probs` and `recommendations` (plus an
+    optional `fixture` id).  Stakes are re-sized with `kwargs`, so the same
+    file can be replayed under different Kelly settings.
+    """
+    items = payload if isinstance(payload, list) else [payload]
+    fixtures: Dict[str, Tuple[Mapping[str, float], Mapping[str, float]]] = {}
+    bet_on: Dict[str, Iterable[str]] = {}
+    for i, item in enumerate(items):
+        name = str(item.get("fixture", i))
+        fixtures[name] = (item["true_probs"], item["market_probs"])
+        bet_on[name] = item.get("recommendations", {}).keys()
+    return build_slate(fixtures, bet_on=bet_on, **kwargs)
+
+
+# --------------------------------------------------------------------------- #
+#  Results                                                                    #
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True)
+class SimulationStats:
+    """Mergeable per-chunk aggregates."""
+
+    n_paths: int = 0
+    n_ruined: int = 0
+    sum_growth: float = 0.0
+    sum_growth_sq: float = 0.0
+    drawdown_hist: np.ndarray = field(
+        default_factory=lambda: np.zeros(_DD_BINS, dtype=np.int64)
+    )
+
+    def merge(self, other: "SimulationStats") -> "SimulationStats":
+        self.n_paths += other.n_paths
+        self.n_ruined += other.n_ruined
+        self.sum_growth += other.sum_growth
+        self.sum_growth_sq += other.sum_growth_sq
+        self.drawdown_hist += other.drawdown_hist
+        return self
+
+
+@dataclass(slots=True)
+class SimulationResult:
+    n_paths: int
+    n_rounds: int
+    exposure: float
+    ruin_probability: float
+    growth_rate: float  # mean log-growth per round
+    growth_std: float
+    drawdown_quantiles: Dict[float, float]
+
+    def summary(self) -> str:
+        dd = "  ".join(
+            f"p{q * 100:g}={v:.1%}" for q, v in self.drawdown_quantiles.items()
+        )
+        return (
+            f"paths={self.n_paths:,}  rounds={self.n_rounds}  "
+            f"exposure/round={self.exposure:.1%}\n"
+            f"growth/round={self.growth_rate:+.5f} (±{self.growth_std:.5f})  "
+            f"ruin={self.ruin_probability:.3%}\n"
+            f"max drawdown  {dd}"
+        )
+
+
+def _hist_quantile(hist: np.ndarray, q: float) -> float:
+    """Quantile of values in [0, 1] from a fixed-bin histogram (interpolated)."""
+    total = hist.sum()
+    if total == 0:
+        return float("nan")
+    cum = np.cumsum(hist)
+    target = q * total
+    b = int(np.searchsorted(cum, target))
+    below = cum[b - 1] if b else 0
+    frac = (target - below) / hist[b] if hist[b] else 0.0
+    return (b + frac) / len(hist)
+
+
+# --------------------------------------------------------------------------- #
+#  Kernel                                                                     #
+# --------------------------------------------------------------------------- #
+def simulate_chunk(
+    slate: Slate,
+    n_paths: int,
+    n_rounds: int,
+    seed: Any,
+    ruin_level: float = 0.1,
+) -> SimulationStats:
+    """Simulate `n_paths` paths in one batch of array draws."""
+    rng = np.random.default_rng(seed)
+    n_f = len(slate.fixtures)
+    cum_probs = np.cumsum(slate.probs, axis=-1)
+    # Payout per $ of bankroll by realised outcome; last column = "other"
+    payout = np.concatenate(
+        [slate.stakes / slate.prices, np.zeros((n_f, 1))], axis=-1
+    )
+    base = 1.0 - slate.exposure
+    rows = np.arange(n_f)
+
+    log_w = np.zeros(n_paths)
+    peak = np.zeros(n_paths)
+    max_dd = np.zeros(n_paths)
+    trough = np.zeros(n_paths)
+    for _ in range(n_rounds):
+        u = rng.random((n_paths, n_f, 1))
+        outcome = (u > cum_probs).sum(axis=-1)  # (paths, fixtures)
+        ret = base + payout[rows, outcome].sum(axis=-1)
+        log_w += np.log(np.maximum(ret, 1e-300))
+        np.maximum(peak, log_w, out=peak)
+        np.maximum(max_dd, -np.expm1(log_w - peak), out=max_dd)
+        np.minimum(trough, log_w, out=trough)
+
+    growth = log_w / max(n_rounds, 1)
+    hist, _ = np.histogram(max_dd, bins=_DD_BINS, range=(0.0, 1.0))
+    return SimulationStats(
+        n_paths=n_paths,
+        n_ruined=int((trough <= math.log(ruin_level)).sum()),
+        sum_growth=float(growth.sum()),
+        sum_growth_sq=float((growth**2).sum()),
+        drawdown_hist=hist.astype(np.int64),
+    )
+
+
+def _run_chunk(args: Tuple[Slate, int, int, Any, float]) -> SimulationStats:
+    return simulate_chunk(*args)
+
+
+def simulate(
+    slate: Slate,
+    *,
+    n_paths: int = 100_000,
+    n_rounds: int = 100,
+    chunk_size: int = 50_000,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    ruin_level: float = 0.1,
+    quantiles: Sequence[float] = QUANTILES,
+) -> SimulationResult:
+    """
+    Simulate `n_paths` bankroll paths of `n_rounds` slate settlements.
+
+    `ruin_level` is the fraction of the starting bankroll at or below which a
+    path counts as ruined.  `workers=1` runs in-process; the default uses
+    one process per CPU (capped at the number of chunks).
+    """
+    sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        sizes.append(n_paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(slate, n, n_rounds, s, ruin_level) for n, s in zip(sizes, seeds)]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+
+    stats = SimulationStats()
+    if workers == 1:
+        for job in jobs:
+            stats.merge(_run_chunk(job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_run_chunk, jobs):
+                stats.merge(part)
+
+    n = max(stats.n_paths, 1)
+    mean = stats.sum_growth / n
+    var = max(stats.sum_growth_sq / n - mean**2, 0.0)
+    return SimulationResult(
+        n_paths=stats.n_paths,
+        n_rounds=n_rounds,
+        exposure=slate.exposure,
+        ruin_probability=stats.n_ruined / n,
+        growth_rate=mean,
+        growth_std=math.sqrt(var),
+        drawdown_quantiles={
+            q: _hist_quantile(stats.drawdown_hist, q) for q in quantiles
+        },
+    )
@@ -0,0 +1,359 @@
+"""
+Parameter sweep for the aggregation pipeline.
+
+Historical snapshots and results are loaded from the database once, written
+as `.npy` column files and memory-mapped by every worker, so a grid of
+`(alpha, history_window, weighting)` configurations is scored across a
+process pool without re-querying the DB or copying the dataset:
+
+    batch, winners, settled_at = await load_history()
+    results = sweep(
+        batch, winners, settled_at=settled_at, alphas=[0.3, 0.6], windows=[1, 3]
+    )
+    for r in results[:5]:
+        print(r)
+
+Each configuration is scored on settled fixtures with
+
+* Brier score over every quoted (fixture, outcome),
+* log-loss of the winning outcome,
+* ROI of fractional-Kelly bets placed at the best bookmaker price in the
+  newest snapshots (no historical Polymarket prices are needed).
+
+`inverse_brier` weights are fitted on an expanding window: a fixture is
+aggregated with provider scores from results settled strictly before its
+newest snapshot, so no configuration is scored on the outcomes its own
+weights were fitted to.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.polymarket.aggregation import SnapshotBatch, naive_utc_us
+from app.polymarket.batch import SnapshotCube, build_cube, cube_true_probs
+from app.polymarket.staking import kelly_fractions
+
+WEIGHTINGS = ("equal", "inverse_brier")
+METRICS = ("brier", "log_loss", "roi")
+_COLUMNS = ("provider", "fixture", "snapshot", "ts", "outcome", "decimal_odds")
+_EPS = 1e-15
+
+
+@dataclass(slots=True, frozen=True)
+class SweepConfig:
+    alpha: float
+    window: int
+    weighting: str = "equal"
+
+
+@dataclass(slots=True)
+class SweepResult:
+    alpha: float
+    window: int
+    weighting: str
+    brier: float
+    log_loss: float
+    roi: float
+    n_fixtures: int
+    n_bets: int
+
+    def __str__(self) -> str:
+        return (
+            f"alpha={self.alpha:<5g} window={self.window:<3d} "
+            f"weights={self.weighting:<13} Brier={self.brier:.4f}  "
+            f"log-loss={self.log_loss:.4f}  ROI={self.roi:+.2%} "
+            f"({self.n_bets} bets / {self.n_fixtures} fixtures)"
+        )
+
+
+# --------------------------------------------------------------------------- #
+#  Dataset (memory-mapped)                                                    #
+# --------------------------------------------------------------------------- #
+async def load_history() -> Tuple[SnapshotBatch, Dict[str, str], Dict[str, datetime]]:
+    """Snapshots (streamed into columns), winners and settle times."""
+    from app.backtest import load_settle_times, load_snapshot_batch, load_winners
+    from app.db.base import async_session_factory
+
+    async with async_session_factory() as sess:
+        return (
+            await load_snapshot_batch(sess),
+            await load_winners(sess),
+            await load_settle_times(sess),
+        )
+
+
+def write_dataset(
+    batch: SnapshotBatch, winners: Mapping[str, str], directory: str | Path
+) -> Path:
+    """Write the batch's columns as `.npy` files plus a small JSON header."""
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    for name in _COLUMNS:
+        np.save(path / f"{name}.npy", getattr(batch, name))
+    meta = {
+        "providers": batch.providers,
+        "fixtures": batch.fixtures,
+        "outcomes": batch.outcomes,
+        "winners": dict(winners),
+    }
+    (path / "meta.json").write_text(json.dumps(meta))
+    return path
+
+
+def open_dataset(directory: str | Path) -> Tuple[SnapshotBatch, Dict[str, str]]:
+    """Memory-map a dataset written by `write_dataset` (read-only, no copy)."""
+    path = Path(directory)
+    meta = json.loads((path / "meta.json").read_text())
+    columns = {n: np.load(path / f"{n}.npy", mmap_mode="r") for n in _COLUMNS}
+    batch = SnapshotBatch(
+        providers=meta["providers"],
+        fixtures=meta["fixtures"],
+        outcomes=meta["outcomes"],
+        **columns,
+    )
+    return batch, meta["winners"]
+
+
+# --------------------------------------------------------------------------- #
+#  Scoring                                                                    #
+# --------------------------------------------------------------------------- #
+def expanding_brier_weights(
+    batch: SnapshotBatch,
+    winners: Mapping[str, str],
+    settled_at: Mapping[str, datetime],
+) -> np.ndarray:
+    """
+    `(fixtures, providers)` inverse-Brier weights in batch order.  Row `f`
+    only scores results settled strictly before fixture `f`'s newest
+    snapshot.  Providers without history there get the row's median weight
+    (as in `WeightsCache.weights`); rows with none scored are all ones.
+    """
+    from app.backtest import quote_errors
+
+    n_f, n_p = len(batch.fixtures), len(batch.providers)
+    never = np.iinfo(np.int64).max
+    settle = np.full(n_f, never, dtype=np.int64)
+    known = [f for f, fixture in enumerate(batch.fixtures) if fixture in settled_at]
+    if known:
+        times = naive_utc_us([settled_at[batch.fixtures[f]] for f in known])
+        settle[known] = times.astype(np.int64)
+
+    # Per-provider squared-error sums after each fixture, in settle order
+    order = np.argsort(settle, kind="stable")
+    rank = np.empty(n_f, dtype=np.int64)
+    rank[order] = np.arange(n_f)
+    settled, errors = quote_errors(batch, winners)
+    rows = rank[batch.fixture[settled]] + 1
+    sums = np.zeros((n_f + 1, n_p))
+    counts = np.zeros((n_f + 1, n_p))
+    np.add.at(sums, (rows, batch.provider[settled]), errors)
+    np.add.at(counts, (rows, batch.provider[settled]), 1.0)
+    sums, counts = sums.cumsum(axis=0), counts.cumsum(axis=0)
+
+    newest = np.full(n_f, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(newest, batch.fixture, batch.ts.astype(np.int64))
+    before = np.searchsorted(settle[order], newest, side="left")
+    s, n = sums[before], counts[before]
+    brier = np.divide(s, n, out=np.full_like(s, np.nan), where=n > 0)
+    weights = 1.0 / np.maximum(brier, _EPS)
+
+    scored = n > 0
+    neutral = np.ones(n_f)
+    has = scored.any(axis=1)
+    if has.any():
+        neutral[has] = np.nanmedian(weights[has], axis=1)
+    return np.where(scored, weights, neutral[:, None])
+
+
+def provider_weights(
+    batch: SnapshotBatch,
+    winners: Mapping[str, str],
+    weighting: str,
+    settled_at: Optional[Mapping[str, datetime]] = None,
+) -> Optional[np.ndarray]:
+    """Per-fixture provider weights for `weighting` (None = equal)."""
+    if weighting == "equal":
+        return None
+    if weighting == "inverse_brier":
+        if settled_at is None:
+            raise ValueError("inverse_brier weighting needs settle times")
+        return expanding_brier_weights(batch, winners, settled_at)
+    raise ValueError(f"Unknown weighting {weighting!r}; expected one of {WEIGHTINGS}")
+
+
+def _winner_slots(cube: SnapshotCube, winners: Mapping[str, str]) -> np.ndarray:
+    """Outcome slot of each fixture's winner; -1 unsettled, -2 never quoted."""
+    slots = np.full(len(cube.fixtures), -1, dtype=np.int64)
+    for f, fixture in enumerate(cube.fixtures):
+        winner = winners.get(fixture)
+        if winner is not None:
+            labels = cube.outcomes[f]
+            slots[f] = labels.index(winner) if winner in labels else -2
+    return slots
+
+
+def score_config(
+    cube: SnapshotCube,
+    winner_slot: np.ndarray,
+    config: SweepConfig,
+    weights: Optional[np.ndarray],
+    *,
+    kelly_fraction: float = 0.5,
+    max_cap: float = 0.10,
+    edge_threshold: float = 0.02,
+) -> SweepResult:
+    probs = cube_true_probs(cube, alpha=config.alpha, weights=weights)
+    settled = (winner_slot != -1) & ~np.isnan(probs).all(axis=-1)
+    p = probs[settled]
+    quoted = ~np.isnan(p)
+    y = np.arange(p.shape[-1]) == winner_slot[settled][:, None]
+
+    sq_err = (np.nan_to_num(p) - y) ** 2
+    brier = float(sq_err[quoted].mean()) if quoted.any() else math.nan
+    p_win = np.where(y & quoted, p, 0.0).sum(axis=-1)
+    log_loss = -np.log(np.clip(p_win, _EPS, 1.0)).mean() if len(p) else math.nan
+
+    # Bet at the best price among providers' newest quotes
+    newest = cube.odds[settled][:, :, -1, :]
+    best = np.where(np.isnan(newest), -np.inf, newest).max(axis=1, initial=-np.inf)
+    price = np.where(best > 1.0, 1.0 / np.maximum(best, 1.0), np.nan)
+    edge = np.nan_to_num(p) - np.nan_to_num(price, nan=1.0)
+    bet = quoted & ~np.isnan(price) & (edge >= edge_threshold)
+    stake = np.zeros_like(p)
+    stake[bet] = kelly_fractions(
+        p[bet], price[bet], kelly_fraction=kelly_fraction, max_cap=max_cap
+    )
+    pnl = np.where(bet, stake * (y / np.where(bet, price, 1.0) - 1.0), 0.0)
+    staked = stake.sum()
+    return SweepResult(
+        alpha=config.alpha,
+        window=config.window,
+        weighting=config.weighting,
+        brier=brier,
+        log_loss=float(log_loss),
+        roi=float(pnl.sum() / staked) if staked > 0 else 0.0,
+        n_fixtures=int(settled.sum()),
+        n_bets=int((stake > 0).sum()),
+    )
+
+
+# --------------------------------------------------------------------------- #
+#  Workers                                                                    #
+# --------------------------------------------------------------------------- #
+# Per-process caches: the dataset is mapped once, cubes built once per window
+_DATASET: Dict[str, Tuple[SnapshotBatch, Dict[str, str]]] = {}
+_CUBES: Dict[Tuple[str, int], Tuple[SnapshotCube, np.ndarray]] = {}
+
+
+def _weights_path(directory: str | Path, weighting: str) -> Path:
+    return Path(directory) / f"weights-{weighting}.npy"
+
+
+def _cube_for(directory: str, window: int) -> Tuple[SnapshotCube, np.ndarray]:
+    if directory not in _DATASET:
+        _DATASET[directory] = open_dataset(directory)
+    key = (directory, window)
+    if key not in _CUBES:
+        batch, winners = _DATASET[directory]
+        cube = build_cube(batch, history_window=window)
+        _CUBES[key] = (cube, _winner_slots(cube, winners))
+    return _CUBES[key]
+
+
+def _cube_weights(
+    directory: str, cube: SnapshotCube, weighting: str
+) -> Optional[np.ndarray]:
+    """The weighting's `(fixtures, providers)` matrix reordered to the cube."""
+    path = _weights_path(directory, weighting)
+    if not path.exists():
+        return None
+    batch, _ = _DATASET[directory]
+    matrix = np.load(path, mmap_mode="r")
+    f_index = {f: i for i, f in enumerate(batch.fixtures)}
+    p_index = {p: i for i, p in enumerate(batch.providers)}
+    return matrix[
+        np.ix_(
+            [f_index[f] for f in cube.fixtures],
+            [p_index[p] for p in cube.providers],
+        )
+    ]
+
+
+def _score_job(args: Tuple[str, SweepConfig, Dict[str, float]]) -> SweepResult:
+    directory, config, staking = args
+    cube, winner_slot = _cube_for(directory, config.window)
+    weights = _cube_weights(directory, cube, config.weighting)
+    return score_config(cube, winner_slot, config, weights, **staking)
+
+
+def sweep(
+    batch: SnapshotBatch,
+    winners: Mapping[str, str],
+    *,
+    settled_at: Optional[Mapping[str, datetime]] = None,
+    alphas: Sequence[float] = (0.2, 0.4, 0.6, 0.8, 1.0),
+    windows: Sequence[int] = (1, 3, 5, 10),
+    weightings: Sequence[str] = WEIGHTINGS,
+    rank_by: str = "brier",
+    workers: Optional[int] = None,
+    directory: Optional[str | Path] = None,
+    **staking: float,
+) -> List[SweepResult]:
+    """
+    Score every configuration of the grid; best first by `rank_by`
+    (lower Brier / log-loss, higher ROI).  `settled_at` (`{fixture:
+    settle time}`) is required for `inverse_brier`.  `staking` overrides
+    the `kelly_fraction`, `max_cap` and `edge_threshold` used for ROI.
+    """
+    if rank_by not in METRICS:
+        raise ValueError(f"rank_by must be one of {METRICS}")
+    weight_sets = {
+        w: provider_weights(batch, winners, w, settled_at) for w in weightings
+    }
+    configs = [
+        SweepConfig(alpha, window, weighting)
+        for window, alpha, weighting in itertools.product(windows, alphas, weightings)
+    ]
+
+    with tempfile.TemporaryDirectory(prefix="sweep-") as tmp:
+        data_dir = str(write_dataset(batch, winners, directory or tmp))
+        for weighting, matrix in weight_sets.items():
+            if matrix is not None:
+                np.save(_weights_path(data_dir, weighting), matrix)
+        jobs = [(data_dir, c, staking) for c in configs]
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(jobs)))
+        if workers == 1:
+            results = [_score_job(job) for job in jobs]
+        else:
+            # Same-window configs are adjacent, so each worker builds few cubes
+            chunksize = max(1, len(jobs) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_score_job, jobs, chunksize=chunksize))
+        # Drop this process's mappings before the files go away
+        _DATASET.pop(data_dir, None)
+        for key in [k for k in _CUBES if k[0] == data_dir]:
+            del _CUBES[key]
+
+    sign = -1.0 if rank_by == "roi" else 1.0
+    return sorted(
+        results,
+        key=lambda r: (math.isnan(getattr(r, rank_by)), sign * getattr(r, rank_by)),
+    )
+
+
+def results_to_rows(results: Sequence[SweepResult]) -> List[Dict[str, Any]]:
+    return [asdict(r) for r in results]
@@ -2,20 +2,22 @@ from __future__ import annotations
 from app.logging_config import logger
 
 import asyncio
-from typing import Any, Dict
+import atexit
+import os
+import threading
+from typing import Any, Coroutine, Dict, Optional, TypeVar
 
 from flask import render_template, request
 
 from . import app
-from app.providers import get_active_providers
-from app.polymarket.aggregation import (
-    ProviderSnapshot,
-    OutcomeOdds,
-    snapshots_to_true_probs,
-)
+from app.providers import close_providers, get_active_providers
+from app.matching import resolve_market_slug
+from app.pipeline import collect_fixture
+from app.polymarket.aggregation import snapshots_to_true_probs
 from app.polymarket.client import fetch_market_probs
+from app.polymarket.feed import MarketFetcher, PriceFeed, WebSocketTransport
 from app.polymarket.staking import compute_edge, recommend
-from datetime import datetime
+from app.weights import PROVIDER_WEIGHTS
 
 # Hard-coded fixture list for demo
 FIXTURES = {
@@ -24,33 +26,90 @@ FIXTURES = {
 }
 
 
+_T = TypeVar("_T")
+
+# One long-lived event loop serves every request, so the shared HTTP pool
+# (and its keep-alive connections) survives between page loads.
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+
+# Optional push price feed (enabled by POLYMARKET_WS_URL); prices older than
+# this fall back to a GraphQL request.
+_PRICE_FEED: Optional[PriceFeed] = None
+_FEED_MAX_AGE = 120.0  # seconds
+
+
 # --------------------------------------------------------------------------- #
 #  Helpers                                                                    #
 # --------------------------------------------------------------------------- #
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(
+                target=_LOOP.run_forever, name="web-asyncio", daemon=True
+            ).start()
+            atexit.register(_shutdown_loop)
+    return _LOOP
+
+
+def _run(coro: Coroutine[Any, Any, _T]) -> _T:
+    """Run `coro` on the background loop and block for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+
+async def _close_all() -> None:
+    # The feed's task owns a WebSocket on the shared pool, so stop it first
+    if _PRICE_FEED is not None:
+        await _PRICE_FEED.stop()
+    await close_providers()
+
+
+def _shutdown_loop() -> None:
+    if _LOOP is not None and _LOOP.is_running():
+        asyncio.run_coroutine_threadsafe(_close_all(), _LOOP).result(timeout=5)
+        _LOOP.call_soon_threadsafe(_LOOP.stop)
+
+
+async def _market_fetcher(slug: str) -> MarketFetcher:
+    """
+    Feed-backed price lookup when configured, else plain GraphQL.
+
+    `slug` is added to the feed's subscription, so markets that appear in the
+    market map after start-up are streamed too.
+    """
+    global _PRICE_FEED
+    url = os.getenv("POLYMARKET_WS_URL")
+    if not url:
+        return fetch_market_probs
+    if _PRICE_FEED is None:
+        slugs = [resolve_market_slug(fid) for fid in FIXTURES]
+        _PRICE_FEED = PriceFeed(WebSocketTransport(url), slugs=slugs)
+        _PRICE_FEED.start()  # runs on the background loop we are called from
+    await _PRICE_FEED.subscribe([slug])
+    return _PRICE_FEED.market_fetcher(
+        fallback=fetch_market_probs, max_age=_FEED_MAX_AGE
+    )
+
+
 async def _pipeline(fixture_id: str) -> Dict[str, Any]:
     try:
-        # 1. Provider odds
-        snaps = []
-        for name, provider in get_active_providers().items():
-            rows = await provider.fetch_fixture_odds(fixture_id)
-            if not rows:
-                continue
-            odds = [OutcomeOdds(r["outcome"], r["decimal_odds"]) for r in rows]
-            snaps.append(
-                ProviderSnapshot(
-                    provider=name,
-                    fixture_id=fixture_id,
-                    ts=datetime.utcnow(),
-                    odds=odds,
-                )
-            )
-        
-        # 2. True probs
-        true_p = snapshots_to_true_probs(snaps)
+        # 1. Provider odds + Polymarket, fetched concurrently
+        slug = resolve_market_slug(fixture_id)
+        quotes = await collect_fixture(
+            fixture_id,
+            get_active_providers(),
+            market_fetcher=await _market_fetcher(slug),
+            market_slug=slug,
+        )
+
+        # 2. True probs (accuracy-weighted; weights are cached in memory)
+        weights = await PROVIDER_WEIGHTS.for_snapshots(quotes.snapshots)
+        true_p = snapshots_to_true_probs(quotes.snapshots, weights=weights)
 
         # 3. Polymarket
-        market_rows = await fetch_market_probs(fixture_id)
-        market_p = {r["outcome"]: r["prob"] for r in market_rows}
+        market_p = {r["outcome"]: r["prob"] for r in quotes.market_probs}
 
         # 4. Edge & reco
         edges = compute_edge(true_p, market_p)
@@ -97,5 +156,5 @@ def fixture_page(fixture_id: str):
 
 @app.route("/fixture/<fixture_id>/recommendation")
 def fixture_recommendation(fixture_id: str):
-    data = asyncio.run(_pipeline(fixture_id))
+    data = _run(_pipeline(fixture_id))
     return render_template("recommendation_snippet.html", **data)
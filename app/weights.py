@@ -0,0 +1,121 @@
+"""
+Accuracy-driven provider weights for aggregation.
+
+Weights are derived from the lifetime Brier scores in `provider_metrics`
+(lower is better, so a provider's weight is `1 / brier`) and held in memory
+by a `WeightsCache`.
+The cache is refreshed at most once per `ttl`; a stale cache keeps serving
+its current weights while one background refresh runs, so pipeline calls
+never wait on the database once the first load has happened:
+
+    weights = await PROVIDER_WEIGHTS.for_snapshots(quotes.snapshots)
+    true_probs = snapshots_to_true_probs(quotes.snapshots, weights=weights)
+
+A refresh is one small read of `provider_metrics` (kept current by the
+nightly `update_provider_metrics` job); raw snapshots are never rescanned.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import select
+
+from app.db.models import ProviderMetrics
+from app.logging_config import logger
+from app.polymarket.aggregation import ProviderSnapshot
+
+ProviderScores = Dict[str, float]
+
+_BRIER_FLOOR = 1e-3  # caps the weight of a (suspiciously) perfect provider
+
+
+async def load_scores(sess: Any, min_obs: int = 50) -> ProviderScores:
+    """Brier scores from `provider_metrics` with at least `min_obs` behind them."""
+    rows = await sess.execute(
+        select(ProviderMetrics.provider_id, ProviderMetrics.brier_score).where(
+            ProviderMetrics.n_obs >= min_obs,
+            ProviderMetrics.brier_score.is_not(None),
+        )
+    )
+    return {provider: brier for provider, brier in rows}
+
+
+class WeightsCache:
+    """In-memory provider weights, refreshed stale-while-revalidate."""
+
+    def __init__(self, ttl: float = 1800.0, min_obs: int = 50) -> None:
+        self.ttl = ttl
+        self.min_obs = min_obs
+        self._providers: ProviderScores = {}
+        self._loaded_at: Optional[float] = None
+        self._refreshing: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------ #
+    #  Refresh                                                            #
+    # ------------------------------------------------------------------ #
+    def set_scores(self, providers: ProviderScores) -> None:
+        self._providers = dict(providers)
+        self._loaded_at = time.monotonic()
+
+    async def refresh(self) -> None:
+        """Reload scores from the DB; on failure keep serving the old ones."""
+        from app.db.base import async_session_factory
+
+        try:
+            async with async_session_factory() as sess:
+                self.set_scores(await load_scores(sess, self.min_obs))
+        except Exception as exc:  # table missing on a fresh DB
+            logger.warning(f"[weights] refresh failed, keeping old weights: {exc}")
+            self._loaded_at = time.monotonic()  # retry after another ttl
+
+    @property
+    def stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    async def ensure_fresh(self) -> None:
+        """Load once, then refresh in the background when stale."""
+        if not self.stale:
+            return
+        if self._loaded_at is None:
+            await self.refresh()
+        elif self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self.refresh())
+
+    # ------------------------------------------------------------------ #
+    #  Reads                                                              #
+    # ------------------------------------------------------------------ #
+    def weights(self, providers: Iterable[str]) -> Optional[Dict[str, float]]:
+        """
+        `{provider: weight}` for every provider in `providers`, or None
+        (equal weights) when none of them has a score.  Unscored providers
+        get the median weight of the scored ones rather than zero, which
+        `aggregate_providers` would otherwise give them.
+        """
+        scored: Dict[str, float] = {}
+        unscored = []
+        for p in dict.fromkeys(providers):
+            brier = self._providers.get(p)
+            if brier is None:
+                unscored.append(p)
+            else:
+                scored[p] = 1.0 / max(brier, _BRIER_FLOOR)
+        if not scored:
+            return None
+        neutral = statistics.median(scored.values())
+        return {**scored, **{p: neutral for p in unscored}}
+
+    async def for_snapshots(
+        self, snapshots: Iterable[ProviderSnapshot]
+    ) -> Optional[Dict[str, float]]:
+        await self.ensure_fresh()
+        return self.weights(s.provider for s in snapshots)
+
+
+# Process-wide cache shared by the CLI and web app
+PROVIDER_WEIGHTS = WeightsCache()
@@ -0,0 +1,33 @@
+import random
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+import pytest
+
+from app.polymarket.aggregation import OutcomeOdds, ProviderSnapshot
+
+
+def _random_cycle(seed: int) -> List[ProviderSnapshot]:
+    """60 snapshots over 4 providers × 8 fixtures, some missing an outcome."""
+    rng = random.Random(seed)
+    t0 = datetime(2025, 1, 1)
+    snaps = []
+    for i in range(60):
+        outcomes = ["home", "draw", "away"]
+        if rng.random() < 0.3:
+            outcomes.pop(rng.randrange(3))  # missing outcome
+        snaps.append(
+            ProviderSnapshot(
+                provider=f"p{rng.randrange(4)}",
+                fixture_id=f"f{rng.randrange(8)}",
+                ts=t0 + timedelta(minutes=i),
+                odds=[OutcomeOdds(o, rng.uniform(1.2, 8.0)) for o in outcomes],
+            )
+        )
+    return snaps
+
+
+@pytest.fixture
+def random_cycle() -> Callable[[int], List[ProviderSnapshot]]:
+    """Factory for a reproducible random fetch cycle: `random_cycle(seed)`."""
+    return _random_cycle
@@ -1,14 +1,18 @@
 from datetime import datetime, timedelta
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from app.polymarket.aggregation import (
     OutcomeOdds,
     ProviderSnapshot,
+    SnapshotBatch,
     aggregate_providers,
     decimal_to_implied,
     ewma_probs,
     normalise_snapshot,
+    snapshots_to_dataframe,
     snapshots_to_true_probs,
 )
 
@@ -76,3 +80,52 @@ def test_full_pipeline() -> None:
     ]
     true_p = snapshots_to_true_probs(snaps)
     assert pytest.approx(sum(true_p.values()), rel=1e-12) == 1.0
+
+
+def test_snapshot_batch_roundtrip_and_pipeline() -> None:
+    snaps = [
+        _snap("p1", 0, 2.0, 3.2, 4.0),
+        _snap("p1", 1, 1.9, 3.4, 4.1),
+        _snap("p2", 0, 2.1, 3.1, 4.0),
+    ]
+    batch = SnapshotBatch.from_snapshots(snaps)
+    assert len(batch) == 9 and batch.n_snapshots == 3
+    assert batch.providers == ["p1", "p2"] and batch.provider.dtype.itemsize == 1
+    assert batch.to_snapshots() == snaps
+
+    expected = snapshots_to_true_probs(snaps)
+    got = snapshots_to_true_probs(batch)
+    for outcome, p in expected.items():
+        assert pytest.approx(got[outcome], rel=1e-12) == p
+
+
+def test_snapshot_batch_dataframe_shares_memory() -> None:
+    batch = SnapshotBatch.from_snapshots([_snap("p1", 0, 2.0, 3.2, 4.0)])
+    df = batch.to_dataframe()
+    assert list(df.columns) == ["provider", "fixture_id", "ts", "outcome", "decimal_odds"]
+    assert list(df["outcome"]) == ["home", "draw", "away"]
+    assert np.shares_memory(df["decimal_odds"].to_numpy(), batch.decimal_odds)
+
+
+def test_snapshots_to_dataframe_keeps_plain_dtypes() -> None:
+    from datetime import timezone
+
+    snap = _snap("p1", 0, 2.0, 3.2, 4.0)
+    snap.ts = snap.ts.replace(tzinfo=timezone.utc)
+    df = snapshots_to_dataframe([snap])
+    assert not isinstance(df["provider"].dtype, pd.CategoricalDtype)
+    assert not isinstance(df["outcome"].dtype, pd.CategoricalDtype)
+    assert df["ts"].dt.tz is not None
+
+
+def test_snapshot_batch_from_columns_groups_snapshots() -> None:
+    t0 = datetime(2025, 1, 1)
+    batch = SnapshotBatch.from_columns(
+        ["p1", "p1", "p1", "p1"],
+        ["f", "f", "f", "f"],
+        [t0, t0, t0 + timedelta(minutes=1), t0 + timedelta(minutes=1)],
+        ["home", "away", "home", "away"],
+        [2.0, 2.0, 1.5, 3.0],
+    )
+    assert batch.snapshot.tolist() == [0, 0, 1, 1]
+    assert batch.normalised()[:2].tolist() == [0.5, 0.5]
@@ -1,7 +1,11 @@
 import pytest
+import pytest_asyncio
 import asyncio
+import math
+from datetime import datetime
 
-from app.backtest import compute_brier_scores
+from app.backtest import brier_scores_from_batch, compute_brier_scores
+from app.polymarket.aggregation import OutcomeOdds, ProviderSnapshot, SnapshotBatch
 
 @pytest.mark.asyncio
 async def test_compute_brier_scores_empty(tmp_path, monkeypatch):
@@ -22,3 +26,245 @@ async def test_compute_brier_scores_empty(tmp_path, monkeypatch):
 
     scores = await compute_brier_scores()
     assert scores == {}
+
+
+def test_brier_scores_from_batch():
+    t0 = datetime(2025, 1, 1)
+    batch = SnapshotBatch.from_snapshots(
+        [
+            ProviderSnapshot("p1", "f1", t0, [OutcomeOdds("a", 2.0), OutcomeOdds("b", 2.0)]),
+            ProviderSnapshot("p2", "f1", t0, [OutcomeOdds("a", 1.25), OutcomeOdds("b", 5.0)]),
+            ProviderSnapshot("p1", "f2", t0, [OutcomeOdds("a", 2.0), OutcomeOdds("b", 2.0)]),
+        ]
+    )
+    scores = brier_scores_from_batch(batch, {"f1": "a"})  # f2 unsettled
+    assert scores["p1"] == pytest.approx(0.25)
+    assert scores["p2"] == pytest.approx(0.04)
+
+
+_SNAPSHOT_ROWS = [
+    # fixture, provider, ts, outcome, implied_norm, sport
+    ("f1", "p1", "2025-01-01 10:00:00", "a", 0.6, "soccer"),
+    ("f1", "p1", "2025-01-01 10:00:00", "b", 0.4, "soccer"),
+    ("f1", "p2", "2025-01-01 11:00:00", "a", 0.3, "soccer"),
+    ("f1", "p2", "2025-01-01 11:00:00", "b", 0.7, "soccer"),
+    ("f2", "p1", "2025-02-03 09:00:00", "a", 0.5, "tennis"),
+    ("f2", "p1", "2025-02-03 09:00:00", "b", 0.5, "tennis"),
+]
+
+
+@pytest_asyncio.fixture
+async def scored_db(monkeypatch):
+    """In-memory SQLite with raw odds_snapshots/results tables."""
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE odds_snapshots (fixture_id TEXT, provider_id TEXT, "
+                "ts TIMESTAMP, outcome TEXT, decimal_odds REAL, implied_norm REAL, "
+                "sport TEXT, market TEXT DEFAULT 'h2h')"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE TABLE results "
+                "(fixture_id TEXT, outcome TEXT, winner TEXT, settled_at TIMESTAMP)"
+            )
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO odds_snapshots "
+                "(fixture_id, provider_id, ts, outcome, implied_norm, sport) "
+                "VALUES (:f, :p, :ts, :o, :q, :s)"
+            ),
+            [dict(zip("f p ts o q s".split(), row)) for row in _SNAPSHOT_ROWS],
+        )
+        await conn.execute(
+            text("INSERT INTO results VALUES (:f, :o, :w, :t)"),
+            [
+                {"f": "f1", "o": "a", "w": "a", "t": "2025-01-02 00:00:00"},
+                {"f": "f1", "o": "b", "w": "a", "t": "2025-01-02 00:00:00"},
+                {"f": "f2", "o": "a", "w": "b", "t": "2025-02-04 00:00:00"},
+                {"f": "f2", "o": "b", "w": "b", "t": "2025-02-04 00:00:00"},
+            ],
+        )
+    monkeypatch.setattr(
+        "app.backtest.async_session_factory",
+        async_sessionmaker(engine, expire_on_commit=False),
+    )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_db", [True, False])
+async def test_brier_scores_sql_and_python_agree(scored_db, in_db):
+    scores = await compute_brier_scores(in_db=in_db)
+    # p1: f1 errors 0.16, 0.16; f2 errors 0.25, 0.25 -> 0.205
+    assert scores["p1"] == pytest.approx(0.205)
+    assert scores["p2"] == pytest.approx((0.49 + 0.49) / 2)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_db", [True, False])
+async def test_brier_scores_grouped(scored_db, in_db):
+    scores = await compute_brier_scores(
+        in_db=in_db, group_by=["sport"], bucket="month"
+    )
+    assert scores == pytest.approx(
+        {
+            ("p1", "soccer", "2025-01"): 0.16,
+            ("p2", "soccer", "2025-01"): 0.49,
+            ("p1", "tennis", "2025-02"): 0.25,
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_brier_scores_fall_back_to_python(scored_db, monkeypatch):
+    async def _unsupported(*args, **kwargs):
+        raise NotImplementedError("no GROUP BY here")
+
+    monkeypatch.setattr("app.backtest._brier_sums_sql", _unsupported)
+    scores = await compute_brier_scores()
+    assert scores["p1"] == pytest.approx(0.205)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_db", [True, False])
+async def test_brier_scores_ignore_unpriced_quotes(scored_db, in_db):
+    from sqlalchemy import text
+
+    async with scored_db.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO odds_snapshots "
+                "(fixture_id, provider_id, ts, outcome, implied_norm, sport) "
+                "VALUES ('f1', 'p1', '2025-01-01 12:00:00', 'a', NULL, 'soccer')"
+            )
+        )
+    scores = await compute_brier_scores(in_db=in_db)
+    assert scores["p1"] == pytest.approx(0.205)
+
+
+@pytest.mark.asyncio
+async def test_streamed_accumulators_read_in_chunks(scored_db):
+    from app.backtest import BrierAccumulator, LogLossAccumulator, run_accumulators
+
+    chunk_sizes = []
+
+    class _Sizes:
+        def add(self, rows):
+            chunk_sizes.append(len(rows))
+
+    brier, logloss = BrierAccumulator(), LogLossAccumulator()
+    await run_accumulators([brier, logloss, _Sizes()], chunk_size=4)
+
+    assert chunk_sizes == [4, 2]
+    assert brier.scores()["p1"] == pytest.approx(0.205)
+    assert logloss.scores()["p2"] == pytest.approx(-math.log(0.3))
+
+
+@pytest.mark.asyncio
+async def test_provider_metrics_fold_in_new_results_only(scored_db):
+    from sqlalchemy import select, text
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from app.backtest import update_provider_metrics
+    from app.db.models import MetricsWatermark, ProviderMetrics
+
+    async with scored_db.begin() as conn:
+        await conn.run_sync(ProviderMetrics.__table__.create)
+        await conn.run_sync(MetricsWatermark.__table__.create)
+        # Only f1 has settled so far
+        await conn.execute(text("DELETE FROM results WHERE fixture_id = 'f2'"))
+
+    assert await update_provider_metrics() == pytest.approx({"p1": 0.16, "p2": 0.49})
+    assert await update_provider_metrics() == {}  # nothing new
+
+    async with scored_db.begin() as conn:
+        # f1's snapshots are purged; f2 settles afterwards
+        await conn.execute(text("DELETE FROM odds_snapshots WHERE fixture_id = 'f1'"))
+        await conn.execute(
+            text(
+                "INSERT INTO results VALUES "
+                "('f2', 'a', 'b', '2025-02-04 00:00:00'), "
+                "('f2', 'b', 'b', '2025-02-04 00:00:00')"
+            )
+        )
+    assert await update_provider_metrics() == pytest.approx({"p1": 0.205})
+
+    factory = async_sessionmaker(scored_db, expire_on_commit=False)
+    async with factory() as sess:
+        rows = {m.provider_id: m for m in await sess.scalars(select(ProviderMetrics))}
+        mark = await sess.get(MetricsWatermark, "provider_metrics")
+    assert rows["p1"].n_obs == 4 and rows["p2"].n_obs == 2
+    assert rows["p2"].brier_score == pytest.approx(0.49)  # lifetime, not purged
+    assert mark.settled_at == datetime(2025, 2, 4)
+
+
+@pytest.mark.asyncio
+async def test_provider_metrics_watermark_advances_without_scores(scored_db):
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from app.backtest import update_provider_metrics
+    from app.db.models import MetricsWatermark, ProviderMetrics
+
+    async with scored_db.begin() as conn:
+        await conn.run_sync(ProviderMetrics.__table__.create)
+        await conn.run_sync(MetricsWatermark.__table__.create)
+        await conn.execute(text("DELETE FROM odds_snapshots"))  # all purged
+
+    assert await update_provider_metrics() == {}
+    factory = async_sessionmaker(scored_db, expire_on_commit=False)
+    async with factory() as sess:
+        mark = await sess.get(MetricsWatermark, "provider_metrics")
+    assert mark is not None and mark.settled_at == datetime(2025, 2, 4)
+
+
+@pytest.mark.asyncio
+async def test_load_snapshot_batch_streams_into_columns(scored_db):
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from app.backtest import load_snapshot_batch
+
+    async with scored_db.begin() as conn:
+        await conn.execute(
+            text("UPDATE odds_snapshots SET decimal_odds = 1 / implied_norm")
+        )
+    factory = async_sessionmaker(scored_db, expire_on_commit=False)
+    async with factory() as sess:
+        batch = await load_snapshot_batch(sess, chunk_size=4)
+
+    rows = sorted(_SNAPSHOT_ROWS, key=lambda r: (r[0], r[1], r[2]))
+    expected = SnapshotBatch.from_columns(
+        [r[1] for r in rows],
+        [r[0] for r in rows],
+        [datetime.fromisoformat(r[2]) for r in rows],
+        [r[3] for r in rows],
+        [1 / r[4] for r in rows],
+    )
+    assert batch.to_snapshots() == expected.to_snapshots()
+    assert batch.n_snapshots == 3 and batch.provider.dtype.itemsize == 1
+
+
+@pytest.mark.asyncio
+async def test_provider_metrics_fall_back_to_python(scored_db, monkeypatch):
+    from app.backtest import update_provider_metrics
+    from app.db.models import MetricsWatermark, ProviderMetrics
+
+    async def _unsupported(*args, **kwargs):
+        raise NotImplementedError("no GROUP BY here")
+
+    monkeypatch.setattr("app.backtest._brier_sums_sql", _unsupported)
+    async with scored_db.begin() as conn:
+        await conn.run_sync(ProviderMetrics.__table__.create)
+        await conn.run_sync(MetricsWatermark.__table__.create)
+    assert await update_provider_metrics() == pytest.approx(
+        {"p1": 0.205, "p2": 0.49}
+    )
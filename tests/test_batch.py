@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from app.polymarket.aggregation import (
+    SnapshotBatch,
+    snapshots_to_true_probs,
+)
+from app.polymarket.batch import batch_true_probs, build_cube
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("weights", [None, {"p0": 2.0, "p1": 0.5, "p2": 1.0}])
+def test_batch_matches_scalar_pipeline(random_cycle, seed, weights) -> None:
+    snaps = random_cycle(seed)
+    got = batch_true_probs(snaps, history_window=3, alpha=0.4, weights=weights)
+
+    for fixture, probs in got.items():
+        expected = snapshots_to_true_probs(
+            [s for s in snaps if s.fixture_id == fixture],
+            history_window=3,
+            alpha=0.4,
+            weights=weights,
+        )
+        assert probs.keys() == expected.keys()
+        for outcome, p in expected.items():
+            assert probs[outcome] == pytest.approx(p, rel=1e-12, abs=1e-15)
+
+
+def test_cube_is_right_aligned_with_mask(random_cycle) -> None:
+    snaps = random_cycle(0)
+    cube = build_cube(snaps, history_window=2)
+    assert cube.odds.shape[2] == 2
+    # every (fixture, provider) with data has its newest quote in the last slot
+    has_data = cube.mask.any(axis=(2, 3))
+    assert np.array_equal(has_data, cube.mask[:, :, -1, :].any(axis=-1))
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("window", [1, 3, 50])
+def test_cube_from_snapshot_batch_matches(random_cycle, seed, window) -> None:
+    snaps = random_cycle(seed)
+    expected = batch_true_probs(snaps, history_window=window)
+    got = batch_true_probs(SnapshotBatch.from_snapshots(snaps), history_window=window)
+    assert got.keys() == expected.keys()
+    for fixture, probs in expected.items():
+        assert got[fixture] == pytest.approx(probs, rel=1e-12)
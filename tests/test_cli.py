@@ -17,8 +17,26 @@ async def _noop_async(*args, **kwargs):
 def test_cli_fetch_smoke(monkeypatch) -> None:
     # Patch the async helpers inside app.cli so no real HTTP happens
     monkeypatch.setattr("app.cli.fetch_market_probs", _noop_async)
-    monkeypatch.setattr("app.cli._collect_provider_snaps", _noop_async)
+    monkeypatch.setattr("app.cli.get_active_providers", lambda: {})
 
     result = runner.invoke(app, ["fetch", "--fixture", "123"])
     assert result.exit_code == 0
     json.loads(result.stdout)
+
+
+def test_cli_recommend_emits_plain_json(monkeypatch) -> None:
+    async def _market(*args, **kwargs):
+        return [{"outcome": "home", "prob": 0.5}, {"outcome": "away", "prob": 0.5}]
+
+    monkeypatch.setattr("app.cli.fetch_market_probs", _market)
+    monkeypatch.setattr("app.cli.get_active_providers", lambda: {})
+
+    # A long id on a narrow terminal: rich would wrap it mid-string
+    fixture = "team-a-vs-team-b-" * 10
+    result = runner.invoke(
+        app, ["recommend-cmd", "--fixture", fixture], env={"COLUMNS": "40"}
+    )
+    assert result.exit_code == 0
+    out = json.loads(result.stdout)
+    assert out["fixture"] == fixture
+    assert out["market_probs"] == {"home": 0.5, "away": 0.5}
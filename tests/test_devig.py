@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.polymarket.aggregation import normalise_snapshot, snapshots_to_true_probs
+from app.polymarket.batch import batch_true_probs
+from app.polymarket.devig import METHODS, devig
+
+
+def _books(n: int = 200, seed: int = 0) -> np.ndarray:
+    """Implied probabilities of realistic books (2–6 % overround)."""
+    rng = np.random.default_rng(seed)
+    fair = rng.dirichlet(np.ones(3), size=n).clip(0.03, 0.8)
+    fair /= fair.sum(axis=-1, keepdims=True)
+    return fair * rng.uniform(1.02, 1.06, size=(n, 1))
+
+
+def _shin_reference(q: list) -> list:
+    """Scalar Shin solve by plain bisection."""
+    total = sum(q)
+
+    def probs(z: float) -> list:
+        return [
+            (math.sqrt(z * z + 4 * (1 - z) * qi * qi / total) - z) / (2 * (1 - z))
+            for qi in q
+        ]
+
+    lo, hi = 0.0, 0.999
+    for _ in range(200):
+        mid = (lo + hi) / 2
+        lo, hi = (mid, hi) if sum(probs(mid)) > 1 else (lo, mid)
+    return probs(lo)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_methods_sum_to_one_and_respect_mask(method) -> None:
+    q = _books()
+    mask = np.ones(q.shape, dtype=bool)
+    mask[::7, 2] = False  # some two-way books
+    p = devig(q, mask, method=method)
+    assert np.allclose(p.sum(axis=-1), 1.0)
+    assert np.all(p[~mask] == 0.0) and np.all(p[mask] >= 0.0)
+
+
+def test_power_solves_for_exponent() -> None:
+    q = _books()
+    p = devig(q, method="power")
+    k = np.log(p) / np.log(q)
+    assert np.allclose(k, k[:, :1])
+    assert np.allclose((q ** k[:, :1]).sum(axis=-1), 1.0)
+
+
+def test_shin_matches_scalar_reference() -> None:
+    q = _books(n=20, seed=3)
+    p = devig(q, method="shin")
+    for row, got in zip(q, p):
+        assert got == pytest.approx(_shin_reference(list(row)), rel=1e-9)
+
+
+def test_longshot_bias_correction() -> None:
+    q = 1.0 / np.array([1.2, 7.0, 15.0])
+    prop = devig(q, method="proportional")
+    for method in ("power", "shin"):
+        p = devig(q, method=method)
+        assert p[0] > prop[0] and p[-1] < prop[-1]
+
+
+def test_unknown_method() -> None:
+    with pytest.raises(ValueError):
+        devig(np.array([0.5, 0.6]), method="magic")  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("method", ["additive", "power", "shin"])
+def test_method_threads_through_pipelines(random_cycle, method) -> None:
+    snaps = random_cycle(2)
+    fixture = snaps[0].fixture_id
+    mine = [s for s in snaps if s.fixture_id == fixture]
+
+    expected = snapshots_to_true_probs(mine, history_window=3, method=method)
+    batched = batch_true_probs(snaps, history_window=3, method=method)[fixture]
+    assert batched == pytest.approx(expected, rel=1e-9)
+
+    single = normalise_snapshot(mine[0], method=method)
+    assert sum(single.values()) == pytest.approx(1.0)
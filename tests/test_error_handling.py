@@ -12,8 +12,11 @@ def test_cli_handles_provider_error(monkeypatch, command, caplog) -> None:
     async def _boom(*args, **kwargs):
         raise RuntimeError("provider blew up")
 
+    class _BoomProvider:
+        fetch_many_fixtures = staticmethod(_boom)
+
     # Patch provider fetcher + polymarket to fail
-    monkeypatch.setattr("app.cli._collect_provider_snaps", _boom)
+    monkeypatch.setattr("app.cli.get_active_providers", lambda: {"boom": _BoomProvider()})
     monkeypatch.setattr("app.cli.fetch_market_probs", _boom)
 
     caplog.set_level(logging.ERROR, logger="polymarket")
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.http_pool import close_pool
+from app.polymarket.feed import (
+    PriceFeed,
+    PriceStore,
+    PriceUpdate,
+    WebSocketTransport,
+    parse_message,
+)
+
+
+def test_parse_message_formats() -> None:
+    single = parse_message({"slug": "s", "outcome": "Yes", "price": "0.4", "ts": 1})
+    assert single == [PriceUpdate("s", "Yes", 0.4, 1.0)]
+    batch = parse_message(
+        [{"slug": "s", "changes": [{"outcome": "Yes", "price": 0.4}]}, {"hb": 1}]
+    )
+    assert [u.outcome for u in batch] == ["Yes"]
+
+
+def test_store_staleness() -> None:
+    import time
+
+    store = PriceStore()
+    store.apply(PriceUpdate("s", "Yes", 0.4, ts=0.0))
+    assert store.get("s") == {"Yes": 0.4}
+    assert store.get("s", max_age=60) == {}  # never subscribed, old price
+
+    # A quiet market on a live socket stays fresh however old its last change
+    store.mark_live(["s"], ts=0.0)
+    assert store.get("s", max_age=60) == {"Yes": 0.4}
+
+    # Once the socket drops, prices age out max_age after it went down
+    store.mark_down(["s"], ts=time.time() - 30)
+    assert store.get("s", max_age=60) == {"Yes": 0.4}
+    assert store.get("s", max_age=10) == {}
+
+
+@pytest.mark.asyncio
+async def test_feed_against_stub_websocket_server() -> None:
+    subscriptions = []
+
+    async def _ws_handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscriptions.append(await ws.receive_json())
+        await ws.send_json(
+            {
+                "slug": "team-a-vs-team-b",
+                "changes": [
+                    {"outcome": "Home", "price": 0.55},
+                    {"outcome": "Away", "price": 0.45},
+                ],
+            }
+        )
+        await ws.send_json(
+            {"slug": "team-a-vs-team-b", "outcome": "Home", "price": 0.6}
+        )
+        await asyncio.sleep(10)
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws", _ws_handler)
+    async with TestServer(app) as server:
+        feed = PriceFeed(
+            WebSocketTransport(str(server.make_url("/ws"))),
+            slugs=["team-a-vs-team-b"],
+        )
+        feed.start()
+        for _ in range(100):
+            if feed.store.get("team-a-vs-team-b").get("Home") == 0.6:
+                break
+            await asyncio.sleep(0.02)
+
+        async def _no_io(slug):
+            raise AssertionError("fallback should not be used")
+
+        rows = await feed.market_fetcher(fallback=_no_io)("team-a-vs-team-b")
+        assert sorted(rows, key=lambda r: r["outcome"]) == [
+            {"outcome": "Away", "prob": 0.45},
+            {"outcome": "Home", "prob": 0.6},
+        ]
+        assert subscriptions == [
+            {"type": "subscribe", "markets": ["team-a-vs-team-b"]}
+        ]
+        await feed.stop()
+    await close_pool()
+
+
+class _FakeTransport:
+    def __init__(self) -> None:
+        self.subscribed: list = []
+        self.closed = False
+        self._done = asyncio.Event()
+
+    async def connect(self) -> None:
+        self.closed = False
+
+    async def subscribe(self, slugs) -> None:
+        self.subscribed.append(list(slugs))
+
+    async def messages(self):
+        await self._done.wait()
+        return
+        yield
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_feed_subscribes_new_slugs_on_live_socket() -> None:
+    transport = _FakeTransport()
+    feed = PriceFeed(transport, slugs=["a"])
+    await feed.subscribe(["b"])  # before connect: joins the first subscribe
+    feed.start()
+    await asyncio.wait_for(feed.connected.wait(), 1)
+
+    await feed.subscribe(["b", "c"])
+    assert transport.subscribed == [["a", "b"], ["c"]]
+
+    await feed.stop()
+    assert transport.closed
@@ -0,0 +1,130 @@
+from datetime import datetime
+
+import pytest
+
+from app.matching import (
+    MarketMap,
+    event_from_feed,
+    market_from_gql,
+    match_events,
+    normalise_team,
+)
+
+
+def test_normalise_team() -> None:
+    assert normalise_team("Atlético Madrid FC") == "atletico madrid"
+
+
+def test_match_events_blocks_and_scores() -> None:
+    events = [
+        event_from_feed(
+            {
+                "id": "e1",
+                "sport_key": "soccer_epl",
+                "commence_time": "2025-03-01T15:00:00Z",
+                "home_team": "Manchester United",
+                "away_team": "Tottenham Hotspur",
+            }
+        ),
+        event_from_feed(
+            {
+                "id": "e2",
+                "sport_key": "soccer_epl",
+                "commence_time": "2025-03-08T15:00:00Z",
+                "home_team": "Manchester United",
+                "away_team": "Tottenham Hotspur",
+            }
+        ),
+    ]
+    markets = [
+        market_from_gql(
+            {
+                "slug": "man-utd-vs-spurs",
+                "title": "Tottenham Hotspur vs. Manchester United FC",
+                "category": "Soccer",
+                "startDate": "2025-03-01T15:00:00Z",
+            }
+        ),
+        market_from_gql(
+            {
+                "slug": "chelsea-vs-arsenal",
+                "title": "Chelsea vs Arsenal",
+                "category": "Soccer",
+                "startDate": "2025-03-01T17:30:00Z",
+            }
+        ),
+    ]
+    # e2 has the same teams but a different week -> blocked out
+    assert match_events(events, markets) == {"e1": "man-utd-vs-spurs"}
+    assert events[0].kickoff == datetime(2025, 3, 1, 15)
+
+
+def test_market_map_persists(tmp_path) -> None:
+    path = tmp_path / "map.json"
+    store = MarketMap(path)
+    store.update({"e1": "man-utd-vs-spurs"})
+    store.save()
+    assert MarketMap(path).get("e1") == "man-utd-vs-spurs"
+
+
+def test_market_map_prunes_and_reloads(tmp_path) -> None:
+    import os
+
+    path = tmp_path / "map.json"
+    writer = MarketMap(path)
+    writer.update(
+        {"old": "a-vs-b", "new": "c-vs-d"},
+        {"old": datetime(2025, 1, 1), "new": datetime(2025, 3, 1)},
+    )
+    writer.save()
+    reader = MarketMap(path)
+    assert reader.get("old") == "a-vs-b"
+
+    assert writer.prune(datetime(2025, 2, 1)) == 1
+    writer.save()
+    os.utime(path, (0, 0))  # force an mtime change within the same tick
+    reader.reload_if_changed()
+    assert reader.get("old") is None
+    assert reader.get("new") == "c-vs-d"
+
+
+@pytest.mark.asyncio
+async def test_refresh_market_map_maps_every_provider(tmp_path, monkeypatch) -> None:
+    from datetime import timedelta
+
+    from app import matching
+
+    kickoff = (datetime.utcnow() + timedelta(days=1)).strftime("%Y-%m-%dT15:00:00Z")
+
+    class _Provider:
+        def __init__(self, event_id: str) -> None:
+            self.event_id = event_id
+
+        async def fetch_events(self, sport):
+            return [
+                {
+                    "id": self.event_id,
+                    "sport_key": "soccer_epl",
+                    "commence_time": kickoff,
+                    "home_team": "Chelsea",
+                    "away_team": "Arsenal",
+                }
+            ]
+
+    async def _markets():
+        return [
+            {
+                "slug": "chelsea-vs-arsenal",
+                "title": "Chelsea vs Arsenal",
+                "category": "Soccer",
+                "startDate": kickoff,
+            }
+        ]
+
+    monkeypatch.setattr(matching, "fetch_sports_markets", _markets)
+    monkeypatch.setattr(matching, "_MARKET_MAP", MarketMap(tmp_path / "map.json"))
+
+    mapping = await matching.refresh_market_map(
+        providers={"odds_api": _Provider("o1"), "prop_odds": _Provider("p1")}
+    )
+    assert mapping == {"o1": "chelsea-vs-arsenal", "p1": "chelsea-vs-arsenal"}
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from app.pipeline import collect_fixture, collect_fixtures
+from app.polymarket.client import MarketBatch
+
+
+class _StubProvider:
+    def __init__(self, rows, delay: float = 0.0, exc: Exception | None = None):
+        self.rows = rows
+        self.delay = delay
+        self.exc = exc
+
+    async def fetch_many_fixtures(self, fixture_ids, sport="soccer", market="h2h"):
+        await asyncio.sleep(self.delay)
+        if self.exc:
+            raise self.exc
+        return {fid: self.rows for fid in fixture_ids}
+
+
+_ROWS = [
+    {"outcome": "home", "decimal_odds": 2.0},
+    {"outcome": "away", "decimal_odds": 2.0},
+]
+
+
+@pytest.mark.asyncio
+async def test_slow_provider_degrades_to_missing() -> None:
+    providers = {
+        "fast": _StubProvider(_ROWS),
+        "slow": _StubProvider(_ROWS, delay=5),
+        "broken": _StubProvider(_ROWS, exc=RuntimeError("boom")),
+    }
+
+    async def _market(slug):
+        return [{"outcome": "home", "prob": 0.5}]
+
+    quotes = await collect_fixture(
+        "123", providers, market_fetcher=_market, timeout=0.1
+    )
+    assert [s.provider for s in quotes.snapshots] == ["fast"]
+    assert sorted(quotes.missing) == ["broken", "slow"]
+    assert quotes.market_probs == [{"outcome": "home", "prob": 0.5}]
+
+
+@pytest.mark.asyncio
+async def test_providers_are_queried_concurrently() -> None:
+    providers = {f"p{i}": _StubProvider(_ROWS, delay=0.2) for i in range(5)}
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    quotes = await collect_fixtures(["1", "2"], providers, timeout=1)
+    assert loop.time() - start < 0.6
+    assert all(len(q.snapshots) == 5 for q in quotes)
+
+
+@pytest.mark.asyncio
+async def test_market_error_propagates() -> None:
+    async def _boom(slug):
+        raise RuntimeError("polymarket down")
+
+    with pytest.raises(RuntimeError):
+        await collect_fixture("123", {}, market_fetcher=_boom)
+
+
+@pytest.mark.asyncio
+async def test_market_error_is_per_fixture_in_batches() -> None:
+    async def _market(slug):
+        if slug == "2":
+            raise RuntimeError("polymarket down")
+        return [{"outcome": "home", "prob": 0.5}]
+
+    providers = {"p": _StubProvider(_ROWS)}
+    ok, failed = await collect_fixtures(["1", "2"], providers, market_fetcher=_market)
+    assert ok.market_probs == [{"outcome": "home", "prob": 0.5}]
+    assert ok.market_error is None
+    assert failed.market_probs == [] and isinstance(failed.market_error, RuntimeError)
+    assert len(failed.snapshots) == 1  # provider results kept
+
+
+@pytest.mark.asyncio
+async def test_market_batch_fetcher_makes_one_call() -> None:
+    calls = []
+
+    async def _batch(slugs):
+        calls.append(slugs)
+        return MarketBatch(
+            probs={"slug-1": [{"outcome": "home", "prob": 0.5}]},
+            errors={"slug-2": "market not found"},
+        )
+
+    ok, failed = await collect_fixtures(
+        ["1", "2"],
+        {"p": _StubProvider(_ROWS)},
+        market_batch_fetcher=_batch,
+        market_slugs={"1": "slug-1", "2": "slug-2"},
+    )
+    assert calls == [["slug-1", "slug-2"]]
+    assert ok.market_probs == [{"outcome": "home", "prob": 0.5}]
+    assert ok.market_error is None
+    assert failed.market_probs == []
+    assert str(failed.market_error) == "market not found"
+    assert len(failed.snapshots) == 1
+
+
+@pytest.mark.asyncio
+async def test_market_batch_failure_marks_every_fixture() -> None:
+    async def _batch(slugs):
+        raise RuntimeError("polymarket down")
+
+    quotes = await collect_fixtures(["1", "2"], {}, market_batch_fetcher=_batch)
+    assert all(isinstance(q.market_error, RuntimeError) for q in quotes)
@@ -41,3 +41,39 @@ async def test_fetch_market_probs_handles_404() -> None:
 
         with pytest.raises(RuntimeError):
             await fetch_market_probs(slug)
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_market_probs_chunks_and_reports_per_slug() -> None:
+    from app.polymarket.client import fetch_many_market_probs
+
+    outcomes = {"outcomes": [{"name": "Yes", "price": 0.3}]}
+    with aioresponses() as m:
+        # chunk 1: a + b (b unknown); chunk 2: c (HTTP failure)
+        m.post(
+            _POLY_URL,
+            payload={
+                "data": {"m0": outcomes, "m1": None},
+                "errors": [{"message": "market not found", "path": ["m1"]}],
+            },
+        )
+        m.post(_POLY_URL, status=500)
+
+        batch = await fetch_many_market_probs(["a", "b", "c", "a"], chunk_size=2)
+
+    assert batch.probs == {"a": [{"outcome": "Yes", "prob": 0.3}]}
+    assert batch.errors["b"] == "market not found"
+    assert "500" in batch.errors["c"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_market_probs_reports_non_json_body() -> None:
+    from app.polymarket.client import fetch_many_market_probs
+
+    with aioresponses() as m:
+        m.post(_POLY_URL, body="<html>gateway error</html>", status=200)
+
+        batch = await fetch_many_market_probs(["a", "b"])
+
+    assert batch.probs == {}
+    assert set(batch.errors) == {"a", "b"}
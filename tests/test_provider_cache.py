@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from app.providers import base
+from app.providers.cache import ResponseCache
+
+
+def test_lru_eviction_and_counters() -> None:
+    cache = ResponseCache(max_entries=2, default_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == (1, True)  # "a" is now most recently used
+    cache.set("c", 3)  # evicts "b"
+    assert cache.get("b") is None
+    assert len(cache) == 2
+    assert cache.stats() == {
+        "size": 2,
+        "hits": 1,
+        "stale_hits": 0,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_stale_window_and_purge(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("app.providers.cache.time.time", lambda: now[0])
+    cache = ResponseCache(default_ttl=10, stale_ttl=20)
+    cache.set("k", "v")
+    now[0] += 15
+    assert cache.get("k") == ("v", False)
+    assert cache.purge_expired() == 0
+    now[0] += 20
+    assert cache.purge_expired() == 1
+    assert "k" not in cache
+
+
+class _CountingProvider:
+    """Minimal stand-in exercising the decorator without HTTP."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.result: object = "v1"
+
+    def _cache_ttl(self, url: str) -> float:
+        return 0.0  # every stored entry is immediately stale
+
+    @base._ttl_cache
+    async def fetch(self, url, params):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate_keeps_last_good_payload(monkeypatch) -> None:
+    monkeypatch.setattr(base, "_CACHE", ResponseCache(default_ttl=0, stale_ttl=60))
+    provider = _CountingProvider()
+
+    assert await provider.fetch("u", {}) == "v1"  # cold miss, awaited
+    provider.result = None  # upstream now failing
+    assert await provider.fetch("u", {}) == "v1"  # stale served immediately
+    await asyncio.sleep(0.01)  # let the single background refresh run
+    assert provider.calls == 2
+    assert await provider.fetch("u", {}) == "v1"  # failed refresh ignored
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart_and_revalidates(
+    tmp_path, monkeypatch
+) -> None:
+    import re
+
+    from aioresponses import aioresponses
+
+    from app.providers.disk_cache import DiskCache
+    from app.providers.odds_api import OddsAPIProvider
+
+    feed_url = re.compile(r".*/sports/soccer/odds.*")
+    disk = DiskCache(tmp_path / "providers.sqlite")
+
+    def _fresh_process() -> OddsAPIProvider:
+        monkeypatch.setattr(base, "_CACHE", ResponseCache())  # memory tier lost
+        provider = OddsAPIProvider(api_key="k")
+        provider._disk = disk
+        return provider
+
+    provider = _fresh_process()
+    url, params = provider._feed_request("soccer", "h2h")
+    with aioresponses() as m:
+        m.get(feed_url, payload=[{"id": "e1"}], headers={"ETag": '"v1"'})
+        assert await provider._get_json(url, params) == [{"id": "e1"}]
+    await provider.close()
+
+    # Warm restart: answered from disk, no HTTP at all
+    provider = _fresh_process()
+    with aioresponses() as m:
+        assert await provider._get_json(url, params) == [{"id": "e1"}]
+        assert not m.requests
+    await provider.close()
+
+    # Expired on disk: conditional request, 304 reuses the stored payload
+    provider = _fresh_process()
+    provider.cache_ttl = 0
+    with aioresponses() as m:
+        m.get(feed_url, status=304)
+        assert await provider._get_json(url, params) == [{"id": "e1"}]
+        (call,) = next(iter(m.requests.values()))
+        assert call.kwargs["headers"]["If-None-Match"] == '"v1"'
+    await provider.close()
+    disk.close()
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from app.providers.odds_api import OddsAPIProvider
@@ -14,3 +16,219 @@ async def test_odds_api_returns_empty_without_key() -> None:
 async def test_prop_odds_returns_empty_without_key() -> None:
     provider = PropOddsProvider(api_key=None)
     assert await provider.fetch_fixture_odds("fake") == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_fixtures_single_feed_download() -> None:
+    import re
+
+    from aioresponses import aioresponses
+
+    from app.providers.base import _CACHE
+
+    _CACHE.clear()
+    feed = [
+        {
+            "id": eid,
+            "bookmakers": [
+                {
+                    "markets": [
+                        {
+                            "outcomes": [
+                                {"name": "home", "price": 2.0},
+                                {"name": "away", "price": 1.8},
+                            ]
+                        }
+                    ]
+                }
+            ],
+        }
+        for eid in ("e1", "e2", "e3")
+    ]
+    provider = OddsAPIProvider(api_key="k")
+    with aioresponses() as m:
+        m.get(re.compile(r".*/sports/soccer/odds.*"), payload=feed)  # once only
+        found = await provider.fetch_many_fixtures(["e1", "e3", "missing"])
+        assert set(found) == {"e1", "e3"}
+        assert found["e1"][0] == {"outcome": "home", "decimal_odds": 2.0}
+        # Answered from the cached feed + memoised index
+        assert await provider.fetch_fixture_odds("e2") == found["e1"]
+    await provider.close()
+    _CACHE.clear()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_request() -> None:
+    import asyncio
+    import re
+
+    from aioresponses import aioresponses
+
+    from app.providers.base import _CACHE
+
+    _CACHE.clear()
+    provider = OddsAPIProvider(api_key="k")
+    with aioresponses() as m:
+        m.get(re.compile(r".*/sports/soccer/odds.*"), payload=[])  # once only
+        url, params = provider._feed_request("soccer", "h2h")
+        results = await asyncio.gather(
+            *(provider._get_json(url, params) for _ in range(5))
+        )
+        assert results == [[]] * 5
+        assert sum(len(calls) for calls in m.requests.values()) == 1
+    await provider.close()
+    _CACHE.clear()
+
+
+def test_providers_have_independent_budgets() -> None:
+    odds_api = OddsAPIProvider(api_key="k")
+    prop_odds = PropOddsProvider(api_key="k")
+    assert odds_api.budget is not prop_odds.budget
+    assert OddsAPIProvider(api_key="k").budget is odds_api.budget  # per provider
+
+
+@pytest.mark.asyncio
+async def test_rate_budget_quota_and_wait() -> None:
+    from app.providers.limits import RateBudget
+
+    budget = RateBudget(rate=100, burst=2, monthly_quota=3)
+    assert [await budget.acquire() for _ in range(4)] == [True, True, True, False]
+    assert budget.remaining == 0
+    assert budget.total_wait > 0  # third call had to wait for a token
+
+
+@pytest.mark.asyncio
+async def test_rate_budget_concurrent_waiters_cannot_overshoot() -> None:
+    from app.providers.limits import RateBudget
+
+    budget = RateBudget(rate=50, burst=1, monthly_quota=3)
+    granted = await asyncio.gather(*(budget.acquire() for _ in range(10)))
+    assert sum(granted) == 3 and budget.used_this_month == 3
+
+
+@pytest.mark.asyncio
+async def test_rate_budget_quota_is_persisted(tmp_path) -> None:
+    from app.providers.disk_cache import DiskCache
+    from app.providers.limits import RateBudget
+
+    path = tmp_path / "cache.sqlite"
+    first = RateBudget(rate=100, monthly_quota=3, name="p", store=DiskCache(path))
+    assert [await first.acquire() for _ in range(2)] == [True, True]
+
+    # A restarted (or second) process sees the same counter
+    second = RateBudget(rate=100, monthly_quota=3, name="p", store=DiskCache(path))
+    assert second.used_this_month == 2
+    assert [await second.acquire() for _ in range(2)] == [True, False]
+    assert first.remaining == 0
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_providers_and_pool(monkeypatch) -> None:
+    from app.http_pool import get_pool
+    from app.providers import ProviderRegistry
+
+    monkeypatch.setenv("ODDS_API_KEY", "k")
+    monkeypatch.delenv("PROP_ODDS_API_KEY", raising=False)
+    registry = ProviderRegistry()
+    first = registry.active()
+    assert list(first) == ["the_odds_api"]
+    assert registry.active()["the_odds_api"] is first["the_odds_api"]
+
+    session = await first["the_odds_api"]._get_session()
+    assert session is await get_pool().session()  # shared with Polymarket client
+    await registry.aclose()
+    assert session.closed
+
+
+async def _chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("size", [1, 7, 4096])
+async def test_iter_json_array_across_chunk_boundaries(size) -> None:
+    import json
+
+    from app.providers.streaming import iter_json_array
+
+    events = [
+        {"id": i, "name": "Málaga – Sevilla", "x": [1, {"y": "]"}]} for i in range(5)
+    ]
+    root = json.dumps(events).encode()
+    assert [e async for e in iter_json_array(_chunked(root, size))] == events
+
+    nested = json.dumps({"meta": {"n": 5}, "events": events}).encode()
+    got = [e async for e in iter_json_array(_chunked(nested, size), key="events")]
+    assert got == events
+
+
+@pytest.mark.asyncio
+async def test_stream_mode_keeps_only_requested_fixtures() -> None:
+    import re
+
+    from aioresponses import aioresponses
+
+    feed = {
+        "events": [
+            {
+                "id": f"e{i}",
+                "markets": [
+                    {"key": "spreads", "outcomes": [{"name": "x", "price": 9.0}]},
+                    {
+                        "key": "h2h",
+                        "outcomes": [{"name": "home", "oddsDecimal": 2.5}],
+                    },
+                ],
+            }
+            for i in range(50)
+        ]
+    }
+    provider = PropOddsProvider(api_key="k")
+    provider.stream_feeds = True
+    with aioresponses() as m:
+        m.get(re.compile(r".*/soccer/odds.*"), payload=feed)  # once only
+        found = await provider.fetch_many_fixtures(["e3", "e7"])
+        assert found == {
+            "e3": [{"outcome": "home", "decimal_odds": 2.5}],
+            "e7": [{"outcome": "home", "decimal_odds": 2.5}],
+        }
+        # Other fixtures of the same feed: answered from the cached index
+        assert await provider.fetch_fixture_odds("e40") == found["e3"]
+    await provider.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_mode_shares_one_download(tmp_path, monkeypatch) -> None:
+    import re
+
+    from aioresponses import aioresponses
+
+    from app.providers import base
+    from app.providers.cache import ResponseCache
+    from app.providers.disk_cache import DiskCache
+
+    monkeypatch.setattr(base, "_CACHE", ResponseCache(default_ttl=60))
+    feed = {
+        "events": [
+            {"id": f"e{i}", "markets": [{"key": "h2h", "outcomes": []}]}
+            for i in range(10)
+        ]
+    }
+    provider = PropOddsProvider(api_key="k2")
+    provider.stream_feeds = True
+    provider._disk = DiskCache(tmp_path / "cache.sqlite")
+    with aioresponses() as m:
+        m.get(re.compile(r".*/soccer/odds.*"), payload=feed)  # once only
+        # Concurrent callers wanting different fixtures coalesce
+        a, b = await asyncio.gather(
+            provider.fetch_many_fixtures(["e1"]),
+            provider.fetch_many_fixtures(["e2", "e9"]),
+        )
+    assert a == {"e1": []} and b == {"e2": [], "e9": []}
+
+    # A restarted process answers from the disk tier without a request
+    monkeypatch.setattr(base, "_CACHE", ResponseCache(default_ttl=60))
+    with aioresponses():
+        assert await provider.fetch_many_fixtures(["e5"]) == {"e5": []}
+    await provider.close()
@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from app.polymarket.aggregation import OutcomeOdds, ProviderSnapshot
+from app.replay import PRICES, RESULT, SNAPSHOT, Replay, replay
+
+T0 = datetime(2025, 3, 1)
+
+
+def _snap(fixture: str, minute: int, home: float, away: float) -> tuple:
+    ts = T0 + timedelta(minutes=minute)
+    odds = [OutcomeOdds("home", home), OutcomeOdds("away", away)]
+    return ts, SNAPSHOT, ProviderSnapshot("p1", fixture, ts, odds)
+
+
+def _prices(fixture: str, minute: int, home: float, away: float) -> tuple:
+    prices = {"home": home, "away": away}
+    return T0 + timedelta(minutes=minute), PRICES, (fixture, prices)
+
+
+def _result(fixture: str, minute: int, winner: str) -> tuple:
+    return T0 + timedelta(minutes=minute), RESULT, (fixture, winner)
+
+
+def test_bets_on_edge_and_settles() -> None:
+    engine = Replay(bankroll=1000.0, alpha=1.0, kelly_fraction=0.5, max_cap=0.10)
+    result = engine.run(
+        [
+            _snap("f1", 0, 1.6, 2.6),  # true home ≈ 0.62
+            _prices("f1", 1, 0.50, 0.50),  # edge on home -> bet
+            _prices("f1", 2, 0.50, 0.50),  # unchanged -> no re-evaluation
+            _result("f1", 90, "home"),
+        ]
+    )
+    assert result.n_bets == 1 and result.n_settled == 1
+    stake = result.staked
+    assert 0 < stake <= 100.0
+    assert result.realised_pnl == pytest.approx(stake)  # price 0.5 -> doubles
+    assert result.bankroll == pytest.approx(1000.0 + stake)
+    assert result.open_exposure == 0.0
+    # Settled fixtures leave no state behind
+    assert len(engine.store) == 0 and not engine._prices
+
+
+def test_tops_up_to_target_and_loses() -> None:
+    engine = Replay(bankroll=1000.0, alpha=1.0, max_cap=0.5)
+    result = engine.run(
+        [
+            _snap("f1", 0, 1.6, 2.6),
+            _prices("f1", 1, 0.55, 0.45),
+            _prices("f1", 2, 0.45, 0.55),  # bigger edge -> top up
+            _result("f1", 90, "away"),
+        ]
+    )
+    assert result.n_bets == 2
+    assert result.realised_pnl == pytest.approx(-result.staked)
+    assert result.max_drawdown == pytest.approx(result.staked / 1000.0)
+
+
+def test_single_outcome_book_is_skipped() -> None:
+    ts = T0
+    snap = ProviderSnapshot("p1", "f1", ts, [OutcomeOdds("home", 1.05)])
+    result = Replay().run(
+        [
+            (ts, SNAPSHOT, snap),  # true home = 1.0
+            (ts + timedelta(minutes=1), PRICES, ("f1", {"home": 0.9})),
+            _result("f1", 90, "home"),
+        ]
+    )
+    assert result.n_bets == 0 and result.bankroll == pytest.approx(1000.0)
+
+
+def test_curve_is_bucketed_and_idle_fixtures_evicted() -> None:
+    engine = Replay(resolution=timedelta(hours=1), max_idle=timedelta(hours=2))
+    events = [_snap("f1", 0, 1.9, 1.9)]
+    events += [_snap("f2", m, 1.9, 1.9) for m in range(0, 6 * 60, 5)]
+    result = engine.run(events)
+    assert [p.ts for p in result.curve] == [
+        T0 + timedelta(hours=h) for h in range(1, 7)
+    ]
+    assert engine.store.fixtures() == ["f2"]
+
+
+@pytest_asyncio.fixture
+async def history_db(tmp_path, monkeypatch):
+    """File-backed SQLite (one connection per stream) with tick history."""
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'h.db'}")
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE odds_snapshots (fixture_id TEXT, provider_id TEXT, "
+                "ts TIMESTAMP, outcome TEXT, decimal_odds REAL)"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE TABLE poly_prices "
+                "(fixture_id TEXT, ts TIMESTAMP, outcome TEXT, prob REAL)"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE TABLE results "
+                "(fixture_id TEXT, outcome TEXT, winner TEXT, settled_at TIMESTAMP)"
+            )
+        )
+        odds, prices, results = [], [], []
+        for i in range(20):
+            f, day = f"f{i}", T0 + timedelta(days=i)
+            winner = "home" if i % 3 else "away"
+            for p in ("p1", "p2"):
+                for o, d in (("home", 1.6), ("away", 2.6)):
+                    odds.append({"f": f, "p": p, "ts": day, "o": o, "d": d})
+            for m in range(1, 4):
+                for o, q in (("home", 0.5), ("away", 0.5 - m / 100)):
+                    ts = day + timedelta(minutes=m)
+                    prices.append({"f": f, "ts": ts, "o": o, "q": q})
+            for o in ("home", "away"):
+                results.append(
+                    {"f": f, "o": o, "w": winner, "t": day + timedelta(hours=3)}
+                )
+        await conn.execute(
+            text("INSERT INTO odds_snapshots VALUES (:f, :p, :ts, :o, :d)"), odds
+        )
+        await conn.execute(
+            text("INSERT INTO poly_prices VALUES (:f, :ts, :o, :q)"), prices
+        )
+        await conn.execute(text("INSERT INTO results VALUES (:f, :o, :w, :t)"), results)
+    monkeypatch.setattr(
+        "app.replay.async_session_factory",
+        async_sessionmaker(engine, expire_on_commit=False),
+    )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replay_streams_history_in_event_order(history_db) -> None:
+    result = await replay(bankroll=1000.0, alpha=1.0, chunk_size=7)
+    # Only home has an edge; one bet per fixture (later ticks don't widen it)
+    assert result.n_bets == 20 and result.n_settled == 20
+    assert result.open_exposure == pytest.approx(0.0)
+    assert result.bankroll == pytest.approx(1000.0 + result.realised_pnl)
+    assert result.curve[-1].equity == pytest.approx(result.bankroll)
+
+    window = await replay(
+        since=T0 + timedelta(days=10), bankroll=1000.0, alpha=1.0, chunk_size=7
+    )
+    assert window.n_settled == 10
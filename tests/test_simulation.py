@@ -0,0 +1,87 @@
+import json
+import math
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from app.cli import app
+from app.simulation import (
+    SimulationStats,
+    build_slate,
+    simulate,
+    simulate_chunk,
+    slate_from_recommendations,
+)
+
+_FIXTURES = {
+    f"f{i}": (
+        {"home": 0.45, "draw": 0.28, "away": 0.27},
+        {"home": 0.40, "draw": 0.30, "away": 0.31},
+    )
+    for i in range(3)
+}
+
+
+def test_build_slate_sizes_like_recommend() -> None:
+    slate = build_slate(_FIXTURES, kelly_fraction=0.5, max_cap=0.10)
+    # half-Kelly on home only: 0.5 * (0.45 - 0.40) / 0.60
+    assert np.allclose(slate.stakes[:, 0], 0.5 * 0.05 / 0.60)
+    assert np.all(slate.stakes[:, 1:] == 0.0)
+
+
+def test_growth_matches_expected_log_growth() -> None:
+    slate = build_slate(_FIXTURES, kelly_fraction=1.0, max_cap=1.0)
+    result = simulate(
+        slate, n_paths=40_000, n_rounds=20, chunk_size=7_000, seed=3, workers=1
+    )
+    f = slate.stakes[0, 0]
+    expected = 3 * (0.45 * math.log(1 - f + f / 0.40) + 0.55 * math.log(1 - f))
+    assert result.n_paths == 40_000
+    assert result.growth_rate == pytest.approx(expected, abs=2e-3)
+    qs = list(result.drawdown_quantiles.values())
+    assert qs == sorted(qs) and 0.0 < qs[0] < 1.0
+
+
+def test_chunks_merge_and_seed_reproducibly() -> None:
+    slate = build_slate(_FIXTURES)
+    a = simulate_chunk(slate, 1_000, 10, seed=1)
+    b = simulate_chunk(slate, 1_000, 10, seed=1)
+    assert a.sum_growth == b.sum_growth
+    merged = SimulationStats().merge(a).merge(b)
+    assert merged.n_paths == 2_000 and merged.drawdown_hist.sum() == 2_000
+
+    kwargs = dict(n_paths=4_000, n_rounds=5, chunk_size=1_000, seed=9)
+    assert simulate(slate, workers=2, **kwargs) == simulate(slate, workers=1, **kwargs)
+
+
+def test_overbetting_raises_ruin() -> None:
+    slate_full = build_slate(_FIXTURES, kelly_fraction=4.0, max_cap=1.0)
+    slate_half = build_slate(_FIXTURES, kelly_fraction=0.5, max_cap=1.0)
+    full = simulate(slate_full, n_paths=5_000, n_rounds=100, seed=1, workers=1)
+    half = simulate(slate_half, n_paths=5_000, n_rounds=100, seed=1, workers=1)
+    assert full.ruin_probability > half.ruin_probability
+    assert half.growth_rate > full.growth_rate
+
+
+def test_simulate_cli(tmp_path) -> None:
+    recs = [
+        {
+            "fixture": name,
+            "true_probs": true_p,
+            "market_probs": market_p,
+            "recommendations": {"home": 4.17},
+        }
+        for name, (true_p, market_p) in _FIXTURES.items()
+    ]
+    path = tmp_path / "recs.json"
+    path.write_text(json.dumps(recs))
+    slate = slate_from_recommendations(recs)
+    assert slate.fixtures == list(_FIXTURES)
+
+    result = CliRunner().invoke(
+        app,
+        ["simulate", str(path), "--paths", "2000", "--rounds", "10", "--workers", "1"],
+    )
+    assert result.exit_code == 0, result.output
+    assert "ruin=" in result.stdout
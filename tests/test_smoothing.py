@@ -0,0 +1,160 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.polymarket.aggregation import (
+    OutcomeOdds,
+    ProviderSnapshot,
+    normalise_snapshot,
+    snapshots_to_true_probs,
+)
+from app.polymarket.smoothing import (
+    DecayWindow,
+    EwmaStore,
+    HalfLifeStore,
+    checkpoint,
+    restore,
+)
+
+
+def _history(seed: int, n: int = 40) -> list:
+    rng = random.Random(seed)
+    t0 = datetime(2025, 1, 1)
+    return [
+        ProviderSnapshot(
+            provider=f"p{rng.randrange(3)}",
+            fixture_id="f1",
+            ts=t0 + timedelta(minutes=i),
+            odds=[OutcomeOdds(o, rng.uniform(1.2, 8.0)) for o in ("home", "draw", "away")],
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_store_matches_full_history(seed) -> None:
+    snaps = _history(seed)
+    store = EwmaStore(alpha=0.4)
+    store.update_many(snaps)
+
+    expected = snapshots_to_true_probs(snaps, history_window=len(snaps), alpha=0.4)
+    got = store.current("f1")
+    assert got.keys() == expected.keys()
+    for outcome, p in expected.items():
+        assert got[outcome] == pytest.approx(p)
+
+
+def test_unknown_fixture_and_drop() -> None:
+    store = EwmaStore()
+    assert store.current("nope") == {}
+    store.update_many(_history(0, n=5))
+    assert store.fixtures() == ["f1"]
+    store.drop("f1")
+    assert len(store) == 0 and store.current("f1") == {}
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_roundtrip() -> None:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    import app.db.models  # noqa: F401
+    from app.db.base import Base
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    store = EwmaStore()
+    store.update_many(_history(1))
+    async with factory() as sess:
+        await checkpoint(store, sess)
+        await sess.commit()
+
+    restored = EwmaStore()
+    async with factory() as sess:
+        await restore(restored, sess)
+    assert restored.current("f1") == pytest.approx(store.current("f1"))
+
+    # Only changed fixtures are rewritten; dropped ones are deleted
+    f2 = [ProviderSnapshot(s.provider, "f2", s.ts, s.odds) for s in _history(2)]
+    store.update_many(f2)
+    assert store.pending() == ({"f2"}, set())
+    store.drop("f1")
+    async with factory() as sess:
+        await checkpoint(store, sess)
+        await sess.commit()
+    assert store.pending() == (set(), set())
+
+    restored = EwmaStore()
+    async with factory() as sess:
+        await restore(restored, sess)
+    assert restored.fixtures() == ["f2"]
+    assert restored.current("f2") == pytest.approx(store.current("f2"))
+    await engine.dispose()
+
+
+def _drifting(provider: str, step: timedelta, span: timedelta) -> list:
+    """Home odds drifting from 2.0 to 3.0 over `span`, sampled every `step`."""
+    t0 = datetime(2025, 1, 1)
+    n = int(span / step)
+    return [
+        ProviderSnapshot(
+            provider=provider,
+            fixture_id="f1",
+            ts=t0 + i * step,
+            odds=[OutcomeOdds("home", 2.0 + i / n), OutcomeOdds("away", 2.0)],
+        )
+        for i in range(n + 1)
+    ]
+
+
+def test_half_life_is_poll_rate_independent() -> None:
+    span, half_life = timedelta(hours=2), timedelta(minutes=20)
+    fast = _drifting("fast", timedelta(seconds=30), span)
+    slow = _drifting("slow", timedelta(minutes=10), span)
+
+    p_fast, p_slow = (
+        snapshots_to_true_probs(s, half_life=half_life)["home"] for s in (fast, slow)
+    )
+    latest = normalise_snapshot(fast[-1])["home"]
+    # Both lag the latest price by a similar amount
+    assert p_fast > latest and p_slow > latest
+    assert p_fast == pytest.approx(p_slow, abs=0.01)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_half_life_store_matches_batch_smoother(seed) -> None:
+    rng = random.Random(seed)
+    t = datetime(2025, 1, 1)
+    snaps = []
+    for _ in range(300):
+        t += timedelta(seconds=rng.choice([5, 30, 600]))
+        snaps.append(
+            ProviderSnapshot(
+                provider=f"p{rng.randrange(3)}",
+                fixture_id="f1",
+                ts=t,
+                odds=[
+                    OutcomeOdds(o, rng.uniform(1.2, 8.0)) for o in ("home", "draw", "away")
+                ],
+            )
+        )
+    half_life, max_age = timedelta(minutes=5), timedelta(minutes=30)
+    store = HalfLifeStore(half_life, max_age=max_age, maxlen=10_000)
+    store.update_many(snaps)
+
+    expected = snapshots_to_true_probs(snaps, half_life=half_life, max_age=max_age)
+    assert store.current("f1") == pytest.approx(expected, rel=1e-9)
+
+
+def test_decay_window_is_bounded() -> None:
+    window = DecayWindow(half_life=60.0, max_age=600.0, maxlen=5)
+    for i in range(100):
+        window.push(i * 1.0, {"a": 0.5, "b": 0.5})
+    assert len(window) == 5
+    for i in range(100, 200):
+        window.push(i * 1000.0, {"a": 0.2, "b": 0.8})  # forces rebasing
+    assert len(window) == 1
+    assert window.value() == pytest.approx({"a": 0.2, "b": 0.8})
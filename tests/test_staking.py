@@ -1,9 +1,17 @@
+import numpy as np
 import pytest
 
 from app.polymarket.staking import (
+    _log_growth,
+    _solve_capped,
     compute_edge,
     fractional_kelly,
+    joint_kelly,
+    optimise_slate,
     recommend,
+    recommend_batch,
+    recommend_joint,
+    recommend_many,
 )
 
 
@@ -47,3 +55,95 @@ def test_recommend_filters_and_scales() -> None:
     # stake_frac = 0.0673076923 → stake ≈ 13.46
     assert list(recs.keys()) == ["Yes"]
     assert pytest.approx(recs["Yes"], rel=1e-2) == 13.46
+
+
+def test_recommend_batch_matches_scalar() -> None:
+    rng = np.random.default_rng(0)
+    cycle = {}
+    for i in range(200):
+        true_p = dict(zip(["home", "draw", "away"], rng.dirichlet(np.ones(3) * 3)))
+        market_p = {
+            o: float(np.clip(p + rng.normal(0, 0.05), 0.01, 0.99))
+            for o, p in true_p.items()
+        }
+        cycle[f"f{i}"] = (true_p, market_p)
+
+    got = recommend_many(cycle, edge_threshold=0.02, bankroll=250.0)
+    expected = {
+        f: recs
+        for f, (t, m) in cycle.items()
+        if (recs := recommend(t, m, edge_threshold=0.02, bankroll=250.0))
+    }
+    assert got == expected
+
+
+def test_recommend_batch_table() -> None:
+    table = recommend_batch(
+        np.array([0.55, 0.45, 0.30]),
+        np.array([0.48, 0.52, np.nan]),  # last outcome unquoted
+        outcomes=["Yes", "No", "Other"],
+        bankroll=200,
+    )
+    assert table.row.tolist() == [0]
+    df = table.to_dataframe()
+    assert df.loc[0, "outcome"] == "Yes"
+    assert pytest.approx(df.loc[0, "stake"], rel=1e-2) == 13.46
+
+
+def _books(n: int, seed: int = 1):
+    """Three-way books with a 2 % overround and noisy prices."""
+    rng = np.random.default_rng(seed)
+    p = rng.dirichlet(np.ones(3) * 3, size=n)
+    q = np.clip(p * np.exp(rng.normal(0, 0.15, p.shape)), 0.01, None)
+    return p, np.clip(q / q.sum(axis=-1, keepdims=True) * 1.02, 0.01, 0.99)
+
+
+def test_joint_kelly_two_way_matches_binary_kelly() -> None:
+    # With one bettable side the joint solution is ordinary Kelly
+    f = joint_kelly(np.array([0.55, 0.45]), np.array([0.48, 0.54]))
+    assert f[1] == 0.0
+    assert pytest.approx(f[0], rel=1e-9) == (0.55 - 0.48) / (1 - 0.48)
+
+
+def test_joint_kelly_is_optimal() -> None:
+    p, c = _books(20)
+    f = joint_kelly(p, c)
+    ok = np.ones_like(p, dtype=bool)
+    for k in range(len(p)):
+        row = slice(k, k + 1)
+        x = _solve_capped(
+            p[row], c[row], ok[row], 0.99, np.zeros((1, 3)), max_iter=20_000
+        )
+        assert np.allclose(x * c[k], f[k], atol=1e-6)
+
+
+def test_optimise_slate_respects_exposure_cap() -> None:
+    p, c = _books(500, seed=2)
+    free = optimise_slate(p, c, kelly_fraction=1.0, max_exposure=100.0)
+    capped = optimise_slate(p, c, kelly_fraction=1.0, max_exposure=0.2)
+    assert free.sum() > 0.2
+    assert pytest.approx(capped.sum(), rel=1e-6) == 0.2
+    # Beats simply scaling the unconstrained stakes down to the cap
+    scaled = free * 0.2 / free.sum()
+    growth = lambda f: _log_growth(f / c, p, c).sum()  # noqa: E731
+    assert growth(capped) >= growth(scaled)
+    with pytest.raises(ValueError):
+        optimise_slate(p, c, kelly_fraction=0.0)
+
+
+def test_recommend_joint_beats_separate_sizing() -> None:
+    true_p = {"home": 0.40, "draw": 0.32, "away": 0.28}
+    market_p = {"home": 0.33, "draw": 0.27, "away": 0.42}
+    separate = recommend(true_p, market_p, kelly_fraction=1.0, max_cap=1.0)
+    joint = recommend_joint(true_p, market_p, kelly_fraction=1.0, max_exposure=1.0)
+    assert joint.keys() == separate.keys() == {"home", "draw"}
+
+    outcomes = list(true_p)
+    p = np.array([[true_p[o] for o in outcomes]])
+    c = np.array([[market_p[o] for o in outcomes]])
+
+    def growth(stakes: dict) -> float:
+        f = np.array([[stakes.get(o, 0.0) / 100.0 for o in outcomes]])
+        return float(_log_growth(f / c, p, c)[0])
+
+    assert growth(joint) > growth(separate)
@@ -0,0 +1,111 @@
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.polymarket.aggregation import SnapshotBatch
+from app.polymarket.batch import batch_true_probs
+from app.sweep import (
+    SweepConfig,
+    expanding_brier_weights,
+    open_dataset,
+    sweep,
+    write_dataset,
+)
+
+
+def _dataset(snaps: list):
+    batch = SnapshotBatch.from_snapshots(snaps)
+    winners = {f: "home" if i % 2 else "away" for i, f in enumerate(batch.fixtures)}
+    winners.pop(batch.fixtures[0])  # one unsettled fixture
+    return batch, winners
+
+
+def _settle_times(batch, winners) -> dict:
+    # Fixture k settles k hours into the hour-long cycle
+    return {
+        f: datetime(2025, 1, 1) + timedelta(hours=k)
+        for k, f in enumerate(batch.fixtures)
+        if f in winners
+    }
+
+
+def test_dataset_roundtrip_is_memory_mapped(tmp_path, random_cycle) -> None:
+    batch, winners = _dataset(random_cycle(0))
+    write_dataset(batch, winners, tmp_path)
+    mapped, got_winners = open_dataset(tmp_path)
+    assert isinstance(mapped.decimal_odds, np.memmap)
+    assert got_winners == winners
+    assert mapped.to_snapshots() == batch.to_snapshots()
+
+
+def test_brier_matches_scalar_scoring(tmp_path, random_cycle) -> None:
+    batch, winners = _dataset(random_cycle(1))
+    (result,) = sweep(
+        batch, winners, alphas=[0.4], windows=[3], weightings=["equal"], workers=1
+    )
+    probs = batch_true_probs(batch, history_window=3, alpha=0.4)
+    errors = [
+        (p - (outcome == winners[f])) ** 2
+        for f, dist in probs.items()
+        if f in winners
+        for outcome, p in dist.items()
+    ]
+    assert result.brier == pytest.approx(sum(errors) / len(errors))
+    assert result.n_fixtures == sum(f in winners for f in probs)
+    expected_ll = [
+        -math.log(max(probs[f].get(w, 0.0), 1e-15)) for f, w in winners.items()
+    ]
+    assert result.log_loss == pytest.approx(sum(expected_ll) / len(expected_ll))
+
+
+def test_pool_matches_in_process_and_ranks(random_cycle) -> None:
+    batch, winners = _dataset(random_cycle(2))
+    settled_at = _settle_times(batch, winners)
+    grid = dict(alphas=[0.3, 0.9], windows=[1, 4], settled_at=settled_at)
+    serial = sweep(batch, winners, workers=1, **grid)
+    pooled = sweep(batch, winners, workers=2, **grid)
+    assert len(serial) == 2 * 2 * 2
+    assert serial == pooled
+    assert [r.brier for r in serial] == sorted(r.brier for r in serial)
+
+    by_roi = sweep(batch, winners, workers=1, rank_by="roi", **grid)
+    assert [r.roi for r in by_roi] == sorted((r.roi for r in by_roi), reverse=True)
+    configs = {SweepConfig(r.alpha, r.window, r.weighting) for r in by_roi}
+    assert len(configs) == len(by_roi)
+
+
+def test_inverse_brier_weights_use_only_earlier_results(random_cycle) -> None:
+    from app.backtest import brier_scores_from_batch
+
+    batch, winners = _dataset(random_cycle(3))
+    newest = {
+        f: max(s.ts for s in batch.to_snapshots() if s.fixture_id == f)
+        for f in batch.fixtures
+    }
+    # One fixture settles mid-cycle, everything else after the cycle
+    early = min(winners, key=newest.get)
+    settled_at = {f: datetime(2025, 2, 1) for f in winners}
+    settled_at[early] = newest[early] + timedelta(seconds=1)
+    weights = expanding_brier_weights(batch, winners, settled_at)
+    assert weights.shape == (len(batch.fixtures), len(batch.providers))
+
+    prior = brier_scores_from_batch(batch, {early: winners[early]})
+    for f, fixture in enumerate(batch.fixtures):
+        if newest[fixture] <= settled_at[early]:
+            assert (weights[f] == 1.0).all()  # nothing settled before it
+            continue
+        for p, provider in enumerate(batch.providers):
+            if provider in prior:
+                assert weights[f, p] == pytest.approx(1.0 / prior[provider])
+
+
+def test_unknown_options(random_cycle) -> None:
+    batch, winners = _dataset(random_cycle(0))
+    with pytest.raises(ValueError):
+        sweep(batch, winners, rank_by="sharpe")
+    with pytest.raises(ValueError):
+        sweep(batch, winners, weightings=["magic"])
+    with pytest.raises(ValueError):  # inverse_brier needs settle times
+        sweep(batch, winners, weightings=["inverse_brier"])
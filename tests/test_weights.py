@@ -0,0 +1,70 @@
+import pytest
+
+from app.polymarket.aggregation import snapshots_to_true_probs
+from app.weights import WeightsCache, load_scores
+
+
+def test_weights_from_scores() -> None:
+    cache = WeightsCache()
+    assert cache.weights(["p1", "p2"]) is None  # nothing scored -> equal
+
+    cache.set_scores({"p1": 0.2, "p2": 0.1, "p3": 0.25})
+    assert cache.weights(["p1", "p2", "p9"]) == pytest.approx(
+        {"p1": 5.0, "p2": 10.0, "p9": 7.5}  # unscored -> median
+    )
+
+
+def test_weighted_aggregation_keeps_every_provider(random_cycle) -> None:
+    snaps = [s for s in random_cycle(0) if s.fixture_id == "f1"]
+    cache = WeightsCache()
+    cache.set_scores({"p0": 0.2})
+    weights = cache.weights(s.provider for s in snaps)
+    probs = snapshots_to_true_probs(snaps, weights=weights)
+    assert sum(probs.values()) == pytest.approx(1.0)
+    assert probs == pytest.approx(snapshots_to_true_probs(snaps))  # all neutral
+
+
+@pytest.mark.asyncio
+async def test_refreshes_once_per_ttl(monkeypatch, random_cycle) -> None:
+    calls = []
+
+    async def _refresh(self) -> None:
+        calls.append(1)
+        self.set_scores({"p1": 0.2})
+
+    monkeypatch.setattr(WeightsCache, "refresh", _refresh)
+    cache = WeightsCache(ttl=60.0)
+    for _ in range(5):
+        assert await cache.for_snapshots(random_cycle(1)) is not None
+    assert len(calls) == 1
+
+    cache._loaded_at -= 120.0  # stale: served as-is, refreshed in background
+    await cache.ensure_fresh()
+    await cache.ensure_fresh()
+    await cache._refreshing
+    assert len(calls) == 2 and not cache.stale
+
+
+@pytest.mark.asyncio
+async def test_load_scores() -> None:
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.db.models import ProviderMetrics
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(ProviderMetrics.__table__.create)
+        await conn.execute(
+            text(
+                "INSERT INTO provider_metrics (provider_id, brier_sum, n_obs, "
+                "brier_score) VALUES ('p1', 20.0, 100, 0.2), ('p2', 0.1, 1, 0.1), "
+                "('p3', 0.0, 0, NULL)"
+            )
+        )
+
+    # Only provider_metrics is read: no snapshot/result tables exist here
+    async with async_sessionmaker(engine)() as sess:
+        assert await load_scores(sess, min_obs=0) == {"p1": 0.2, "p2": 0.1}
+        assert await load_scores(sess, min_obs=50) == {"p1": 0.2}
+    await engine.dispose()